@@ -1,13 +1,10 @@
 import os
-from numpy import gradient, floor, loadtxt, argwhere, sqrt, r_, count_nonzero
-from scipy.stats import linregress
+from numpy import sqrt
 from matplotlib.lines import Line2D
 import matplotlib.colors
 import pandas as pd
-from scipy.constants import epsilon_0
 import matplotlib.pyplot as plt
-from scipy.signal import savgol_filter
-import Utilities.signal_processing
+from Utilities.probestation import process_device
 from Objects.measurement import Figure
 import datetime
 
@@ -112,18 +109,14 @@ for chip in chips:
     for idx, device in enumerate(devices):
         tot += 1
 
-        print(f"{chip}-{device} - Loading IV... ", end="")
-        with open(rf"{main}\{chip}\IV_Data\IVData_{device}", "r") as file:
-            data_iv = loadtxt(file, skiprows=77)
-            l = l_dict[device[8:-4]]
-
-        if sweep_dir == 0:
-            data_iv = Utilities.signal_processing.filter_fwd_sweep(data_iv)
-        if sweep_dir == 1:
-            data_iv = Utilities.signal_processing.filter_bkw_sweep(data_iv)
-        fit = linregress(data_iv[:, 1], data_iv[:, 0])
-        if not(fit[2] > filter_rvalue and filter_rmax > fit[0] > filter_rmin and fit[4] < filter_stderr):
-            print(f"Discarded.")
+        print(f"{chip}-{device} - Processing... ", end="")
+        l = l_dict[device[8:-4]]
+        result = process_device(rf"{main}\{chip}\IV_Data\IVData_{device}", rf"{main}\{chip}\GateSweep_Data\GateSweepData_{device}", l, w, bias,
+                                epsilon_r, oxide_thickness, sweep_dir, smooth_window, smooth_order, filter_rvalue, filter_stderr,
+                                filter_rmin, filter_rmax, filter_ids_min, filter_gradient)
+        data_iv = result["iv"]
+        if not result["iv ok"]:
+            print(f"IV discarded.")
             plotiv_kill.ax.add_line(Line2D(xdata=data_iv[:, 0], ydata=data_iv[:, 1], color=cm(norm(l)), **linestyle))
             plotiv_kill.ax.relim()
             plotiv_kill.ax.autoscale_view()
@@ -136,7 +129,7 @@ for chip in chips:
             counter += 1
             continue
         else:
-            print("OK... ", end="")
+            print("IV OK... ", end="")
             plotiv.ax.add_line(Line2D(xdata=data_iv[:, 0], ydata=data_iv[:, 1], color=cm(norm(l)), **linestyle))
             plotiv.ax.relim()
             plotiv.ax.autoscale_view()
@@ -151,25 +144,13 @@ for chip in chips:
             plotiv_norm.fig.canvas.draw()
             plt.pause(0.1)
 
-
-        print(f"Loading Gate Sweep... ", end="")
-        with open(rf"{main}\{chip}\GateSweep_Data\GateSweepData_{device}", "r") as file:
-            data_vgs = loadtxt(file, skiprows=77)
-        if sweep_dir == 0:
-            data_vgs = Utilities.signal_processing.filter_fwd_sweep(data_vgs)
-        if sweep_dir == 1:
-            data_vgs = Utilities.signal_processing.filter_bkw_sweep(data_vgs)
-        y_smooth = savgol_filter(data_vgs[:, 1], int(2 * floor(smooth_window * len(data_vgs[:, 0]) / 2) + 1), smooth_order)
-        y2_smooth = gradient(y_smooth[:])
-        plotd2y.ax.add_line(Line2D(xdata=data_vgs[:, 0], ydata=y2_smooth, color=cm(norm(l)), **linestyle))
+        data_vgs = result["vgs"]
+        plotd2y.ax.add_line(Line2D(xdata=data_vgs[:, 0], ydata=result["d2y"], color=cm(norm(l)), **linestyle))
         plotd2y.ax.relim()
         plotd2y.ax.autoscale_view()
         plotd2y.fig.canvas.draw()
-        if any(data_vgs[:, 1] < filter_ids_min) \
-                or any(abs(gradient(data_vgs[:, 1])) > filter_gradient * abs(data_vgs[:, 1])) \
-                or all(i < j for i, j in zip(y_smooth[:], y_smooth[1:]))\
-                or count_nonzero(r_[True, y_smooth[1:] < y_smooth[:-1]][1:-1] & r_[y_smooth[:-1] < y_smooth[1:], True][1:-1]) > 1:
-            print(f"Discarded.")
+        if not result["vgs ok"]:
+            print(f"Gate sweep discarded.")
             plotgs_kill.ax.add_line(Line2D(xdata=data_vgs[:, 0], ydata=data_vgs[:, 1], color=cm(norm(l)), **linestyle))
             plotgs_kill.ax.relim()
             plotgs_kill.ax.autoscale_view()
@@ -182,7 +163,7 @@ for chip in chips:
             counter += 1
             continue
         else:
-            print("OK... ", end="")
+            print("Gate sweep OK... ", end="")
             plotgs.ax.add_line(Line2D(xdata=data_vgs[:, 0], ydata=data_vgs[:, 1], color=cm(norm(l)), **linestyle))
             plotgs.ax.relim()
             plotgs.ax.autoscale_view()
@@ -197,28 +178,11 @@ for chip in chips:
             plotgs_norm.fig.canvas.draw()
             plt.pause(0.1)
 
-
-        print(f"Calculate mobility... ", end="")
-        dy_dx = abs(gradient(data_vgs[:, 1], data_vgs[:, 0]))   # calculate d(ids)/d(vgs) raw
-        v_dirac = data_vgs[argwhere(dy_dx == min(dy_dx)), 0][0]
-        y_smooth = savgol_filter(data_vgs[:, 1], int(2 * floor(smooth_window * len(data_vgs[:, 0]) / 2) + 1), smooth_order)
-        dy_smooth_dx = abs(gradient(y_smooth, data_vgs[:, 0]))   # calculate d(ids)/d(vgs)
-        c = capacitance(epsilon_0, epsilon_r, oxide_thickness)
-        mu_lin = l / (w * c * bias) * dy_dx
-        mu_lin_smooth = l / (w * c * bias) * dy_smooth_dx
-        plotmu.ax.add_line(Line2D(xdata=data_vgs[:, 0], ydata=mu_lin_smooth, color=cm(norm(l)), **linestyle))
+        plotmu.ax.add_line(Line2D(xdata=data_vgs[:, 0], ydata=result["mu_lin_smooth"], color=cm(norm(l)), **linestyle))
         plotmu.ax.relim()
         plotmu.ax.autoscale_view()
         plotmu.fig.canvas.draw()
         plt.pause(0.1)
-        try:
-            mu_h = max(mu_lin_smooth[argwhere(data_vgs[:, 0] <= v_dirac[0])])[0]
-        except:
-            mu_h = None
-        try:
-            mu_e = max(mu_lin_smooth[argwhere(data_vgs[:, 0] >= v_dirac[0])])[0]
-        except:
-            mu_e = None
         material = mat_dict[chip[12:-5]]
         chip_name = chip[:11]
         if int(chip[-1]) != int(device[5:7]):
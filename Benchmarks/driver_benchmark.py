@@ -0,0 +1,72 @@
+# region ----- Import packages -----
+from numpy import linspace, concatenate
+import visa_simulator
+from srs_sr830 import sr830
+from keithley_smu236 import smu236
+from keithley_dmm2182a import dmm2182a
+from oxford_mercury_itc import mercuryitc
+from agilent_4294a import agilent4294a
+import time
+# endregion
+
+"""
+#######################################################################
+    Description:    Benchmark of the drivers on the simulated units of visa_simulator, with the default link model
+                    of each unit (latency, bandwidth). Each operation is timed and the writes, reads and bytes on the
+                    link are counted, so that changes in the number of round trips of a driver show up without the
+                    instruments. The clock of the units runs "speed" times faster than real time, so that the
+                    acquisitions do not dominate the timings.
+#######################################################################
+"""
+
+# region ----- Options -----
+speed = 1000                # [float] speed of the clock of the units relative to real time
+seed = 0                    # [int] seed of the simulated noise and jitter
+jitter = 0                  # [float] rms random delay (in s) added to each write and read
+repeat = 5                  # [int] repetitions of each operation (the mean is reported)
+# endregion
+
+# region ----- Units -----
+rm = visa_simulator.ResourceManager({"GPIB0::8::INSTR": "sr830", "GPIB0::16::INSTR": "smu236", "GPIB0::7::INSTR": "dmm2182a",
+                                     "GPIB0::13::INSTR": "mercuryitc", "GPIB0::17::INSTR": "agilent4294a"}, jitter=jitter, speed=speed, seed=seed)
+lockin = sr830(rm.open_resource("GPIB0::8::INSTR"))
+smu = smu236(rm.open_resource("GPIB0::16::INSTR"))
+dmm = dmm2182a(rm.open_resource("GPIB0::7::INSTR"))
+tc = mercuryitc(rm.open_resource("GPIB0::13::INSTR"))
+analyzer = agilent4294a(rm.open_resource("GPIB0::17::INSTR"))
+
+
+def bench(name, unit, f, *args):
+    # mean time (in s) and link traffic per call of f
+    f(*args)  # first call: caches and configuration
+    before = dict(unit.traffic)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        f(*args)
+    dt = (time.perf_counter() - t0) / repeat
+    traffic = {key: (unit.traffic[key] - before[key]) / repeat for key in ["writes", "reads", "bytes"]}
+    print(f"{name:<40} {dt * 1e3:9.2f} ms {traffic['writes']:6.0f} writes {traffic['reads']:6.0f} reads {traffic['bytes'] / 1e3:8.1f} kB")
+# endregion
+
+# region ----- Benchmark -----
+lockin.set_sampling_frequency(512)
+lockin.start_filling_buffer()
+time.sleep(16383 / 512 / speed)  # fill the buffer
+bench("SR830 TRCA? (16383 points)", lockin.visa, lockin.read_buffer, 1, 0, 16383, "ascii")
+bench("SR830 TRCB? (16383 points)", lockin.visa, lockin.read_buffer, 1, 0, 16383, "binary")
+
+smu.program_sweep("v", concatenate((linspace(0, 1, 500), linspace(1, 0, 500))))
+smu.switch_on()
+smu.run_sweep()
+bench("K236 sweep buffer, ASCII (1000 points)", smu.visa, smu.read_buffer, ("source", "measure", "time"), "ascii")
+bench("K236 sweep buffer, binary (1000 points)", smu.visa, smu.read_buffer, ("source", "measure", "time"), "binary")
+
+bench("2182A read", dmm.visa, dmm.read)
+
+bench("Mercury iTC, four read_temperature", tc.visa, lambda: [tc.read_temperature(x) for x in tc.sensors])
+bench("Mercury iTC, read_temperature(\"all\")", tc.visa, tc.read_temperature, "all")
+bench("Mercury iTC, read_record", tc.visa, tc.read_record)
+
+analyzer.set_sweep_condition(start=40, stop=1e6, points=801)
+bench("4294A sweep_and_acquire (801 points)", analyzer.visa, analyzer.sweep_and_acquire)
+# endregion
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import socket
+import platform
+import tracemalloc
+import subprocess
+import importlib.util
+from datetime import datetime
+from statistics import median
+import numpy
+
+
+class Harness:
+
+    """ Runner of the benchmarks of the hot paths. A case is a function and a setup which builds its arguments (e.g.
+    synthetic data), added with "add" and timed by "run": after a warm-up call, the function is called "repeat" times
+    and the best and median wall time are reported, then the peak memory allocated by one call is measured with
+    tracemalloc (in a separate call, as tracing slows the code down). The setup is neither timed nor traced.
+    The results are appended to the local history (JSON lines, one record per case and run, with date, git commit,
+    host and versions) and compared with the last run of the same case on the same host. Cases whose required
+    modules are not installed are skipped. """
+
+    def __init__(self, history=None, repeat=5, memory=True, label=""):
+        """
+        :param history: [str] path of the history file. If None, "history.jsonl" next to this file. "" to keep no history
+        :param repeat: [int] timed calls of each case
+        :param memory: [bool] measure the peak memory of each case
+        :param label: [str] label stored with the results (e.g. the change being tested)
+        """
+        self.history = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl") if history is None else history
+        self.repeat = repeat
+        self.memory = memory
+        self.label = label
+        self.cases = {}
+
+    def add(self, name, function, setup=None, requires=()):
+        """ Add the case "name": function(*setup()), or function() without setup. requires lists the modules needed. """
+        self.cases[name] = {"function": function, "setup": setup, "requires": list(requires)}
+
+    @staticmethod
+    def commit():
+        # current git commit of the repository, if any
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    def measure(self, function, args):
+        # best and median time (in s) of "repeat" calls, and peak memory (in bytes) of one call
+        function(*args)
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            function(*args)
+            times.append(time.perf_counter() - start)
+        peak = None
+        if self.memory:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            function(*args)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            tracemalloc.stop()
+        return min(times), median(times), peak
+
+    def load(self):
+        # records of the history
+        if not self.history or not os.path.isfile(self.history):
+            return []
+        with open(self.history, "r") as file:
+            return [json.loads(x) for x in file if x.strip()]
+
+    def run(self, select=None):
+        """ Run the cases whose name contains one of the strings in select (all cases if None), print the results and
+        append them to the history. Return the records. """
+        host = socket.gethostname()
+        previous = {x["case"]: x for x in self.load() if x["host"] == host}
+        info = {"date": datetime.now().isoformat(timespec="seconds"), "commit": self.commit(), "host": host, "label": self.label,
+                "python": platform.python_version(), "numpy": numpy.__version__, "repeat": self.repeat}
+        records = []
+        print(f"{'case':<50} {'best':>10} {'median':>10} {'peak':>10}   speed-up vs last run")
+        for name, case in self.cases.items():
+            if select is not None and not any(x in name for x in select):
+                continue
+            missing = [x for x in case["requires"] if importlib.util.find_spec(x) is None]
+            if missing:
+                print(f"{name:<50} skipped: {', '.join(missing)} not installed")
+                continue
+            args = case["setup"]() if case["setup"] is not None else ()
+            best, med, peak = self.measure(case["function"], args)
+            record = {"case": name, "best": best, "median": med, "peak": peak, **info}
+            records.append(record)
+            last = previous.get(name)
+            change = f"x{last['best'] / best:.2f}" if last is not None and best > 0 else ""
+            memory = f"{peak / 2**20:7.2f} MB" if peak is not None else f"{'-':>10}"
+            print(f"{name:<50} {best * 1e3:7.2f} ms {med * 1e3:7.2f} ms {memory}   {change}")
+        if self.history and records:
+            with open(self.history, "a") as file:
+                for record in records:
+                    file.write(json.dumps(record) + "\n")
+        return records
@@ -0,0 +1,159 @@
+# region ----- Import packages -----
+import os
+import io
+import atexit
+import shutil
+import tempfile
+import contextlib
+from numpy import linspace, concatenate, flip, arange, zeros, savetxt, column_stack, sqrt
+from numpy.random import default_rng
+from scipy.constants import epsilon_0, elementary_charge as e
+from Benchmarks.harness import Harness
+import Utilities.signal_processing
+import Utilities.probestation
+# endregion
+
+"""
+#######################################################################
+    Description:    Benchmark of the acquisition and analysis hot paths on synthetic data sized like the real runs:
+                    adwin.bin2voltage on 16 x 50k-sample ADwin arrays, the FET.Sweep filters on a 500 x 500 sweep,
+                    signal_processing.idx2time and the sweep filters on 50k-sample traces, the double Schottky barrier
+                    fit (iv_fit + recursive_fit) and the per-device processing of the probestation step1 script
+                    (Utilities.probestation.process_device: loading, sweep filtering, IV fit, smoothing, discard
+                    criteria and mobility) on a 2000-file tree.
+                    Wall time (best and median of "repeat" calls) and peak memory of each case are printed and
+                    appended to Benchmarks/history.jsonl, and compared with the last run on the same host.
+                    Run from the repository root with "Instrumentation library" in PYTHONPATH (for adwin). Cases
+                    which need packages that are not installed (e.g. matplotlib, lmfit) are skipped.
+#######################################################################
+"""
+
+# region ----- Options -----
+repeat = 5                  # [int] timed calls of each case
+memory = True               # [bool] measure the peak memory of each case
+label = ""                  # [str] label stored in the history with the results (e.g. the change being tested)
+select = None               # [list] run only the cases whose name contains one of these strings (None: all cases)
+seed = 0                    # [int] seed of the synthetic data
+adwin_channels = 16         # [int] channels of the ADwin arrays
+adwin_samples = 50000       # [int] samples per channel of the ADwin arrays
+sweep_steps = 126           # [int] steps of each Vgs and Vds sweep (FWD-BWD, 2 cycles: 4 * (steps - 1) + 1 points)
+trace_samples = 50000       # [int] samples of the traces for idx2time and the sweep filters
+chips = 10                  # [int] chips of the probestation tree
+devices = 100               # [int] devices per chip (an IV and a gate sweep file each)
+iv_points = 101             # [int] points of each IV sweep (FWD-BWD)
+gate_points = 601           # [int] points of each gate sweep (FWD-BWD)
+# endregion
+
+# region ----- Synthetic data -----
+rng = default_rng(seed)
+
+
+def fwd_bwd(start, stop, points):
+    # forward-backward sweep of "points" points
+    x = linspace(start, stop, points // 2 + 1)
+    return concatenate((x[:-1], flip(x)))
+
+
+def adwin_data():
+    # (channels, samples) float32 bins, as returned by ADwin DATA arrays
+    from adwin import adwin
+    return adwin("", "", simulate=True), rng.integers(0, 2**16, (adwin_channels, adwin_samples)).astype("float32"), zeros((adwin_channels, adwin_samples))
+
+
+def sweep_data():
+    # FET.Sweep with Vgs and Vds FWD-BWD sweeps of 2 cycles, data filled as during a measurement
+    from Classes.measurement import FET
+    sweep = FET.Sweep([-10, 10, sweep_steps, "lin", 1, 2], [-1, 1, sweep_steps, "lin", 1, 2])
+    cycle_vgs = arange(len(sweep.vgs)) // (2 * (sweep_steps - 1) + 1)
+    cycle_vds = arange(len(sweep.vds)) // (2 * (sweep_steps - 1) + 1)
+    sweep.data[:, :, 0] = sweep.vgs[:, None]
+    sweep.data[:, :, 1] = rng.normal(0, 1e-12, sweep.data.shape[:2])
+    sweep.data[:, :, 2] = sweep.vds[None, :]
+    sweep.data[:, :, 3] = sweep.vds[None, :] * (1e-6 + 1e-7 * sweep.vgs[:, None] ** 2)
+    sweep.data[:, :, 4] = cycle_vgs[:, None]
+    sweep.data[:, :, 5] = cycle_vds[None, :]
+    sweep.data[:, :, 6] = arange(sweep.data.shape[0] * sweep.data.shape[1]).reshape(sweep.data.shape[:2]) * 0.02
+    return sweep,
+
+
+def trace_data():
+    # indexes and a (samples, 2) voltage-current trace of FWD-BWD sweeps
+    v = concatenate([fwd_bwd(-1, 1, 1000)] * (trace_samples // 1000))
+    return arange(trace_samples), column_stack((v, v / 1e3 + rng.normal(0, 1e-7, len(v))))
+
+
+def schottky_data():
+    # double Schottky barrier fit of a synthetic IV at 300 K
+    from Classes.measurement import FitDoubleSchottkyBarrier
+    v = linspace(-2, 2, 201)
+    i = FitDoubleSchottkyBarrier.func(v, 0.3, 0.35, 300, 1e-12, 1e-12, 1, 1)
+    fit = FitDoubleSchottkyBarrier(v, i * (1 + rng.normal(0, 0.01, len(v))), 300, 1e-12, 1e-12)
+    fit.sweep_steps = 10
+    return fit,
+
+
+def probestation_tree():
+    # tree main/<chip>/IV_Data/IVData_<device> and main/<chip>/GateSweep_Data/GateSweepData_<device>, with the
+    # 77 header lines of the probestation files. Removed at exit
+    main = tempfile.mkdtemp(prefix="probestation_")
+    atexit.register(shutil.rmtree, main, True)
+    header = "\n".join(f"header line {k}" for k in range(77))
+    vds = fwd_bwd(-50e-3, 50e-3, iv_points)
+    vgs = fwd_bwd(-30, 30, gate_points)
+    c = epsilon_0 * 3.9 / 285e-9
+    for chip in range(chips):
+        os.makedirs(os.path.join(main, f"chip{chip:02d}", "IV_Data"))
+        os.makedirs(os.path.join(main, f"chip{chip:02d}", "GateSweep_Data"))
+        for device in range(devices):
+            name = f"d{device:04d}{chip:02d}_P0{device % 7 + 1}.dat"  # channel length code in name[8:-4], as the real files
+            r = 10 ** rng.uniform(2.5, 6.5)  # some devices fall outside the accepted resistance range
+            ids = vds / r + rng.normal(0, 1e-10, len(vds))
+            savetxt(os.path.join(main, f"chip{chip:02d}", "IV_Data", f"IVData_{name}"), column_stack((vds, ids)), header=header, comments="")
+            n = sqrt(1e16 ** 2 + (c * (vgs - rng.uniform(-10, 10)) / e) ** 2)  # carrier density (in m-2): most devices pass the criteria
+            ids = 50e-3 / (200 + 1 / (n * e * 0.1)) * (1 + rng.normal(0, 1e-3, len(vgs)))
+            savetxt(os.path.join(main, f"chip{chip:02d}", "GateSweep_Data", f"GateSweepData_{name}"), column_stack((vgs, ids)), header=header, comments="")
+    return main,
+# endregion
+
+# region ----- Cases -----
+l_dict = {"P01": 100e-6, "P02": 50e-6, "P03": 20e-6, "P04": 10e-6, "P05": 5e-6, "P06": 2e-6, "P07": 1e-6}
+
+
+def fit_schottky(fit):
+    # iv fit and recursive re-fit of the parameters with large errors (printouts discarded)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fit.iv_fit()
+        return fit.recursive_fit(result.model, result)
+
+
+def step1(main):
+    # per-device processing of step1_filter_data_and_generate_df.py (Utilities.probestation.process_device, backward
+    # sweeps), without plots and data frame. Return the accepted devices as (chip, device, l, mu_h, mu_e)
+    accepted = []
+    for chip in sorted(os.listdir(main)):
+        for device in [x[7:] for x in os.listdir(os.path.join(main, chip, "IV_Data")) if x.endswith(".dat")]:
+            l = l_dict[device[8:-4]]
+            result = Utilities.probestation.process_device(os.path.join(main, chip, "IV_Data", f"IVData_{device}"),
+                                                           os.path.join(main, chip, "GateSweep_Data", f"GateSweepData_{device}"), l)
+            if result["iv ok"] and result["vgs ok"]:
+                accepted.append((chip, device, l, result["mu_h"], result["mu_e"]))
+    return accepted
+
+
+harness = Harness(repeat=repeat, memory=memory, label=label)
+harness.add("adwin.bin2voltage", lambda adw, bins, out: adw.bin2voltage(bins), adwin_data, requires=["adwin"])
+harness.add("adwin.bin2voltage (out=)", lambda adw, bins, out: adw.bin2voltage(bins, out=out), adwin_data, requires=["adwin"])
+harness.add("FET.Sweep.filter_vgs_fwd_sweep", lambda sweep: sweep.filter_vgs_fwd_sweep(), sweep_data, requires=["matplotlib", "lmfit"])
+harness.add("FET.Sweep.filter_vds_bkw_sweep", lambda sweep: sweep.filter_vds_bkw_sweep(), sweep_data, requires=["matplotlib", "lmfit"])
+harness.add("FET.Sweep.filter_vgs_values", lambda sweep: sweep.filter_vgs_values(sweep.vgs[::10]), sweep_data, requires=["matplotlib", "lmfit"])
+harness.add("FET.Sweep.select", lambda sweep: sweep.select(cycle_vgs=1, vgs_dir="bkw", vds_dir="fwd"), sweep_data, requires=["matplotlib", "lmfit"])
+harness.add("signal_processing.idx2time", lambda idx, data: Utilities.signal_processing.idx2time(idx, 1, 50), trace_data)
+harness.add("signal_processing.filter_fwd_sweep", lambda idx, data: Utilities.signal_processing.filter_fwd_sweep(data), trace_data)
+harness.add("signal_processing.filter_bkw_sweep", lambda idx, data: Utilities.signal_processing.filter_bkw_sweep(data), trace_data)
+harness.add("FitDoubleSchottkyBarrier.recursive_fit", fit_schottky, schottky_data, requires=["matplotlib", "lmfit"])
+harness.add(f"probestation step1 ({2 * chips * devices} files)", step1, probestation_tree)
+# endregion
+
+# region ----- Benchmark -----
+harness.run(select)
+# endregion
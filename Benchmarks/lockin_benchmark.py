@@ -0,0 +1,71 @@
+# region ----- Import packages -----
+from numpy import arange, sin, cos, pi, sqrt, abs, max, concatenate, linspace
+from numpy.random import default_rng
+from Utilities.lockin import DigitalLockin
+import time
+# endregion
+
+"""
+#######################################################################
+    Description:    Benchmark of the digital lock-in (Utilities/lockin.py) on synthetic signals.
+                    16 channels sampled at the ADwin scan rate carry a 1st and a 2nd harmonic
+                    of known rms amplitude and phase, plus white noise. The trace is demodulated
+                    in chunks, as during an acquisition, and the demodulation time is compared
+                    with the duration of the trace (real-time factor). The outputs after the
+                    settling time are compared with the known X and Y.
+#######################################################################
+"""
+
+# region ----- Options -----
+fs = 40e3                   # [float] sampling frequency (in Hz)
+freq = 17.77                # [float] reference frequency (in Hz)
+duration = 60               # [float] duration of the trace (in s)
+chunk = 4000                # [int] samples per chunk (0.1 s at 40 kHz)
+channels = 16               # [int] number of channels
+time_constant = 1           # [float] time constant (in s)
+slope = 24                  # [int] filter slope (in dB/oct)
+noise = 1e-3                # [float] rms noise (in V)
+decimate = 400              # [int] return one output every "decimate" samples
+# endregion
+
+# region ----- Synthetic signals -----
+rng = default_rng(0)
+a1 = linspace(1e-3, 1e-2, channels)          # rms amplitude of the 1st harmonic (in V)
+a2 = linspace(1e-2, 1e-3, channels)          # rms amplitude of the 2nd harmonic (in V)
+p1 = linspace(0, 90, channels)               # phase of the 1st harmonic (in deg)
+p2 = linspace(-90, 0, channels)              # phase of the 2nd harmonic (in deg)
+
+
+def signal(k):
+    # synthetic (channels, len(k)) trace at sample indexes k
+    t = k / fs
+    return (sqrt(2) * a1[:, None] * cos(2 * pi * freq * t + pi / 180 * p1[:, None])
+            + sqrt(2) * a2[:, None] * cos(2 * pi * 2 * freq * t + pi / 180 * p2[:, None])
+            + noise * rng.standard_normal((channels, len(k))))
+# endregion
+
+# region ----- Benchmark -----
+lockin = DigitalLockin(fs, freq, harmonics=(1, 2), time_constant=time_constant, slope=slope, decimate=decimate)
+n = int(duration * fs)
+outputs = []
+elapsed = 0
+for start in range(0, n, chunk):
+    x = signal(arange(start, min(start + chunk, n)))
+    t0 = time.perf_counter()
+    z, t = lockin.demodulate(x)
+    elapsed = elapsed + time.perf_counter() - t0
+    outputs.append(z)
+z = concatenate(outputs, axis=2)
+settled = arange(0, n, decimate) / fs >= lockin.settling_time()  # outputs after the settling time
+x, y, r, theta = DigitalLockin.xyrt(z[:, :, settled])
+
+print(f"{channels} channels x 2 harmonics, {n} samples ({duration} s at {fs / 1e3:.0f} kHz) in chunks of {chunk}")
+print(f"Demodulation time: {elapsed:.3f} s ({1e9 * elapsed / n / channels:.1f} ns per sample and channel), "
+      f"real-time factor: {duration / elapsed:.0f}")
+for h, (a, p) in enumerate([(a1, p1), (a2, p2)]):
+    x_true = a * cos(pi / 180 * p)
+    y_true = a * sin(pi / 180 * p)
+    print(f"Harmonic {h + 1}: max |X - X_true| = {max(abs(x[h].mean(axis=1) - x_true)):.2e} V, "
+          f"max |Y - Y_true| = {max(abs(y[h].mean(axis=1) - y_true)):.2e} V, "
+          f"max std(R) = {max(r[h].std(axis=1)):.2e} V")
+# endregion
@@ -0,0 +1,65 @@
+# region ----- Import packages -----
+from numpy import linspace, array
+from numpy.random import default_rng
+from visa_simulator import ThermalPlant
+from Utilities.settling import SettlingDetector
+# endregion
+
+"""
+#######################################################################
+    Description:    Benchmark of the thermalization of a temperature sweep on the simulated stage and shield of
+                    visa_simulator.ThermalPlant (clock of the plant, no real waits): the fixed waits of the
+                    calibration and IV_vs_T scripts (settling_time at every temperature) are compared with
+                    Utilities.settling.SettlingDetector, which stops waiting as soon as stage and shield are settled
+                    (settling_time is then the maximum wait). For each temperature, the waiting time and the distance
+                    of stage and shield from the setpoint at the end of the wait are printed.
+                    Run from the repository root with "Instrumentation library" in PYTHONPATH.
+#######################################################################
+"""
+
+# region ----- Options -----
+t = linspace(300, 250, 10)  # [1D array of float] temperatures (in K)
+base = 300                  # [float] temperature (in K) of the plant before the sweep
+tau = 120                   # [float] time constant (in s) of the stage
+tau_shield = 400            # [float] time constant (in s) of the shield, relaxing to the stage
+noise = 1e-3                # [float] rms noise (in K) of the readings
+sampling_freq = 1           # [float] temperature sampling frequency (in Hz)
+settling_time = 60 * 60     # [float] fixed thermalization time (in s), max. waiting time of the adaptive settling
+tolerance = 0.05            # [float] max. distance (in K) of the stage temperature from the setpoint
+drift = 1e-3                # [float] max. drift (in K/min) of stage and shield temperatures
+window = 60                 # [float] time (in s) over which drift and distance from the setpoint are estimated
+seed = 0                    # [int] seed of the simulated noise
+# endregion
+
+
+def sweep(adaptive):
+    # thermalize at each temperature of t. Return the waiting time (in s) and the distance (in K) of stage and shield
+    # from the setpoint at the end of each wait
+    rng = default_rng(seed)
+    plant = ThermalPlant(["stage", "shield"], {"shield": "stage"}, base=base, tau=tau, tau_shield=tau_shield)
+    plant.active["stage"] = True
+    now = 0
+    results = []
+    for val_t in t:
+        plant.update(now)
+        plant.setpoint["stage"] = val_t
+        detector = SettlingDetector({"stage": val_t, "shield": None}, tolerance, drift, window)
+        start = now
+        while now - start < settling_time:
+            now = now + 1 / sampling_freq
+            plant.update(now)
+            detector.add(now - start, {x: plant.temperature[x] + noise * rng.standard_normal() for x in ["stage", "shield"]})
+            if adaptive and detector.update([]):
+                break
+        results.append((now - start, plant.temperature["stage"] - val_t, plant.temperature["shield"] - val_t))
+    return array(results)
+
+
+# region ----- Benchmark -----
+fixed = sweep(adaptive=False)
+adaptive = sweep(adaptive=True)
+print(f"{'T (K)':>8} {'fixed (s)':>10} {'adaptive (s)':>13} {'stage error (K)':>16} {'shield error (K)':>17}")
+for val_t, (time_fixed, _, _), (time_adaptive, stage, shield) in zip(t, fixed, adaptive):
+    print(f"{val_t:8.2f} {time_fixed:10.0f} {time_adaptive:13.0f} {stage:16.4f} {shield:17.4f}")
+print(f"Total thermalization time: {fixed[:, 0].sum() / 3600:.2f} h fixed, {adaptive[:, 0].sum() / 3600:.2f} h adaptive")
+# endregion
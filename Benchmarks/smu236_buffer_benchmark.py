@@ -0,0 +1,68 @@
+# region ----- Import packages -----
+from numpy import arange, linspace, column_stack, array, allclose, float32
+from numpy.random import default_rng
+from keithley_smu236 import smu236
+import time
+# endregion
+
+"""
+#######################################################################
+    Description:    Benchmark of the decoding of the Keithley 236 sweep buffer (smu236.read_buffer) on synthetic
+                    buffers of source, measure and time values, as returned by the G13 command. The ASCII buffer
+                    (format 2) is decoded with the former string splitting and with smu236.decode_ascii, the HP
+                    binary buffer (format 3) with smu236.decode_binary. Each decoder is repeated and the best time
+                    is reported, together with the size of the transfer.
+#######################################################################
+"""
+
+# region ----- Options -----
+points = [1000, 10000]      # [list of int] number of points of the synthetic buffers
+repeat = 20                 # [int] repetitions of each decoder (the best time is reported)
+items = ["source", "measure", "time"]
+# endregion
+
+
+# region ----- Synthetic buffers -----
+def synthetic(n):
+    # ASCII and HP binary buffers of n points: source (in V), measure (in A) and time (in ms)
+    rng = default_rng(0)
+    source = linspace(-1, 1, n)
+    measure = 1e-6 * source + 1e-9 * rng.standard_normal(n)
+    t = 20 * arange(n)
+    values = column_stack((source, measure, t)).ravel()
+    text = ",".join(f"{x:+.4E}" for x in values) + "\r\n"
+    raw = b"#A" + (4 * len(values) % 2 ** 16).to_bytes(2, "big") + values.astype(">f4").tobytes() + b"\r\n"
+    return values, text, raw
+
+
+def split_ascii(text):
+    # former decoder: string splitting and one float() per value
+    data = array([float(x) for x in text.strip("\r\n").split(",")])
+    return data[::3], data[1::3], data[2::3]
+
+
+def best(f, *args):
+    # best time (in s) of "repeat" calls of f
+    dt = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f(*args)
+        dt.append(time.perf_counter() - t0)
+    return min(dt)
+# endregion
+
+# region ----- Benchmark -----
+for n in points:
+    values, text, raw = synthetic(n)
+    ascii_ = smu236.to_records(smu236.decode_ascii(text), items)
+    binary = smu236.to_records(smu236.decode_binary(raw), items)
+    if not allclose(ascii_["measure"], values[1::3], rtol=1e-4) or not allclose(binary["measure"], values[1::3].astype(float32)):
+        exit("Decoded buffer does not match the synthetic values... Execution terminated.")
+    t_split = best(split_ascii, text)
+    t_ascii = best(lambda x: smu236.to_records(smu236.decode_ascii(x), items), text)
+    t_binary = best(lambda x: smu236.to_records(smu236.decode_binary(x), items), raw)
+    print(f"{n} points ({len(text) / 1e3:.0f} kB ASCII, {len(raw) / 1e3:.0f} kB binary):")
+    print(f"    string splitting: {t_split * 1e3:8.3f} ms")
+    print(f"    decode_ascii:     {t_ascii * 1e3:8.3f} ms (x{t_split / t_ascii:.1f})")
+    print(f"    decode_binary:    {t_binary * 1e3:8.3f} ms (x{t_split / t_binary:.1f})")
+# endregion
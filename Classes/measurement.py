@@ -1,6 +1,6 @@
 import scipy.stats
 import scipy.integrate as integrate
-from numpy import array, where, zeros, sqrt, linspace, sinh, exp, concatenate, flip, ceil, nan, zeros_like, empty, unique, log10, sin, sinc
+from numpy import array, where, zeros, sqrt, linspace, sinh, exp, concatenate, flip, ceil, nan, zeros_like, empty, unique, log10, sin, sinc, full, ndarray, nonzero, arange, ix_, isin, diff, ones, asarray, isfinite, geomspace
 from scipy.constants import Boltzmann as k_b, elementary_charge as e, pi, electron_mass as m_e, h, epsilon_0, hbar
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
@@ -9,6 +9,9 @@ from matplotlib.lines import Line2D
 import matplotlib.cm
 from lmfit import Model
 import itertools
+import pickle
+import os
+from Utilities.sweep_plan import SweepPlan
 
 class EmptyClass:
 
@@ -20,7 +23,11 @@ class EmptyClass:
 class Experiment:
 
     """ A class designed to collect experimental data and instrumentation settings in a single object.
-    The self.data can be any experiment data class. Further attributes can be added without limitations. """
+    The self.data can be any experiment data class. Further attributes can be added without limitations.
+    The data file is an append-only stream of pickles: a header (the Experiment itself, written once by save())
+    followed by records written by append() as the measurement proceeds. Each record holds only the block just
+    measured, so saving takes the same time at every step whatever the size of the experiment, and data already
+    on disc is never rewritten. Files can be read with Experiment.load() while they are still being written. """
 
     def __init__(self):
 
@@ -34,34 +41,144 @@ class Experiment:
         self.settings = None
         self.data = None
 
+    def save(self, filename=None):
+        """ Write the header, i.e. the whole experiment (with the preallocated data), to a new file. An existing file
+        is moved to the backup file. Call once, before the measurement loop. """
+        filename = self.filename if filename is None else filename
+        if os.path.exists(filename):
+            if self.backupname is not None:
+                if os.path.exists(self.backupname):
+                    os.remove(self.backupname)
+                os.rename(filename, self.backupname)
+        with open(filename, "wb") as file:
+            pickle.dump(self, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def append(self, *path, index=None, filename=None):
+        """ Append the block self.data[path] to the file, e.g. experiment.append("t", idx_t) for the data of the
+        temperature idx_t. Path elements are keys/indices or attribute names.
+        :param path: path of the block in self.data
+        :param index: [int or tuple] if given, only element [index] of each array in the block is written (e.g. the row
+        just measured of a 2D map). Arrays are then updated in place when the file is loaded
+        :param filename: [str] file where to append the block. If None, self.filename
+        """
+        filename = self.filename if filename is None else filename
+        block = _take(_get(self.data, path), index)
+        with open(filename, "ab") as file:
+            pickle.dump((path, index, block), file)
+            file.flush()
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def load(filename):
+        """ Read the header and replay the records of an experiment file. A last record truncated because the file
+        is still being written (or the measurement crashed) is ignored. Files written as a single pickle are also read. """
+        with open(filename, "rb") as file:
+            experiment = pickle.load(file)
+            while True:
+                try:
+                    path, index, block = pickle.load(file)
+                except (EOFError, pickle.UnpicklingError):
+                    return experiment
+                if index is None:
+                    _set(_get(experiment.data, path[:-1]), path[-1], block)
+                else:
+                    _put(_get(experiment.data, path), block, index)
+
+
+def _get(obj, path):
+    # follow path in nested lists, dicts and objects
+    for key in path:
+        obj = getattr(obj, key) if isinstance(key, str) and not isinstance(obj, dict) else obj[key]
+    return obj
+
+
+def _set(obj, key, value):
+    if isinstance(key, str) and not isinstance(obj, dict):
+        setattr(obj, key, value)
+    else:
+        obj[key] = value
+
+
+def _take(block, index):
+    # copy of element [index] of every array in block (all arrays if index is None). Other values are dropped
+    if index is None:
+        return block
+    if isinstance(block, ndarray):
+        return block[index].copy()
+    if isinstance(block, dict):
+        items = block.items()
+    elif isinstance(block, list):
+        items = enumerate(block)
+    elif hasattr(block, "__dict__"):
+        items = vars(block).items()
+    else:
+        return None
+    return {key: val for key, val in ((key, _take(val, index)) for key, val in items) if val is not None}
+
+
+def _put(target, block, index):
+    # write back in place the arrays taken by _take
+    for key, val in block.items():
+        child = _get(target, [key])
+        if isinstance(child, ndarray):
+            child[index] = val
+        else:
+            _put(child, val, index)
+
 class Thermoelectrics:
 
     class Calibration:
-        """ Experiment data class for field-effect thermoelectric device calibration. """
+        """ Experiment data class for field-effect thermoelectric device calibration.
+        Each observable is stored in a single contiguous array, with dimensions:
+            self.iv[field]      (temperature, thermometer, thermometer current)         v
+                                (temperature, thermometer)                              r, r_stderr
+            self.dr[field]      (heater sweep, heater current, thermometer, sample)     time, x, y, raw
+                                (heater sweep, heater current, thermometer)             x_avg, x_stddev, ...
+            self.dr_iv[field]   (heater sweep, heater current, thermometer, thermometer current)   v
+                                (heater sweep, heater current, thermometer)             r, r_stderr
+        where thermometer 1 and 2 are at index 0 and 1, and heater sweeps are the temperatures in t_h
+        (self.dr_index[idx_t] is the heater sweep of temperature idx_t, None if no sweep is done).
+        The nested self.t[idx_t]["dr"][f"h{h}"][idx_i_h]["drt1"] structure is kept: its IV and Lockin objects
+        are ArrayView, whose attributes read and write the arrays above. """
         def __init__(self, h, th, t, i_h, t_h, i_th, i_th_ex, settings):
             self.heater = h
             self.thermometer = th
             self.t_h = t_h
             self.i_h = i_h
-            self.t = [{"t": x,
-                       "tt": ObsT(["stage", "shield"]),
-                       "iv1": IV() if th == 0 or th == 1 else None,
-                       "iv2": IV() if th == 0 or th == 2 else None,
-                       "dr": {"h1": [{"i_h": y1,
-                                      "drt1": Lockin() if th == 0 or th == 1 else None,
-                                      "drt2": Lockin() if th == 0 or th == 2 else None,
-                                      "iv1": IV() if th == 0 or th == 1 else None,
-                                      "iv2": IV() if th == 0 or th == 2 else None}
-                                     for y1 in i_h] if h == 1 else None,
-                              "h2": [{"i_h": y2,
-                                      "drt1": Lockin() if th == 0 or th == 1 else None,
-                                      "drt2": Lockin() if th == 0 or th == 2 else None,
-                                      "iv1": IV() if th == 0 or th == 2 else None,
-                                      "iv2": IV() if th == 0 or th == 2 else None}
-                                     for y2 in i_h] if h == 2 else None} if x in t_h else None}
-                      for x in t]
 
             vt_samples = int(ceil((settings.adc.vt_settling_time + settings.adc.vt_measurement_time) / (settings.adc.nplc / settings.adc.line_freq)))
+            self.dr_t = array([x for x in t if x in t_h])
+            self.dr_index = [len([y for y in t[:idx_x] if y in t_h]) if x in t_h else None for idx_x, x in enumerate(t)]
+            n_t, n_h, n_i = len(t), len(i_h), len(i_th)
+            self.iv = {"v": full((n_t, 2, n_i), nan),
+                       "r": full((n_t, 2), nan),
+                       "r_stderr": full((n_t, 2), nan)}
+            self.dr = {"time": full((len(self.dr_t), n_h, 2, vt_samples), nan),
+                       "x": full((len(self.dr_t), n_h, 2, vt_samples), nan),
+                       "y": full((len(self.dr_t), n_h, 2, vt_samples), nan),
+                       "raw": full((len(self.dr_t), n_h, 2, vt_samples), nan)}
+            for field in ["raw", "x", "y", "rho", "phi"]:
+                self.dr[f"{field}_avg"] = full((len(self.dr_t), n_h, 2), nan)
+                self.dr[f"{field}_stddev"] = full((len(self.dr_t), n_h, 2), nan)
+            self.dr_iv = {"v": full((len(self.dr_t), n_h, 2, n_i), nan),
+                          "r": full((len(self.dr_t), n_h, 2), nan),
+                          "r_stderr": full((len(self.dr_t), n_h, 2), nan)}
+
+            ths = [k for k in [1, 2] if th == 0 or th == k]
+            self.t = [{"t": x,
+                       "tt": ObsT(["stage", "shield"]),
+                       "iv1": ArrayView(self.iv, (idx_x, 0), i=i_th) if 1 in ths else None,
+                       "iv2": ArrayView(self.iv, (idx_x, 1), i=i_th) if 2 in ths else None,
+                       "dr": {f"h{y}": [{"i_h": z,
+                                         "drt1": ArrayView(self.dr, (self.dr_index[idx_x], idx_z, 0), i_th_ex=i_th_ex) if 1 in ths else None,
+                                         "drt2": ArrayView(self.dr, (self.dr_index[idx_x], idx_z, 1), i_th_ex=i_th_ex) if 2 in ths else None,
+                                         "iv1": ArrayView(self.dr_iv, (self.dr_index[idx_x], idx_z, 0), i=i_th) if 1 in ths else None,
+                                         "iv2": ArrayView(self.dr_iv, (self.dr_index[idx_x], idx_z, 1), i=i_th) if 2 in ths else None}
+                                        for idx_z, z in enumerate(i_h)] if h == y else None
+                              for y in [1, 2]} if x in t_h else None}
+                      for idx_x, x in enumerate(t)]
 
             for idx_x, x in enumerate(self.t):
                 if settings.tc.address is not None:
@@ -73,86 +190,36 @@ class Thermoelectrics:
                         x["tt"].time = zeros(int(ceil(settings.tc.settling_time * settings.tc.sampling_freq)))
                         x["tt"].stage = zeros(int(ceil(settings.tc.settling_time * settings.tc.sampling_freq)))
                         x["tt"].shield = zeros(int(ceil(settings.tc.settling_time * settings.tc.sampling_freq)))
-                if x["iv1"] is not None:
-                    x["iv1"].i = i_th
-                    x["iv1"].v = zeros(len(i_th))
-                if x["iv2"] is not None:
-                    x["iv2"].i = i_th
-                    x["iv2"].v = zeros(len(i_th))
-                if x["dr"] is not None:
-                    if x["dr"]["h1"] is not None:
-                        for y in x["dr"]["h1"]:
-                            if y["drt1"] is not None:
-                                y["drt1"].__setattr__("i_th_ex", i_th_ex)
-                                y["drt1"].time = zeros(vt_samples)
-                                y["drt1"].x = zeros(vt_samples)
-                                y["drt1"].y = zeros(vt_samples)
-                                y["drt1"].raw = zeros(vt_samples)
-                            if y["drt2"] is not None:
-                                y["drt2"].__setattr__("i_th_ex", i_th_ex)
-                                y["drt2"].time = zeros(vt_samples)
-                                y["drt2"].x = zeros(vt_samples)
-                                y["drt2"].y = zeros(vt_samples)
-                                y["drt2"].raw = zeros(vt_samples)
-                            if y["iv1"] is not None:
-                                y["iv1"].i = i_th
-                                y["iv1"].v = zeros(len(i_th))
-                            if y["iv2"] is not None:
-                                y["iv2"].i = i_th
-                                y["iv2"].v = zeros(len(i_th))
-                    if x["dr"]["h2"] is not None:
-                        for y in x["dr"]["h2"]:
-                            if y["drt1"] is not None:
-                                y["drt1"].__setattr__("i_th_ex", i_th_ex)
-                                y["drt1"].time = zeros(vt_samples)
-                                y["drt1"].x = zeros(vt_samples)
-                                y["drt1"].y = zeros(vt_samples)
-                                y["drt1"].raw = zeros(vt_samples)
-                            if y["drt2"] is not None:
-                                y["drt2"].__setattr__("i_th_ex", i_th_ex)
-                                y["drt2"].time = zeros(vt_samples)
-                                y["drt2"].x = zeros(vt_samples)
-                                y["drt2"].y = zeros(vt_samples)
-                                y["drt2"].raw = zeros(vt_samples)
-                            if y["iv1"] is not None:
-                                y["iv1"].i = i_th
-                                y["iv1"].v = zeros(len(i_th))
-                            if y["iv2"] is not None:
-                                y["iv2"].i = i_th
-                                y["iv2"].v = zeros(len(i_th))
 
         def get_resistance(self, th):
             """ Fit all V vs I data """
-            t = zeros(len(self.t))
-            r = zeros_like(t)
-            r_err = zeros_like(t)
-            for idx, val in enumerate(self.t):
-                t[idx] = val["t"]
-                r[idx] = val[f"iv{th}"].r
-                r_err[idx] = val[f"iv{th}"].r_stderr
+            t = array([val["t"] for val in self.t])
+            if hasattr(self, "iv"):
+                r = self.iv["r"][:, th - 1]
+                r_err = self.iv["r_stderr"][:, th - 1]
+            else:  # files saved before the array storage
+                r = array([val[f"iv{th}"].r for val in self.t])
+                r_err = array([val[f"iv{th}"].r_stderr for val in self.t])
             fit = scipy.stats.linregress(t, r)
             return t, r, r_err, fit
 
         def get_heater_sweep(self, h, th):
-            """ Get heater sweep data """
-            for idx1, val1 in enumerate(self.t):
-                if val1["dr"] is not None:
-                    t = val1["t"]
-                    i = zeros(len(val1["dr"][f"h{h}"]))
-                    drdc = zeros_like(i)
-                    drdc_err = zeros_like(i)
-                    drx = zeros_like(i)
-                    drx_err = zeros_like(i)
-                    dry = zeros_like(i)
-                    dry_err = zeros_like(i)
-                    for idx2, val2 in enumerate(val1["dr"][f"h{h}"]):
-                        i[idx2] = val2["i_h"]
-                        drdc[idx2] = val2[f"iv{th}"].r
-                        drdc_err[idx2] = val2[f"iv{th}"].r_stderr
-                        drx[idx2] = val2[f"drt{th}"].x_avg
-                        drx_err[idx2] = val2[f"drt{th}"].x_stddev
-                        dry[idx2] = val2[f"drt{th}"].y_avg
-                        dry_err[idx2] = val2[f"drt{th}"].y_stddev
+            """ Get heater sweep data (of the last temperature with a heater sweep) """
+            i = array(self.i_h)
+            if hasattr(self, "dr"):
+                t = self.dr_t[-1]
+                drdc = self.dr_iv["r"][-1, :, th - 1]
+                drdc_err = self.dr_iv["r_stderr"][-1, :, th - 1]
+                drx = self.dr["x_avg"][-1, :, th - 1]
+                drx_err = self.dr["x_stddev"][-1, :, th - 1]
+                dry = self.dr["y_avg"][-1, :, th - 1]
+                dry_err = self.dr["y_stddev"][-1, :, th - 1]
+            else:  # files saved before the array storage
+                val = [x for x in self.t if x["dr"] is not None][-1]
+                t = val["t"]
+                drdc, drdc_err = array([[y[f"iv{th}"].r, y[f"iv{th}"].r_stderr] for y in val["dr"][f"h{h}"]]).T
+                drx, drx_err = array([[y[f"drt{th}"].x_avg, y[f"drt{th}"].x_stddev] for y in val["dr"][f"h{h}"]]).T
+                dry, dry_err = array([[y[f"drt{th}"].y_avg, y[f"drt{th}"].y_stddev] for y in val["dr"][f"h{h}"]]).T
             return t, i, drdc, drdc_err, drx, drx_err, dry, dry_err
 
         def calculate_temperatures(drdc, drdc_err, drx, drx_err, dry, dry_err, fit):
@@ -456,6 +523,8 @@ class Thermoelectrics:
             for idx, val in enumerate(t_h):
                 self.drdcerr2.add_line(Line2D(xdata=[None], ydata=[None], color=self.cm(self.norm(val)), linewidth=0, label=val, marker="o", markeredgecolor='black', markeredgewidth=0.2, alpha=0.4))
 
+            self.live = LivePlot(self.fig)
+
     class PlotStabilityDiagram:
         """A class to plot the stability diagram of any observable"""
         def __init__(self, vg, vb, x, y, z):
@@ -663,6 +732,34 @@ class Lockin:
         self.phi_avg = float
         self.phi_stddev = float
 
+class ArrayView:
+
+    """ An IV or Lockin-like object whose attributes are elements of the arrays of a store (a dict of arrays).
+    obj.field is store[field][index]: arrays are returned as views (obj.x[k] = value writes into the store) and
+    obj.field = value writes value into the store. Attributes which are not in the store (e.g. the thermometer
+    current i, shared by all the IVs) are kept on the object. """
+
+    def __init__(self, store, index, **kwargs):
+        """
+        :param store: [dict] arrays, indexed by field name
+        :param index: [tuple] index of the object in the arrays
+        :param kwargs: further attributes
+        """
+        self.__dict__.update(_store=store, _index=index, **kwargs)
+
+    def __getattr__(self, name):
+        # called for attributes not found in __dict__
+        if name.startswith("_") or name not in self._store:
+            raise AttributeError(name)
+        return self._store[name][self._index]
+
+    def __setattr__(self, name, value):
+        if name in self._store:
+            self._store[name][self._index] = value
+        else:
+            self.__dict__[name] = value
+
+
 class ObsT:
 
     """ Experiment data class for time-dependent measurements. """
@@ -675,6 +772,120 @@ class ObsT:
         for idx, val in enumerate(obs):
             self.__setattr__(val, None)
 
+class LivePlot:
+
+    """ Fast live update of the lines of a figure, based on blitting.
+    The figure is drawn without its lines (axes, ticks, labels, ...) and this background is cached: each update()
+    restores the background and draws only the lines on top of it. The background is drawn again only when the
+    limits of an axes change, i.e. when new data falls outside the current limits (the limits are then extended with
+    a margin, and never shrunk), or when the figure is resized.
+    Long traces are decimated for display: for each pixel column only the min and max points are drawn. """
+
+    def __init__(self, fig, margin=0.1, decimate=True):
+        """
+        :param fig: [Figure] figure to update
+        :param margin: [float] margin added on both sides when the limits are extended, as fraction of the data range
+        :param decimate: [bool] decimate lines longer than twice the width (in pixels) of their axes
+        """
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.margin = margin
+        self.decimate = decimate
+        self.background = None
+        self.limits = None  # axes limits and figure size when the background was drawn
+        self.capturing = False
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        # a full draw not made by capture() (e.g. plt.pause, resize) invalidates the background
+        if not self.capturing:
+            self.background = None
+
+    def set_data(self, line, x, y):
+        """ Replace line.set_data(x, y); ax.relim(); ax.autoscale_view(). """
+        x = asarray(x, dtype=float).reshape(-1)
+        y = asarray(y, dtype=float).reshape(-1)
+        ax = line.axes
+        self.extend_limits(ax, x, "x")
+        self.extend_limits(ax, y, "y")
+        if self.decimate:
+            x, y = LivePlot.min_max(x, y, int(ax.bbox.width))
+        line.set_data(x, y)
+
+    def extend_limits(self, ax, data, axis):
+        # extend the limits of axis ("x" or "y") if data falls outside them. If the axis is on autoscale (its limits
+        # have never been set), the limits are set to the data range the first time
+        log = (ax.get_xscale() if axis == "x" else ax.get_yscale()) == "log"
+        data = data[isfinite(data) & (data > 0)] if log else data[isfinite(data)]
+        if len(data) == 0:
+            return
+        lo, hi = data.min(), data.max()
+        if log:
+            lo, hi = log10(lo), log10(hi)
+        get_lim, set_lim = (ax.get_xlim, ax.set_xlim) if axis == "x" else (ax.get_ylim, ax.set_ylim)
+        autoscale = ax.get_autoscalex_on() if axis == "x" else ax.get_autoscaley_on()
+        if autoscale:
+            span = hi - lo if hi > lo else (abs(hi) if hi != 0 else 1)
+            lim = [lo - self.margin * span, hi + self.margin * span]
+        else:
+            lim = log10(get_lim()) if log else array(get_lim())
+            lim = [lim.min(), lim.max()]
+            if lim[0] <= lo and hi <= lim[1]:
+                return
+            span = max(hi, lim[1]) - min(lo, lim[0])
+            if lo < lim[0]:
+                lim[0] = lo - self.margin * span
+            if hi > lim[1]:
+                lim[1] = hi + self.margin * span
+        set_lim(10 ** array(lim) if log else lim)  # set_lim switches autoscale off
+
+    @staticmethod
+    def min_max(x, y, columns):
+        """ Decimate (x, y) to the min and max points of y in each of 'columns' consecutive chunks. """
+        n = len(y)
+        if columns <= 0 or n <= 2 * columns:
+            return x, y
+        k = n // columns
+        chunks = y[:k * columns].reshape(columns, k)
+        start = arange(columns) * k
+        idx = concatenate((start + chunks.argmin(axis=1), start + chunks.argmax(axis=1), arange(k * columns, n)))
+        idx.sort()
+        return x[idx], y[idx]
+
+    def get_limits(self):
+        return [ax.viewLim.bounds for ax in self.fig.axes] + [tuple(self.fig.bbox.size)]
+
+    def capture(self):
+        # draw the figure without lines and cache it
+        lines = [line for ax in self.fig.axes for line in ax.lines if line.get_visible()]
+        self.capturing = True
+        try:
+            for line in lines:
+                line.set_visible(False)
+            self.canvas.draw()
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        finally:
+            for line in lines:
+                line.set_visible(True)
+            self.capturing = False
+        self.limits = self.get_limits()
+
+    def update(self):
+        """ Draw the lines on the cached background. Call after set_data, before plt.pause. """
+        if not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        if self.background is None or self.limits != self.get_limits():
+            self.capture()
+        self.canvas.restore_region(self.background)
+        for ax in self.fig.axes:
+            for line in ax.lines:
+                ax.draw_artist(line)
+        self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+        self.fig.stale = False  # the figure is up to date: plt.pause must not draw it again
+
+
 class PlotObsT:
 
     """A class to plot a set of observables vs time.
@@ -703,6 +914,7 @@ class PlotObsT:
             self.axlg.append(Line2D(xdata=[0], ydata=[0], color=color, marker=marker, markersize=6, markeredgecolor='black', markeredgewidth=0.2, linewidth=0, label=val))
             self.ax.add_line(Line2D(xdata=[None], ydata=[None], color=color, marker=marker, markeredgecolor='black', markeredgewidth=0.2, linewidth=0, alpha=0.4, label=val))
         self.ax.legend(self.axlg, labels)
+        self.live = LivePlot(self.fig)
 
 class FET:
 
@@ -722,144 +934,115 @@ class FET:
             self.annealing = int
             self.sweep_rate = float
             self.comment = str
-            self.vgs = self.make_array_4_sweep(vgs)
-            self.vds = self.make_array_4_sweep(vds)
+            self.vgs_plan = SweepPlan.from_list(vgs)  # setpoints with direction and cycle labels
+            self.vds_plan = SweepPlan.from_list(vds)
+            self.vgs = self.vgs_plan.values
+            self.vds = self.vds_plan.values
             self.data = zeros((len(self.vgs), len(self.vds), 8))
 
         @staticmethod
         def make_array_4_sweep(x):
             """
             :param x: [list] In the order: start, stop, steps, lin-log, mode (0: FWD, 1: FWD-BWD, 2: LOOP), cycles
-            :return: x
+            :return: the setpoints of the sweep (see Utilities.sweep_plan.SweepPlan)
             """
-            if isinstance(x, list) and len(x) == 6:
-                if x[4] == 0:
-                    y = linspace(x[0], x[1], x[2])
-                elif x[4] == 1:
-                    y = linspace(x[0], x[1], x[2])
-                    y = concatenate((y[:-1], flip(y)))
-                elif x[4] == 2:
-                    y = linspace(x[0], x[1], x[2])
-                    y = concatenate((y[:-1], flip(y), -y[1:-1], flip(-y)))
-                if (x[4] == 1 or x[4] == 2) and (x[5] > 1):
-                    y0 = y[1:]
-                    for idx in range(x[5]-1):
-                        y = concatenate((y, y0))
-            else:
-                exit("Cannot generate array from given input... Terminate.")
-            return y
+            return SweepPlan.from_list(x).values
+
+        @staticmethod
+        def _index(mask):
+            """ Indices of the True elements of mask: a slice if they are a contiguous range (so that data is returned as a view), an array otherwise. """
+            idx = nonzero(mask)[0]
+            if len(idx) > 0 and idx[-1] - idx[0] + 1 == len(idx):
+                return slice(idx[0], idx[-1] + 1)
+            return idx
+
+        @staticmethod
+        def _sweep_index(steps):
+            """ Indices of the points reached by a step in the wanted direction (steps[k] is True), plus the point
+            preceding the first of them. """
+            idx = nonzero(steps)[0]
+            if len(idx) > 0:
+                idx = concatenate(([idx[0] - 1], idx))
+            return idx
+
+        @staticmethod
+        def _sweep_mask(steps):
+            """ Points reached by a step in the wanted direction, plus the starting point of every run of such steps. """
+            start = steps & ~concatenate(([False], steps[:-1]))
+            return steps | concatenate((start[1:], [False]))
+
+        def _take(self, rows=slice(None), cols=slice(None)):
+            """ self.data[rows, cols]: a view if rows and cols are slices, a single gather otherwise. """
+            if isinstance(rows, slice) and isinstance(cols, slice):
+                return self.data[rows, cols, :]
+            rows = arange(self.data.shape[0])[rows]
+            cols = arange(self.data.shape[1])[cols]
+            return self.data[ix_(rows, cols)]
 
         def filter_vgs_cycle(self, n):
-            newdata = zeros_like(self.data)
-            k = 0
-            for i in range(self.data.shape[0]):
-                if all(self.data[i, :, 4] == n):
-                    newdata[k, :, :] = self.data[i, :, :]
-                    k = k + 1
-            return newdata[0:k, :, :]
+            return self._take(rows=self._index((self.data[:, :, 4] == n).all(axis=1)))
 
         def filter_vds_cycle(self, n):
-            newdata = zeros_like(self.data)
-            k = 0
-            for j in range(self.data.shape[1]):
-                # if all(self.data[:, j, 5] == n):
-                if self.data[0, j, 5] == n:
-                    newdata[:, k, :] = self.data[:, j, :]
-                    k = k + 1
-            return newdata[:, 0:k, :]
+            return self._take(cols=self._index(self.data[0, :, 5] == n))
 
         def filter_vgs_fwd_sweep(self):
-            newdata = zeros_like(self.data)
-            k = 0
-            for i in range(self.data.shape[0]):
-                if i == 0:
-                    continue
-                else:
-                    if all(self.data[i, :, 0] - self.data[i-1, :, 0] > 0):
-                        if k == 0:
-                            newdata[k, :, :] = self.data[i-1, :, :]
-                            newdata[k+1, :, :] = self.data[i, :, :]
-                            k = k + 2
-                        else:
-                            newdata[k, :, :] = self.data[i, :, :]
-                            k = k + 1
-            return newdata[0:k, :, :]
+            steps = concatenate(([False], (diff(self.data[:, :, 0], axis=0) > 0).all(axis=1)))
+            return self._take(rows=self._sweep_index(steps))
 
         def filter_vgs_bkw_sweep(self):
-            newdata = zeros_like(self.data)
-            k = 0
-            for i in range(self.data.shape[0]):
-                if i == 0:
-                    continue
-                else:
-                    if all(self.data[i, :, 0] - self.data[i-1, :, 0] < 0):
-                        if k == 0:
-                            newdata[k, :, :] = self.data[i-1, :, :]
-                            newdata[k+1, :, :] = self.data[i, :, :]
-                            k = k + 2
-                        else:
-                            newdata[k, :, :] = self.data[i, :, :]
-                            k = k + 1
-            return newdata[0:k, :, :]
+            steps = concatenate(([False], (diff(self.data[:, :, 0], axis=0) < 0).all(axis=1)))
+            return self._take(rows=self._sweep_index(steps))
 
         def filter_vds_fwd_sweep(self):
-            newdata = zeros_like(self.data)
-            k = 0
-            for j in range(self.data.shape[1]):
-                if j == 0:
-                    continue
-                else:
-                    if all(self.data[:, j, 2] - self.data[:, j-1, 2] > 0):
-                        if k == 0:
-                            newdata[:, k, :] = self.data[:, j, :]
-                            newdata[:, k+1, :] = self.data[:, j-1, :]
-                            k = k + 2
-                        else:
-                            newdata[:, k, :] = self.data[:, j, :]
-                            k = k + 1
-            return newdata[:, 0:k, :]
+            steps = concatenate(([False], (diff(self.data[:, :, 2], axis=1) > 0).all(axis=0)))
+            return self._take(cols=self._sweep_index(steps))
 
         def filter_vds_bkw_sweep(self):
-            newdata = zeros_like(self.data)
-            k = 0
-            for j in range(self.data.shape[1]):
-                if j == 0:
-                    continue
-                else:
-                    #if all(self.data[:, j, 2] - self.data[:, j-1, 2] < 0):
-                    if self.data[0, j, 2] - self.data[0, j-1, 2] < 0:
-                        if k == 0:
-                            newdata[:, k, :] = self.data[:, j, :]
-                            newdata[:, k+1, :] = self.data[:, j-1, :]
-                            k = k + 2
-                        else:
-                            newdata[:, k, :] = self.data[:, j, :]
-                            k = k + 1
-            return newdata[:, 0:k, :]
+            steps = concatenate(([False], diff(self.data[0, :, 2]) < 0))
+            return self._take(cols=self._sweep_index(steps))
 
         def filter_vgs_values(self, values):
-            if len(values) == 0 or values is None:
+            if values is None or len(values) == 0:
                 return self.data
-            else:
-                newdata = zeros_like(self.data)
-                k = 0
-                for i in range(self.data.shape[0]):
-                    if unique(self.data[i, :, 0])[0] in values:
-                        newdata[k, :, :] = self.data[i, :, :]
-                        k = k + 1
-                return newdata[0:k, :, :]
+            return self._take(rows=self._index(isin(self.data[:, :, 0].min(axis=1), values)))
 
         def filter_vds_values(self, values):
-            if len(values) == 0 or values is None:
+            if values is None or len(values) == 0:
                 return self.data
-            else:
-                newdata = zeros_like(self.data)
-                k = 0
-                for j in range(self.data.shape[1]):
-                    if unique(self.data[:, j, 2])[0] in values:
-                        newdata[:, k, :] = self.data[:, j, :]
-                        k = k + 1
-                return newdata[:, 0:k, :]
+            return self._take(cols=self._index(isin(self.data[:, :, 2].min(axis=0), values)))
+
+        def select(self, cycle_vgs=None, cycle_vds=None, vgs_dir=None, vds_dir=None, vgs_values=None, vds_values=None):
+            """
+            Select data with a single combined mask on Vgs (rows) and one on Vds (columns), e.g.
+            sweep.select(cycle_vgs=0, vds_dir="bkw", vds_values=[0.1, 0.2]). Criteria set to None are not applied.
+            Directions are computed on the Vgs values of the first column and on the Vds values of the first row:
+            a point belongs to a "fwd" ("bkw") sweep if it is reached by increasing (decreasing) the voltage, or if a
+            fwd (bkw) sweep starts from it.
+            :param cycle_vgs: [int] Vgs cycle
+            :param cycle_vds: [int] Vds cycle
+            :param vgs_dir: [str] "fwd" or "bkw"
+            :param vds_dir: [str] "fwd" or "bkw"
+            :param vgs_values: [list] Vgs values
+            :param vds_values: [list] Vds values
+            :return: data array, a view of self.data if the selected rows and columns are contiguous
+            """
+            rows = ones(self.data.shape[0], dtype=bool)
+            cols = ones(self.data.shape[1], dtype=bool)
+            if cycle_vgs is not None:
+                rows &= (self.data[:, :, 4] == cycle_vgs).all(axis=1)
+            if cycle_vds is not None:
+                cols &= self.data[0, :, 5] == cycle_vds
+            if vgs_dir is not None:
+                step = diff(self.data[:, 0, 0]) if vgs_dir == "fwd" else -diff(self.data[:, 0, 0])
+                rows &= self._sweep_mask(concatenate(([False], step > 0)))
+            if vds_dir is not None:
+                step = diff(self.data[0, :, 2]) if vds_dir == "fwd" else -diff(self.data[0, :, 2])
+                cols &= self._sweep_mask(concatenate(([False], step > 0)))
+            if vgs_values is not None and len(vgs_values) > 0:
+                rows &= isin(self.data[:, :, 0].min(axis=1), vgs_values)
+            if vds_values is not None and len(vds_values) > 0:
+                cols &= isin(self.data[:, :, 2].min(axis=0), vds_values)
+            return self._take(rows=self._index(rows), cols=self._index(cols))
 
         def plot_output_characteristic(self):
             """Plot output characteristic"""
@@ -1,9 +1,10 @@
 # region ----- Import packages -----
 import keithley_smu236
+import visa_simulator
 import pyvisa
 from Objects.measurement import *
 import os
-from numpy import linspace, savetxt, floor, log10, ceil, log
+from numpy import linspace, savetxt, floor, log10, ceil, concatenate, full, arange
 import time
 import datetime
 import pickle
@@ -45,6 +46,7 @@ fet.illumination = 0  # [int] illumination {0: dark, 1: light}
 fet.annealing = 0  # [int] {0: not annealed, 1: annealed}
 fet.temperature = 273.15 + 25  # [float] temperature (in K)
 fet.comment = ""
+simulate = False  # [bool] run the script on simulated units (visa_simulator) instead of the instruments
 # endregion
 
 # region ----- Settings ------
@@ -83,7 +85,7 @@ experiment.settings = settings
 
 # region ----- Read resources and create instrumentation objects -----
 print("Listing instrumentation... ")
-rm = pyvisa.ResourceManager()
+rm = visa_simulator.ResourceManager({settings.smu_vgs.address: "smu236", settings.smu_vds.address: "smu236"}) if simulate else pyvisa.ResourceManager()
 try:
     # define voltage source object for device gate
     smu_vgs = keithley_smu236.smu236(visa=rm.open_resource(settings.smu_vgs.address))
@@ -99,13 +101,59 @@ except pyvisa.VisaIOError as e:
 # endregion
 
 # region ----- Configure instrumentation -----
-if sweep == 0 or sweep == 1:
-    smu_vgs.bias("v", 0, settings.smu_vgs.source_range, settings.smu_vgs.sense_range, settings.smu_vgs.delay,
-                 settings.smu_vgs.samples, settings.smu_vgs.integration_time, settings.smu_vgs.sensing,
-                 settings.smu_vgs.compliance)
-smu_vds.bias("v", 0, settings.smu_vds.source_range, settings.smu_vds.sense_range, settings.smu_vds.delay,
-             settings.smu_vds.samples, settings.smu_vds.integration_time, settings.smu_vds.sensing,
-             settings.smu_vds.compliance)
+# Each line of the sweep (a Vgs sweep at constant Vds, or a Vds sweep at constant Vgs) is a staircase sourced by the
+# "sweep" smu from its buffer, followed by a ramp back to the start of the line. The "step" smu sources a fixed staircase
+# with the same number of points at the level of the line, so that both currents are measured at each point.
+# Both staircases are triggered over the bus, and both buffers are read in one talk at the end of the line.
+# Note: for the points of the two smus to be simultaneous, set the same delay and integration time on both units.
+# Between lines the units source their bias level, which is ramped from one line to the next.
+if sweep == 0:  # lines at constant Vds, Vgs swept by the gate smu
+    smu_sweep, smu_step, set_sweep, set_step = smu_vgs, smu_vds, settings.smu_vgs, settings.smu_vds
+    line, levels = fet.vgs, fet.vds
+elif sweep == 1:  # lines at constant Vgs, Vds swept by the drain smu
+    smu_sweep, smu_step, set_sweep, set_step = smu_vds, smu_vgs, settings.smu_vds, settings.smu_vgs
+    line, levels = fet.vds, fet.vgs
+elif sweep == 2:  # a single line, Vds swept by the drain smu, floating gate
+    smu_sweep, smu_step, set_sweep, set_step = smu_vds, None, settings.smu_vds, None
+    line, levels = fet.vds, [0]
+ramp = linspace(line[-1], line[0], int(ceil(abs(line[-1] - line[0]) / set_sweep.ramp_step)) + 1)[1:]
+smu_sweep.program_sweep("v", concatenate((line, ramp)), set_sweep.source_range, set_sweep.sense_range, set_sweep.delay * 1e3,
+                        set_sweep.samples, set_sweep.integration_time, set_sweep.sensing, set_sweep.compliance)
+smu_sweep.set_bias_level(bias=0)
+smu_sweep.switch_on()
+if smu_step is not None:
+    smu_step.program_sweep("v", full(len(line), levels[0]), set_step.source_range, set_step.sense_range, set_step.delay * 1e3,
+                           set_step.samples, set_step.integration_time, set_step.sensing, set_step.compliance)
+    smu_step.set_bias_level(bias=0)
+    smu_step.switch_on()
+# endregion
+
+# region ----- Sweep engine -----
+
+
+def ramp_bias(smu, start, stop, s):
+    # ramp the bias level of smu from start to stop with the ramp step and delay of its settings s
+    for x in linspace(start, stop, int(ceil(abs(stop - start) / s.ramp_step)) + 1):
+        smu.set_bias_level(bias=x, delay=s.ramp_delay)
+
+
+def measure_line():
+    # Trigger the staircases, wait for the "sweep done" service requests and read the buffers in one talk each. Return the
+    # buffers (fields "source", "measure" and "time") of the sweep and the step smu (None if there is no step smu) at the
+    # points of the line, and the time of the trigger (from t0).
+    t_start = datetime.datetime.now().timestamp() - t0
+    if smu_step is not None:
+        smu_step.send_trigger()
+    smu_sweep.send_trigger()
+    smu_sweep.wait_for_srq()
+    buffer = smu_sweep.read_buffer()
+    step_buffer = None
+    if smu_step is not None:
+        smu_step.wait_for_srq()
+        step_buffer = smu_step.read_buffer()
+    if len(buffer) != len(line) + len(ramp) or (smu_step is not None and len(step_buffer) != len(line)):
+        exit("The number of points read from the buffer does not match the programmed staircase... Execution terminated.")
+    return buffer[:len(line)], step_buffer, t_start
 # endregion
 
 # region ----- Message to the user -----
@@ -155,275 +203,65 @@ fig_name = f"{experiment.filename[:-5]}.png"
 fig_backup_name = fig_name + ".bak"
 print("Done.")  # endregion
 
-if sweep == 0:
-
-    t0 = datetime.datetime.now().timestamp()
-
-    for i in range(len(fet.vds)):
-
-        # region ----- Set vds -----
-        print(f"Setting Vds to {fet.vds[i]:.3f} V... ", end="")
-        if i == 0 and fet.vds[0] == 0:
-            pass
-        elif i == 0 and fet.vds[0] != 0:
-            for x in linspace(0, fet.vds[i], int(ceil(abs(fet.vds[i]) / settings.smu_vds.ramp_step) + 1)):
-                smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.ramp_delay)
-        else:
-            for x in linspace(fet.vds[i - 1], fet.vds[i], int(ceil(abs(fet.vds[i] - fet.vds[i - 1]) / settings.smu_vds.ramp_step) + 1)):
-                smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.ramp_delay)
-        print("Done.")
-        # endregion
-
-        # region ----- Wait for steady state -----
-        t0 = time.time()
-        while time.time() - t0 <= settings.smu_vds.delay_init:
-            plt.pause(0.001)
-            continue
-        # endregion
-
-        # region ----- Measure and plot in real time -----
-        print("Measuring... ", end="")
-        for j in range(len(fet.vgs)):
-
-            # region ----- Set vgs -----
-            if i == 0 and j == 0 and fet.vgs[0] != 0:
-                for x in linspace(0, fet.vgs[j], int(abs(fet.vgs[j] - 0) / settings.smu_vgs.ramp_step) + 1):
-                    smu_vgs.set_bias_level(bias=x, delay=settings.smu_vgs.ramp_delay)
-                # region ----- Wait for steady state -----
-                dt = time.time()
-                while time.time() - dt <= settings.smu_vgs.delay_init:
-                    plt.pause(0.001)
-                    continue
-                # endregion
-            elif i > 0 and j == 0 and fet.vgs[0] != fet.vgs[-1]:
-                for x in linspace(fet.vgs[-1], fet.vgs[0],
-                                  int(abs(fet.vgs[-1] - fet.vgs[0]) / settings.smu_vgs.ramp_step) + 1):
-                    smu_vgs.set_bias_level(bias=x, delay=settings.smu_vgs.ramp_delay)
-                # region ----- Wait for steady state -----
-                dt = time.time()
-                while time.time() - dt <= settings.smu_vgs.delay_init:
-                    plt.pause(0.001)
-                    continue
-                # endregion
-            else:
-                smu_vgs.set_bias_level(bias=fet.vgs[j], delay=settings.smu_vgs.delay)
-            # endregion
-
-            # region ----- Get data -----
-            fet.data[j, i, 0], fet.data[j, i, 1] = smu_vgs.read()  # return source, measure
-            fet.data[j, i, 2], fet.data[j, i, 3] = smu_vds.read()  # return source, measure
-            fet.data[j, i, 4] = floor(j / (len(fet.vgs) / vgs[5]))  # store number of iteration, starting from 0
-            fet.data[j, i, 5] = floor(i / (len(fet.vds) / vds[5]))  # store number of iteration, starting from 0
-            fet.data[j, i, 6] = datetime.datetime.now().timestamp() - t0  # store datetime
-            # endregion
-
-            # region ----- Update figure -----
-            plot1.ax0.lines[2 * i + 0].set_data(fet.data[0: j + 1, i, 0], fet.data[0: j + 1, i, 1])
-            plot1.ax0.lines[2 * i + 1].set_data(fet.data[0: j + 1, i, 0], fet.data[0: j + 1, i, 3])
-            plot1.ax0.relim()
-            plot1.ax0.autoscale_view(scalex=False, scaley=True)
-            plot1.ax1.lines[2 * i + 0].set_data(fet.data[0: j + 1, i, 0], log10(abs(fet.data[0: j + 1, i, 1])))
-            plot1.ax1.lines[2 * i + 1].set_data(fet.data[0: j + 1, i, 0], log10(abs(fet.data[0: j + 1, i, 3])))
-            plot1.ax1.relim()
-            plot1.ax1.autoscale_view(scalex=False, scaley=True)
-            plt.pause(1e-3)
-            # endregion
-
-        print("Done.")  # endregion
-
-        # region ----- Save data and figure to disc -----
-        print("Saving data to disc...", end="")
-        experiment.data = fet
-        if os.path.exists(experiment.filename):
-            if os.path.exists(experiment.backupname):
-                os.remove(experiment.backupname)
-            os.rename(experiment.filename, experiment.backupname)
-        with open(experiment.filename, "wb") as file:
-            pickle.dump(experiment, file)
-
-        if os.path.exists(fig_name):
-            if os.path.exists(fig_backup_name):
-                os.remove(fig_backup_name)
-            os.rename(fig_name, fig_backup_name)
-        plt.savefig(fname=fig_name, format="png")
-
-        if os.path.exists(experiment.filename[:-4] + "txt"):
-            if os.path.exists(experiment.backupname[:-8] + "txt.bak"):
-                os.remove(experiment.backupname[:-8] + "txt.bak")
-            os.rename(experiment.filename[:-4] + "txt", experiment.backupname[:-8] + "txt.bak")
-        txt = []
-        for k in range(fet.data.shape[1]):
-            for q in range(fet.data.shape[0]):
-                txt.append(fet.data[q, k, :])
-        savetxt(experiment.filename[:-4] + "txt", txt, delimiter=",", newline='\n', header="vgs,igs,vds,ids,cycle,time",
-                comments="# "+fet.comment+"\n", footer='', encoding=None)
-        print("Done.")  # endregion
-
-    # region ----- Set Vds to 0 V -----
-    print("Sweeping Vds from {} V to 0 V... ".format(fet.vds[-1]), end="")
-    for x in linspace(fet.vds[-1], 0, int(ceil(abs(fet.vds[-1]) / settings.smu_vds.ramp_step) + 1)):
-        smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.ramp_delay)
-    print("Done.")  # endregion
-
-    # region ----- Set Vgs to 0 V -----
-    print("Sweeping Vgs from {} V to 0 V... ".format(fet.vgs[-1]), end="")
-    for x in linspace(fet.vgs[-1], 0, int(ceil(abs(fet.vgs[-1]) / settings.smu_vgs.ramp_step) + 1)):
-        smu_vgs.set_bias_level(bias=x, delay=settings.smu_vgs.ramp_delay)
-    print("Done.")  # endregion
-
-if sweep == 1:
+t0 = datetime.datetime.now().timestamp()
 
-    t0 = datetime.datetime.now().timestamp()
+# region ----- Set the start of the line -----
+print(f"Setting the start of the line to {line[0]:.3f} V... ", end="")
+ramp_bias(smu_sweep, 0, line[0], set_sweep)
+smu_sweep.set_bias_level(bias=line[0], delay=set_sweep.delay_init)
+print("Done.")
+# endregion
 
-    for i in range(len(fet.vgs)):
+for i in range(len(levels)):
 
-        # region ----- Set vgs -----
-        print(f"Setting Vgs to {fet.vgs[i]:.3f} V... ", end="")
-        if i == 0 and fet.vgs[0] == 0:
-            pass
-        elif i == 0 and fet.vgs[0] != 0:
-            for x in linspace(0, fet.vgs[i], int(ceil(abs(fet.vgs[i]) / settings.smu_vgs.ramp_step) + 1)):
-                smu_vgs.set_bias_level(bias=x, delay=settings.smu_vgs.ramp_delay)
-        else:
-            for x in linspace(fet.vgs[i - 1], fet.vgs[i], int(ceil(abs(fet.vgs[i] - fet.vgs[i - 1]) / settings.smu_vgs.ramp_step) + 1)):
-                smu_vgs.set_bias_level(bias=x, delay=settings.smu_vgs.ramp_delay)
+    # region ----- Set the level of the line -----
+    if smu_step is not None:
+        print(f"Setting {'Vds' if sweep == 0 else 'Vgs'} to {levels[i]:.3f} V... ", end="")
+        ramp_bias(smu_step, 0 if i == 0 else levels[i - 1], levels[i], set_step)
+        smu_step.create_fixed_staircase(levels[i], set_step.source_range, set_step.delay * 1e3, len(line))
         print("Done.")
-        # endregion
-
         # region ----- Wait for steady state -----
-        t0 = time.time()
-        while time.time() - t0 <= settings.smu_vgs.delay_init:
+        dt = time.time()
+        while time.time() - dt <= set_step.delay_init:
             plt.pause(0.001)
             continue
         # endregion
+    # endregion
 
-        # region ----- Measure and plot in real time -----
-        print("Measuring... ", end="")
-        for j in range(len(fet.vds)):
-
-            # region ----- Set vds -----
-            if i == 0 and j == 0 and fet.vds[0] != 0:
-                for x in linspace(0, fet.vds[j], int(abs(fet.vds[j] - 0) / settings.smu_vds.ramp_step) + 1):
-                    smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.ramp_delay)
-                # region ----- Wait for steady state -----
-                dt = time.time()
-                while time.time() - dt <= settings.smu_vds.delay_init:
-                    plt.pause(0.001)
-                    continue
-                # endregion
-            elif i > 0 and j == 0 and fet.vds[0] != fet.vds[-1]:
-                for x in linspace(fet.vds[-1], fet.vds[0],
-                                  int(abs(fet.vds[-1] - fet.vds[0]) / settings.smu_vds.ramp_step) + 1):
-                    smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.ramp_delay)
-                # region ----- Wait for steady state -----
-                dt = time.time()
-                while time.time() - dt <= settings.smu_vds.delay_init:
-                    plt.pause(0.001)
-                    continue
-                # endregion
-            else:
-                smu_vds.set_bias_level(bias=fet.vds[j], delay=settings.smu_vds.delay)
-            # endregion
-
-            # region ----- Get data -----
-            if sweep == 1:
-                fet.data[i, j, 0], fet.data[i, j, 1] = smu_vgs.read()  # return source, measure
-            fet.data[i, j, 2], fet.data[i, j, 3] = smu_vds.read()  # return source, measure
-            fet.data[i, j, 4] = floor(i / (len(fet.vgs) / vgs[5]))  # store number of vgs iteration, starting from 0
-            fet.data[i, j, 5] = floor(j / (len(fet.vds) / vds[5]))  # store number of vds iteration, starting from 0
-            fet.data[i, j, 6] = datetime.datetime.now().timestamp() - t0  # store datetime
-            # endregion
-
-            # region ----- Update figure -----
-            if sweep == 1:
-                plot1.ax0.lines[2 * i + 0].set_data(fet.data[i, 0: j + 1, 2], fet.data[i, 0: j + 1, 1])
-            plot1.ax0.lines[2 * i + 1].set_data(fet.data[i, 0: j + 1, 2], fet.data[i, 0: j + 1, 3])
-            plot1.ax0.relim()
-            plot1.ax0.autoscale_view(scalex=False, scaley=True)
-            if sweep == 1:
-                plot1.ax1.lines[2 * i + 0].set_data(fet.data[i, 0: j + 1, 2], log10(abs(fet.data[i, 0: j + 1, 1])))
-            plot1.ax1.lines[2 * i + 1].set_data(fet.data[i, 0: j + 1, 2], log10(abs(fet.data[i, 0: j + 1, 3])))
-            plot1.ax1.relim()
-            plot1.ax1.autoscale_view(scalex=False, scaley=True)
-            plt.pause(1e-3)
-            # endregion
-
-        print("Done.")  # endregion
-
-        # region ----- Save data and figure to disc -----
-        print("Saving data to disc...", end="")
-        experiment.data = fet
-        if os.path.exists(experiment.filename):
-            if os.path.exists(experiment.backupname):
-                os.remove(experiment.backupname)
-            os.rename(experiment.filename, experiment.backupname)
-        with open(experiment.filename, "wb") as file:
-            pickle.dump(experiment, file)
-
-        if os.path.exists(fig_name):
-            if os.path.exists(fig_backup_name):
-                os.remove(fig_backup_name)
-            os.rename(fig_name, fig_backup_name)
-        plt.savefig(fname=fig_name, format="png")
-
-        if os.path.exists(experiment.filename[:-4] + "txt"):
-            if os.path.exists(experiment.backupname[:-8] + "txt.bak"):
-                os.remove(experiment.backupname[:-8] + "txt.bak")
-            os.rename(experiment.filename[:-4] + "txt", experiment.backupname[:-8] + "txt.bak")
-        txt = []
-        for k in range(fet.data.shape[1]):
-            for q in range(fet.data.shape[0]):
-                txt.append(fet.data[q, k, :])
-        savetxt(experiment.filename[:-4] + "txt", txt, delimiter=",", newline='\n',
-                header="vgs,igs,vds,ids,vgs cycle,vds cycle, time", comments="# "+fet.comment+"\n", footer='', encoding=None)
-        print("Done.")  # endregion
-
-    # region ----- Set Vds to 0 V -----
-    print(f"Sweeping Vds from {fet.vds[-1]:.3f} V to 0 V... ", end="")
-    for x in linspace(fet.vds[-1], 0, int(ceil(abs(fet.vds[-1]) / settings.smu_vds.ramp_step) + 1)):
-        smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.delay)
-    print("Done.")  # endregion
-
-    # region ----- Set Vgs to 0 V -----
-    print(f"Sweeping Vgs from {fet.vgs[-1]:.3f} V to 0 V... ", end="")
-    for x in linspace(fet.vgs[-1], 0, int(ceil(abs(fet.vgs[-1]) / settings.smu_vgs.ramp_step) + 1)):
-        smu_vgs.set_bias_level(bias=x, delay=settings.smu_vgs.ramp_delay)
-    print("Done.")  # endregion
-
-if sweep == 2:
-
-    t0 = datetime.datetime.now().timestamp()
-
-    # region ----- Measure and plot in real time -----
+    # region ----- Measure the line -----
     print("Measuring... ", end="")
-    for j in range(len(fet.vds)):
-
-        # region ----- Set vds -----
-        if j == 0 and fet.vds[0] != 0:
-            for x in linspace(0, fet.vds[j], int(ceil(abs(fet.vds[j] - 0) / settings.smu_vds.ramp_step) + 1)):
-                smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.ramp_delay)
-        else:
-            smu_vds.set_bias_level(bias=fet.vds[j], delay=settings.smu_vds.delay)
-        # endregion
-
-        # region ----- Get data -----
-        fet.data[0, j, 2], fet.data[0, j, 3] = smu_vds.read()  # return source, measure
-        fet.data[0, j, 4] = floor(0 / (len(fet.vgs) / vgs[5]))  # store number of vgs iteration, starting from 0
-        fet.data[0, j, 5] = floor(j / (len(fet.vds) / vds[5]))  # store number of vds iteration, starting from 0
-        fet.data[0, j, 6] = datetime.datetime.now().timestamp() - t0  # store datetime
-        # endregion
-
-        # region ----- Update figure -----
-        plot1.ax0.lines[0].set_data(fet.data[0, 0: j + 1, 2], fet.data[0, 0: j + 1, 3])
-        plot1.ax0.relim()
-        plot1.ax0.autoscale_view(scalex=False, scaley=True)
-        plot1.ax1.lines[0].set_data(fet.data[0, 0: j + 1, 2], log(abs(fet.data[0, 0: j + 1, 3])))
-        plot1.ax1.relim()
-        plot1.ax1.autoscale_view(scalex=False, scaley=True)
-        plt.pause(1e-3)
-        # endregion
-
-    print("Done.")  # endregion
+    buffer, step_buffer, t_start = measure_line()
+    # sweep == 0: the line is a column of fet.data (Vgs swept), else a row (Vds swept)
+    row, col = (slice(None), i) if sweep == 0 else (i, slice(None))
+    if sweep == 0:
+        fet.data[row, col, 0], fet.data[row, col, 1] = buffer["source"], buffer["measure"]  # gate: source, measure
+        fet.data[row, col, 2], fet.data[row, col, 3] = step_buffer["source"], step_buffer["measure"]  # drain: source, measure
+    else:
+        fet.data[row, col, 2], fet.data[row, col, 3] = buffer["source"], buffer["measure"]  # drain: source, measure
+        if sweep == 1:
+            fet.data[row, col, 0], fet.data[row, col, 1] = step_buffer["source"], step_buffer["measure"]  # gate: source, measure
+    fet.data[row, col, 4] = floor(arange(len(fet.vgs)) / (len(fet.vgs) / vgs[5]))[row]  # store number of vgs iteration, starting from 0
+    fet.data[row, col, 5] = floor(arange(len(fet.vds)) / (len(fet.vds) / vds[5]))[col]  # store number of vds iteration, starting from 0
+    fet.data[row, col, 6] = t_start + buffer["time"] * 1e-3  # store time (the buffer time is in ms from the trigger)
+    print("Done.")
+    # endregion
+
+    # region ----- Update figure -----
+    x = fet.data[row, col, 0] if sweep == 0 else fet.data[row, col, 2]
+    if sweep == 2:  # ax1 has a log scale
+        plot1.ax0.lines[0].set_data(x, fet.data[row, col, 3])
+        plot1.ax1.lines[0].set_data(x, abs(fet.data[row, col, 3]))
+    else:
+        plot1.ax0.lines[2 * i + 0].set_data(x, fet.data[row, col, 1])
+        plot1.ax0.lines[2 * i + 1].set_data(x, fet.data[row, col, 3])
+        plot1.ax1.lines[2 * i + 0].set_data(x, log10(abs(fet.data[row, col, 1])))
+        plot1.ax1.lines[2 * i + 1].set_data(x, log10(abs(fet.data[row, col, 3])))
+    plot1.ax0.relim()
+    plot1.ax0.autoscale_view(scalex=False, scaley=True)
+    plot1.ax1.relim()
+    plot1.ax1.autoscale_view(scalex=False, scaley=True)
+    plt.pause(1e-3)
+    # endregion
 
     # region ----- Save data and figure to disc -----
     print("Saving data to disc...", end="")
@@ -450,14 +288,18 @@ if sweep == 2:
         for q in range(fet.data.shape[0]):
             txt.append(fet.data[q, k, :])
     savetxt(experiment.filename[:-4] + "txt", txt, delimiter=",", newline='\n',
-            header="vgs,igs,vds,ids,vgs cycle,vds cycle, time", comments="# "+fet.comment+"\n", footer='', encoding=None)
+            header="vgs,igs,vds,ids,vgs cycle,vds cycle,time,dvds", comments="# "+fet.comment+"\n", footer='', encoding=None)
     print("Done.")  # endregion
 
-    # region ----- Set Vds to 0 V -----
-    print(f"Sweeping Vds from {fet.vds[-1]:.3f} V to 0 V... ", end="")
-    for x in linspace(fet.vds[-1], 0, int(ceil(abs(fet.vds[-1]) / settings.smu_vds.ramp_step) + 1)):
-        smu_vds.set_bias_level(bias=x, delay=settings.smu_vds.delay)
-    print("Done.")  # endregion
+# region ----- Set outputs to 0 V -----
+print(f"Sweeping {'Vgs' if sweep == 0 else 'Vds'} from {line[0]:.3f} V to 0 V... ", end="")
+ramp_bias(smu_sweep, line[0], 0, set_sweep)
+print("Done.")
+if smu_step is not None:
+    print(f"Sweeping {'Vds' if sweep == 0 else 'Vgs'} from {levels[-1]:.3f} V to 0 V... ", end="")
+    ramp_bias(smu_step, levels[-1], 0, set_step)
+    print("Done.")
+# endregion
 
 # region ----- Turn SMU(s) off -----
 print("Switching off SMU(s)... ", end="")
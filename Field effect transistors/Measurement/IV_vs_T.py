@@ -9,6 +9,8 @@ from numpy import ctypeslib, log10, floor, ones
 import pickle
 from Objects.measurement import *
 from Utilities.signal_processing import *
+from Utilities.poller import Poller, store
+from Utilities.settling import SettlingDetector
 import datetime
 # endregion
 
@@ -61,6 +63,10 @@ settings.tc.t_switch = 50                   # [float] temperature (in K) below w
 settings.tc.sampling_freq = 1               # [int] temperature sampling frequency (in Hz)
 settings.tc.settling_time = 15 * 60         # [float] cryostat thermalization time (in s).
 settings.tc.settling_time_init = 1 * 1 * 60    # [float] cryostat initial thermalization time (in s).
+settings.tc.settling_adaptive = True        # [bool] stop waiting as soon as stage and shield are settled (settling_time is then the max. waiting time)
+settings.tc.settling_tolerance = 0.05       # [float] max. distance (in K) of the stage temperature from the setpoint
+settings.tc.settling_drift = 1e-3           # [float] max. drift (in K/min) of stage and shield temperatures
+settings.tc.settling_window = 60            # [float] time (in s) over which drift and distance from the setpoint are estimated
 # ----- adc settings -----
 settings.__setattr__("adc", EmptyClass())
 settings.adc.model = 0                      # [int] select adc model (0: adwin gold ii)
@@ -201,30 +207,36 @@ if annealing[0] is not None and settings.tc.address is not None:
     print(f"Waiting for thermalization at {settling_time:04.1f} K...", end="")
 
     # allocate RAM
-    ts = zeros(int(ceil(settling_time * settings.tc.sampling_freq)))
-    stage = zeros_like(time)
-    shield = zeros_like(time)
-
-    # record data
-    k = 0
-    t0 = time.time()
+    tt = EmptyClass()
+    tt.time = zeros(int(ceil(settling_time * settings.tc.sampling_freq)))
+    tt.stage = zeros_like(tt.time)
+    tt.shield = zeros_like(tt.time)
+
+    # record data: the temperature controller is sampled on a fixed schedule in a background thread, and the plot is updated from the main thread
+    poller = Poller(1 / settings.tc.sampling_freq, samples=len(tt.time))
+    poller.add_channel("tc", tc.read_temperature, "all", fields=["stage", "shield", None, None])
+    poller.add_sink(store(tt, ["stage", "shield"]))
+    samples = poller.subscribe()
     plot0.ax.set_xlim([0, settling_time])  # duration must be updated because the initial settling time is different from the regular time
     setpoint_line = plot0.ax.add_line(Line2D(xdata=array([0, settling_time]), ydata=array([annealing[0], annealing[0]]), color="grey", linewidth=1, linestyle="--"))  # add setpoint
-    while time.time() - t0 <= settling_time:
-        ts[k] = time.time() - t0
-        stage[k] = tc.read_temperature("a")
-        shield[k] = tc.read_temperature("b")
-        plot0.ax.lines[0].set_data(ts[0:k+1], stage[0:k+1])
-        plot0.ax.lines[1].set_data(ts[0:k+1], shield[0:k+1])
-        plot0.ax.relim()
-        plot0.ax.autoscale_view("y")
+    k = 0
+    poller.start()
+    while poller.is_alive() or not samples.empty():
+        new_samples = Poller.drain(samples)
+        if new_samples:
+            k = new_samples[-1]["index"] + 1
+            plot0.ax.lines[0].set_data(tt.time[0:k], tt.stage[0:k])
+            plot0.ax.lines[1].set_data(tt.time[0:k], tt.shield[0:k])
+            plot0.ax.relim()
+            plot0.ax.autoscale_view("y")
         plt.pause(1 / settings.tc.sampling_freq)
-        k = k + 1
+    if poller.error is not None:
+        raise poller.error
 
     # remove trailing zeros from saved data
-    ts = ts[0:k]
-    stage = stage[0:k]
-    shield = shield[0:k]
+    ts = tt.time[0:k]
+    stage = tt.stage[0:k]
+    shield = tt.shield[0:k]
 
     print("Done.")  # endregion
 
@@ -256,30 +268,38 @@ for idx_t, val_t in enumerate(t):
         else:
             settling_time = settings.tc.settling_time
 
-        # record data
-        k = 0
-        t0 = time.time()
+        # record data: the temperature controller is sampled on a fixed schedule in a background thread, and the plot is updated from the main thread
+        tt = fet.t[idx_t]["tt"]
+        poller = Poller(1 / settings.tc.sampling_freq, samples=len(tt.time))
+        poller.add_channel("tc", tc.read_temperature, "all", fields=["stage", "shield", None, None])
+        poller.add_sink(store(tt, ["stage", "shield"]))
+        samples = poller.subscribe()
+        detector = SettlingDetector({"stage": val_t, "shield": None}, settings.tc.settling_tolerance, settings.tc.settling_drift, settings.tc.settling_window)
         if idx_t > 0:
             setpoint_line.remove()
         plot0.ax.set_xlim([0, settling_time])  # duration must be updated because the initial settling time is different from the regular time
         setpoint_line = plot0.ax.add_line(Line2D(xdata=array([0, settling_time]), ydata=array([val_t, val_t]), color="grey", linewidth=1, linestyle="--"))  # add setpoint
-        while time.time() - t0 <= settling_time:
-            fet.t[idx_t]["tt"].time[k] = time.time() - t0
-            fet.t[idx_t]["tt"].stage[k] = tc.read_temperature("a")
-            fet.t[idx_t]["tt"].shield[k] = tc.read_temperature("b")
-            plot0.ax.lines[0].set_data(fet.t[idx_t]["tt"].time[0:k+1], fet.t[idx_t]["tt"].stage[0:k+1])
-            plot0.ax.lines[1].set_data(fet.t[idx_t]["tt"].time[0:k+1], fet.t[idx_t]["tt"].shield[0:k+1])
-            plot0.ax.relim()
-            plot0.ax.autoscale_view("y")
+        k = 0
+        poller.start()
+        while poller.is_alive() or not samples.empty():
+            new_samples = Poller.drain(samples)
+            if new_samples:
+                k = new_samples[-1]["index"] + 1
+                plot0.live.set_data(plot0.ax.lines[0], tt.time[0:k], tt.stage[0:k])
+                plot0.live.set_data(plot0.ax.lines[1], tt.time[0:k], tt.shield[0:k])
+                plot0.live.update()
+                if detector.update(new_samples) and settings.tc.settling_adaptive:
+                    poller.stop()  # settled: the remaining thermalization time is skipped
             plt.pause(1 / settings.tc.sampling_freq)
-            k = k + 1
+        if poller.error is not None:
+            raise poller.error
 
         # remove trailing zeros from saved data
         fet.t[idx_t]["tt"].time = fet.t[idx_t]["tt"].time[0:k]
         fet.t[idx_t]["tt"].stage = fet.t[idx_t]["tt"].stage[0:k]
         fet.t[idx_t]["tt"].shield = fet.t[idx_t]["tt"].shield[0:k]
 
-        print("Done.")  # endregion
+        print(f"Done (settled in {detector.settled_at:.0f} s)." if detector.ready else "Done.")  # endregion
 
         # save figure to disc
         print("Saving thermalization figure to disc... ", end="")
@@ -167,7 +167,7 @@ for idx, val in enumerate(bias):
                      "data": {"frequency": f,
                               "impedance_modulus": r,
                               "impedance_phase": p},
-                     "settings": {"impedance_analyzer": impedance_analyzer.read_settings()}}, file)
+                     "settings": {"impedance_analyzer": settings}}, file)
 
     txt_data = np.array([f, r, p]).T
     # txt_settings = str(impedance_analyzer.read_settings())
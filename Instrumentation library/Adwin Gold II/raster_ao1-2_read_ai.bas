@@ -0,0 +1,139 @@
+'<ADbasic Header, Headerversion 001.001>
+' Process_Number                 = 8
+' Initial_Processdelay           = 1000
+' Eventsource                    = Timer
+' Control_long_Delays_for_Stop   = No
+' Priority                       = High
+' Version                        = 1
+' ADbasic_Version                = 6.3.1
+' Optimize                       = Yes
+' Optimize_Level                 = 1
+' Stacksize                      = 1000
+' Info_Last_Save                 = DDM05677  EMPA\dabe
+'<Header End>
+' raster_ao1-2_read_ai.bas: ramps AO1 and AO2 through the points of a 2D raster (DATA_21, DATA_22). At each point waits
+' PAR_44 loops, then records PAR_36 samples of AI1 ... AI(2 x PAR_37), each averaged over PAR_43 loops.
+' PAR_33 and PAR_34 are not used, so that the settings of the other processes are kept.
+' Samples are written in the FIFO DATA_40 as: point 1 sample 1 AI1 ... AI(2 x PAR_37), point 1 sample 2 AI1 ..., so that
+' the host reads them in chunks while the raster is running.
+
+'ADC-DAC parameters (31-40):
+'PAR_31 = ADC resolution
+'PAR_32 = DAC resolution
+'PAR_35 = point index (current point, the number of points completed is PAR_35-1)
+'PAR_36 = number of samples per point
+'PAR_37 = number of input pairs (1 -> AI1-2, 2 -> AI1-4, ..., 8 -> AI1-16)
+'PAR_38 = maximum output step per loop (in bins)
+'PAR_39 = number of samples lost because the FIFO was full (should be 0)
+
+'process parameters (41-80):
+'PAR_41 = number of points of the raster (length of DATA_21 and DATA_22)
+'PAR_43 = number of points to average in-hardware for each sample
+'PAR_44 = number of loops to wait after reaching a point
+
+'PAR_51 = current analog output 1 value (the raster starts from PAR_51 and PAR_52)
+'PAR_52 = current analog output 2 value
+
+
+#INCLUDE ADwinGoldII.inc
+
+'AO arrays: 21-22
+DIM DATA_21[50000] as long   'AO1 raster points - (bin values)
+DIM DATA_22[50000] as long   'AO2 raster points - (bin values)
+'AI FIFO
+DIM DATA_40[1000000] as float at dram_extern as fifo   'AI samples - (bin values)
+
+DIM flag as long
+DIM sum[16] as float
+DIM idx_avg, idx_wait, idx_sample, idx_ch as long
+DIM idx_scan as long  'index of current point
+DIM v1, v2 as long
+
+INIT:
+  flag = 0
+  idx_avg = 0
+  idx_wait = 0
+  idx_sample = 0
+  idx_scan = 1
+  FOR idx_ch = 1 TO 16
+    sum[idx_ch] = 0
+  NEXT idx_ch
+  FIFO_CLEAR(40)
+
+  PAR_35 = idx_scan
+  PAR_39 = 0
+  IF (PAR_38 < 1) THEN PAR_38 = 1
+
+  v1 = PAR_51
+  v2 = PAR_52
+
+
+EVENT:
+
+  SELECTCASE flag '0 = ramp to next point ; 1 = wait ; 2 = measure
+
+    CASE 0 'ramp analog outputs --------------------------------
+
+      IF (v1 < DATA_21[idx_scan]) THEN v1 = v1 + MIN_LONG(PAR_38, DATA_21[idx_scan] - v1)
+      IF (v1 > DATA_21[idx_scan]) THEN v1 = v1 - MIN_LONG(PAR_38, v1 - DATA_21[idx_scan])
+      IF (v2 < DATA_22[idx_scan]) THEN v2 = v2 + MIN_LONG(PAR_38, DATA_22[idx_scan] - v2)
+      IF (v2 > DATA_22[idx_scan]) THEN v2 = v2 - MIN_LONG(PAR_38, v2 - DATA_22[idx_scan])
+      DAC(1, v1)
+      DAC(2, v2)
+      PAR_51 = v1
+      PAR_52 = v2
+      IF ((v1 = DATA_21[idx_scan]) AND (v2 = DATA_22[idx_scan])) THEN flag = 1
+
+    CASE 1 'wait --------------------------------
+
+      IF (idx_wait = PAR_44) THEN
+        flag = 2
+        idx_wait = 0
+        idx_avg = 0
+      ELSE
+        idx_wait = idx_wait + 1
+      ENDIF
+
+    CASE 2 'measure --------------------------------
+
+      'read the input pairs: MUX setting k reads AI(2k+1) on ADC 1 and AI(2k+2) on ADC 2
+      FOR idx_ch = 1 TO PAR_37
+        Set_Mux1(idx_ch - 1)
+        Set_Mux2(idx_ch - 1)
+        IO_Sleep(200)  'wait 2us (200 * 10ns)
+        START_CONV(11b)
+        WAIT_EOC(11b)
+        sum[2 * idx_ch - 1] = sum[2 * idx_ch - 1] + READ_ADC24(1)/64
+        sum[2 * idx_ch] = sum[2 * idx_ch] + READ_ADC24(2)/64
+      NEXT idx_ch
+      idx_avg = idx_avg + 1
+
+      IF (idx_avg = PAR_43) THEN  'sample completed: write the averages in the FIFO
+        IF (FIFO_EMPTY(40) >= 2 * PAR_37) THEN
+          FOR idx_ch = 1 TO 2 * PAR_37
+            DATA_40 = sum[idx_ch] / PAR_43
+          NEXT idx_ch
+        ELSE
+          INC(PAR_39)
+        ENDIF
+        FOR idx_ch = 1 TO 2 * PAR_37
+          sum[idx_ch] = 0
+        NEXT idx_ch
+        idx_avg = 0
+        INC(idx_sample)
+
+        IF (idx_sample = PAR_36) THEN  'point completed: go to the next point
+          idx_sample = 0
+          flag = 0
+          INC(idx_scan)
+          PAR_35 = idx_scan
+          IF (idx_scan = PAR_41 + 1) THEN END
+        ENDIF
+      ENDIF
+
+  ENDSELECT
+
+FINISH:
+  'the outputs stay at the last point of the raster
+  PAR_51 = v1
+  PAR_52 = v2
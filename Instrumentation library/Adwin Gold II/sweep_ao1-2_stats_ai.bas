@@ -0,0 +1,175 @@
+'<ADbasic Header, Headerversion 001.001>
+' Process_Number                 = 9
+' Initial_Processdelay           = 1000
+' Eventsource                    = Timer
+' Control_long_Delays_for_Stop   = No
+' Priority                       = High
+' Version                        = 1
+' ADbasic_Version                = 6.3.1
+' Optimize                       = Yes
+' Optimize_Level                 = 1
+' Stacksize                      = 1000
+' Info_Last_Save                 = DDM05677  EMPA\dabe
+'<Header End>
+' sweep_ao1-2_stats_ai.bas: ramps AO1 and AO2 through the points in DATA_21 and DATA_22. At each point waits PAR_44 loops,
+' then reads AI1 ... AI(2 x PAR_37) for PAR_45 loops and computes, for each input, mean, variance, minimum and maximum
+' (running mean and variance, Welford's method). Only these values are written in DATA_32, for point p and input c:
+'   DATA_32[((p - 1) * 2 * PAR_37 + c - 1) * 4 + 1 ... 4] = mean, variance (population), minimum, maximum
+' If PAR_46 > 0, the boxcar averages of PAR_46 loops are also written in the FIFO DATA_40 (AI1 ... AI(2 x PAR_37) for
+' each average); the last boxcar of a point is discarded if incomplete. With a single point equal to the current outputs
+' the process only reads the inputs.
+
+'ADC-DAC parameters (31-40):
+'PAR_31 = ADC resolution
+'PAR_32 = DAC resolution
+'PAR_35 = point index (current point, the number of points completed is PAR_35-1)
+'PAR_37 = number of input pairs (1 -> AI1-2, 2 -> AI1-4, ..., 8 -> AI1-16)
+'PAR_38 = maximum output step per loop (in bins)
+'PAR_39 = number of boxcar averages lost because the FIFO was full (should be 0)
+
+'process parameters (41-80):
+'PAR_41 = number of points (length of DATA_21 and DATA_22)
+'PAR_44 = number of loops to wait after reaching a point
+'PAR_45 = number of loops to read at each point
+'PAR_46 = number of loops of each boxcar average written in the FIFO (0 = no decimated trace)
+
+'PAR_51 = current analog output 1 value (the sweep starts from PAR_51 and PAR_52)
+'PAR_52 = current analog output 2 value
+
+
+#INCLUDE ADwinGoldII.inc
+
+'AO arrays: 21-22
+DIM DATA_21[50000] as long   'AO1 points - (bin values)
+DIM DATA_22[50000] as long   'AO2 points - (bin values)
+'statistics: mean, variance, minimum, maximum of each input at each point
+DIM DATA_32[3200000] as float at dram_extern   '(bin values)
+'decimated trace
+DIM DATA_40[1000000] as float at dram_extern as fifo   'AI boxcar averages - (bin values)
+
+DIM flag as long
+DIM x, delta as float
+DIM val[16], m[16], m2[16], mn[16], mx[16], box[16] as float
+DIM idx_avg, idx_box, idx_wait, idx_ch, idx_data as long
+DIM idx_scan as long  'index of current point
+DIM v1, v2 as long
+
+INIT:
+  flag = 0
+  idx_avg = 0
+  idx_box = 0
+  idx_wait = 0
+  idx_scan = 1
+  FOR idx_ch = 1 TO 16
+    box[idx_ch] = 0
+  NEXT idx_ch
+  FIFO_CLEAR(40)
+
+  PAR_35 = idx_scan
+  PAR_39 = 0
+  IF (PAR_38 < 1) THEN PAR_38 = 1
+
+  v1 = PAR_51
+  v2 = PAR_52
+
+
+EVENT:
+
+  SELECTCASE flag '0 = ramp to next point ; 1 = wait ; 2 = measure
+
+    CASE 0 'ramp analog outputs --------------------------------
+
+      IF (v1 < DATA_21[idx_scan]) THEN v1 = v1 + MIN_LONG(PAR_38, DATA_21[idx_scan] - v1)
+      IF (v1 > DATA_21[idx_scan]) THEN v1 = v1 - MIN_LONG(PAR_38, v1 - DATA_21[idx_scan])
+      IF (v2 < DATA_22[idx_scan]) THEN v2 = v2 + MIN_LONG(PAR_38, DATA_22[idx_scan] - v2)
+      IF (v2 > DATA_22[idx_scan]) THEN v2 = v2 - MIN_LONG(PAR_38, v2 - DATA_22[idx_scan])
+      DAC(1, v1)
+      DAC(2, v2)
+      PAR_51 = v1
+      PAR_52 = v2
+      IF ((v1 = DATA_21[idx_scan]) AND (v2 = DATA_22[idx_scan])) THEN flag = 1
+
+    CASE 1 'wait --------------------------------
+
+      IF (idx_wait = PAR_44) THEN
+        flag = 2
+        idx_wait = 0
+        idx_avg = 0
+        idx_box = 0
+        FOR idx_ch = 1 TO 16
+          box[idx_ch] = 0
+        NEXT idx_ch
+      ELSE
+        idx_wait = idx_wait + 1
+      ENDIF
+
+    CASE 2 'measure --------------------------------
+
+      'read the input pairs: MUX setting k reads AI(2k+1) on ADC 1 and AI(2k+2) on ADC 2
+      FOR idx_ch = 1 TO PAR_37
+        Set_Mux1(idx_ch - 1)
+        Set_Mux2(idx_ch - 1)
+        IO_Sleep(200)  'wait 2us (200 * 10ns)
+        START_CONV(11b)
+        WAIT_EOC(11b)
+        val[2 * idx_ch - 1] = READ_ADC24(1)/64
+        val[2 * idx_ch] = READ_ADC24(2)/64
+      NEXT idx_ch
+      INC(idx_avg)
+      INC(idx_box)
+
+      'update running statistics
+      FOR idx_ch = 1 TO 2 * PAR_37
+        x = val[idx_ch]
+        IF (idx_avg = 1) THEN
+          m[idx_ch] = x
+          m2[idx_ch] = 0
+          mn[idx_ch] = x
+          mx[idx_ch] = x
+        ELSE
+          delta = x - m[idx_ch]
+          m[idx_ch] = m[idx_ch] + delta / idx_avg
+          m2[idx_ch] = m2[idx_ch] + delta * (x - m[idx_ch])
+          IF (x < mn[idx_ch]) THEN mn[idx_ch] = x
+          IF (x > mx[idx_ch]) THEN mx[idx_ch] = x
+        ENDIF
+        box[idx_ch] = box[idx_ch] + x
+      NEXT idx_ch
+
+      'boxcar average completed: write it in the FIFO
+      IF (idx_box = PAR_46) THEN
+        IF (FIFO_EMPTY(40) >= 2 * PAR_37) THEN
+          FOR idx_ch = 1 TO 2 * PAR_37
+            DATA_40 = box[idx_ch] / PAR_46
+          NEXT idx_ch
+        ELSE
+          INC(PAR_39)
+        ENDIF
+        FOR idx_ch = 1 TO 16
+          box[idx_ch] = 0
+        NEXT idx_ch
+        idx_box = 0
+      ENDIF
+
+      'point completed: write the statistics and go to the next point
+      IF (idx_avg = PAR_45) THEN
+        idx_data = (idx_scan - 1) * 8 * PAR_37
+        FOR idx_ch = 1 TO 2 * PAR_37
+          DATA_32[idx_data + 1] = m[idx_ch]
+          DATA_32[idx_data + 2] = m2[idx_ch] / PAR_45
+          DATA_32[idx_data + 3] = mn[idx_ch]
+          DATA_32[idx_data + 4] = mx[idx_ch]
+          idx_data = idx_data + 4
+        NEXT idx_ch
+        flag = 0
+        INC(idx_scan)
+        PAR_35 = idx_scan
+        IF (idx_scan = PAR_41 + 1) THEN END
+      ENDIF
+
+  ENDSELECT
+
+FINISH:
+  'the outputs stay at the last point
+  PAR_51 = v1
+  PAR_52 = v2
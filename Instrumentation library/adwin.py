@@ -1,16 +1,74 @@
-from numpy import zeros, array, ndarray, log10
-import ADwin
+from numpy import zeros, array, ndarray, log10, ctypeslib, concatenate, float64, add, subtract, multiply, divide, copyto, tile, full, recarray, nan, sqrt
+from functools import lru_cache
+try:
+    import ADwin
+except ImportError:  # ADwin package not installed: only the simulator can be used
+    ADwin = None
+import adwin_simulator
 import time
 import ctypes
 
 
+@lru_cache(maxsize=None)
+def _conversion_table(v_ref, v_range, bits):
+    """ Offset, range and full scale (2**bits) of the ADC/DAC as float64 scalars, cached per resolution.
+    The operations in voltage2bin and bin2voltage are done in the same order as for scalars,
+    so that arrays and scalars convert to identical values. """
+    return float64(v_ref), float64(v_range), float64(2**bits)
+
+
+class ringbuffer():
+
+    def __init__(self, channels, size, dtype=float):
+        """Preallocated ring buffer holding the last 'size' samples of each channel in 'channels'.
+        Data is stored in a single (len(channels), size) array and is never reallocated."""
+
+        self.channels = list(channels)
+        self.size = int(size)
+        self.data = zeros((len(self.channels), self.size), dtype=dtype)
+        self.count = 0  # total number of samples written since creation (or last reset)
+
+    def reset(self):
+        """ Discard stored samples without reallocating memory. """
+        self.count = 0
+
+    def write(self, chunk):
+        """ Append a (len(channels), n) chunk. If n > size, only the last 'size' samples are kept. """
+        n = chunk.shape[1]
+        tail = chunk[:, max(0, n - self.size):]  # samples that survive the write
+        start = (self.count + n - tail.shape[1]) % self.size
+        stop = start + tail.shape[1]
+        if stop <= self.size:
+            self.data[:, start:stop] = tail
+        else:
+            self.data[:, start:] = tail[:, :self.size - start]
+            self.data[:, :stop - self.size] = tail[:, self.size - start:]
+        self.count = self.count + n
+
+    def read(self, n=None):
+        """ Return a copy of the last n samples (all stored samples if n is None) in chronological order. """
+        stored = min(self.count, self.size)
+        n = stored if n is None else min(n, stored)
+        start = (self.count - n) % self.size
+        stop = start + n
+        if stop <= self.size:
+            return self.data[:, start:stop].copy()
+        return concatenate((self.data[:, start:], self.data[:, :stop - self.size]), axis=1)
+
+
 class adwin():
 
-    def __init__(self, adwin_boot_dir, adwin_routines_dir):
+    def __init__(self, adwin_boot_dir, adwin_routines_dir, simulate=False):
         """Wrapper around the object ADwin.ADwin. Includes methods to make experiments
-        and to convert data."""
+        and to convert data. With simulate=True the unit is replaced by adwin_simulator.ADwin,
+        to run the scripts without the unit."""
 
-        self.adw = ADwin.ADwin(0x1, 1)
+        if simulate:
+            self.adw = adwin_simulator.ADwin(0x1, 1)
+        elif ADwin is None:
+            exit("ADwin package not found. Install it or use simulate=True.")
+        else:
+            self.adw = ADwin.ADwin(0x1, 1)
         self.adwin_routines_dir = adwin_routines_dir
         self.adwin_boot_dir = adwin_boot_dir
         self.delay = 1
@@ -48,22 +106,183 @@ class adwin():
     def get_data(self, data_number, start_index, count):
         return self.adw.GetData_Float(data_number, start_index, count)
 
-    def voltage2bin(self, v, v_ref=-10, v_range=9.99969-(-10), bits=16):
-        """Convert a scalar or array of voltages into bins"""
+    def stream(self, process_number, channels, length, buffer=None, data_type="float", poll_interval=1e-3, par=35):
+        """ Stream the AI arrays 'channels' (DATA_1..DATA_16) of the running process 'process_number'.
+        At each poll the scan index is read once and all channels are drained for the same index range
+        into a preallocated scratch array, which is then appended to 'buffer' (a ringbuffer, created if None).
+        Yield (idx_, idx, chunk) whenever new samples are available, where chunk is a (len(channels), idx - idx_)
+        view of the scratch array: it is overwritten at the next iteration, copy it if needed.
+        Stop when 'length' acquisitions have been read. """
+        channels = list(channels)
+        if buffer is None:
+            buffer = ringbuffer(channels, length)
+        get_data = getattr(self.adw, {"float": "GetData_Float", "long": "GetData_Long"}[data_type])
+        scratch = zeros((len(channels), length), dtype=buffer.data.dtype)
+        idx_ = 0
+        while idx_ < length:
+            running = self.adw.Process_Status(process_number)  # read status first: if stopped, PAR is final
+            idx = min(self.adw.Get_Par(par) - (1 if running else 0), length)
+            if idx > idx_:
+                n = idx - idx_
+                for k, ch in enumerate(channels):
+                    scratch[k, :n] = ctypeslib.as_array(get_data(ch, idx_ + 1, n))
+                buffer.write(scratch[:, :n])
+                yield idx_, idx, scratch[:, :n]
+                idx_ = idx
+            elif not running:
+                exit(f"Process {process_number} stopped after {idx_} of {length} acquisitions.")
+            else:
+                time.sleep(poll_interval)
+
+    def acquire(self, process_number, channels, length, callback=None, buffer=None, data_type="float", poll_interval=1e-3, par=35):
+        """ Drain the AI arrays 'channels' of process 'process_number' until 'length' acquisitions are read.
+        If given, callback(idx_, idx, chunk) is called on every new chunk. Return the ringbuffer. """
+        if buffer is None:
+            buffer = ringbuffer(channels, length)
+        for idx_, idx, chunk in self.stream(process_number, channels, length, buffer, data_type, poll_interval, par):
+            if callback is not None:
+                callback(idx_, idx, chunk)
+        return buffer
+
+    def stream_raster(self, v1, v2, samples, pairs=5, settling_time=0, points2average=1, step=1, process_number=8, fifo=40, poll_interval=1e-3):
+        """ Run the 2D raster v1 x v2 (AO1 x AO2, in V at the ADwin outputs) in process 'process_number'
+        (raster_ao1-2_read_ai.TB8, loaded by the caller) entirely on the ADwin: at each point, AO1 and AO2 are ramped
+        by at most 'step' bins per loop, the process waits 'settling_time' loops, then records 'samples' samples of
+        AI1 ... AI(2 x pairs), each averaged over 'points2average' loops. The raster is row-major (v1 outer, v2 inner)
+        and starts from the current outputs (PAR_51, PAR_52).
+        The samples are drained from the FIFO 'fifo' in chunks into a preallocated (len(v1), len(v2), samples, 2 x pairs)
+        block of bin values. Yield (idx_, idx, block) whenever new points are completed, where idx_ and idx are the
+        numbers of points completed before and after the chunk (the point k is block[k // len(v2), k % len(v2)]). """
+        n1, n2 = len(v1), len(v2)
+        channels = 2 * pairs
+        block = zeros((n1, n2, samples, channels), dtype="float32")
+        flat = block.reshape(-1)
+        ao1 = self.voltage2bin(array(v1, dtype=float)).round().astype(int)
+        ao2 = self.voltage2bin(array(v2, dtype=float)).round().astype(int)
+        ao1, ao2 = ao1.repeat(n2), tile(ao2, n1)  # row-major raster
+        self.adw.SetData_Long(list(ao1), 21, 1, len(ao1))
+        self.adw.SetData_Long(list(ao2), 22, 1, len(ao2))
+        self.adw.Set_Par(43, int(points2average))
+        self.adw.Set_Par(44, int(settling_time))
+        self.adw.Set_Par(36, int(samples))
+        self.adw.Set_Par(37, int(pairs))
+        self.adw.Set_Par(38, int(step))
+        self.adw.Set_Par(41, len(ao1))
+        self.adw.Start_Process(process_number)
+        per_point = samples * channels
+        read = 0  # number of values read from the FIFO
+        while read < flat.size:
+            running = self.adw.Process_Status(process_number)  # read status first: if stopped, the FIFO is final
+            n = min(self.adw.Fifo_Full(fifo) // channels * channels, flat.size - read)
+            if n > 0:
+                flat[read:read + n] = ctypeslib.as_array(self.adw.GetFifo_Float(fifo, n))
+                idx_, idx = read // per_point, (read + n) // per_point
+                read = read + n
+                if idx > idx_:
+                    yield idx_, idx, block
+            elif not running:
+                exit(f"Process {process_number} stopped after {read // per_point} of {n1 * n2} points ({self.adw.Get_Par(39)} samples lost).")
+            else:
+                time.sleep(poll_interval)
+
+    def raster(self, v1, v2, samples, pairs=5, settling_time=0, points2average=1, step=1, process_number=8, callback=None, fifo=40, poll_interval=1e-3):
+        """ Run the 2D raster v1 x v2 (see stream_raster) and return the (len(v1), len(v2), 2 x pairs, samples) bin values.
+        The result is a view of the (len(v1), len(v2), samples, 2 x pairs) block filled by the FIFO.
+        If given, callback(idx_, idx, block) is called whenever new points are completed. """
+        block = None
+        for idx_, idx, block in self.stream_raster(v1, v2, samples, pairs, settling_time, points2average, step, process_number, fifo, poll_interval):
+            if callback is not None:
+                callback(idx_, idx, block)
+        return block.transpose(0, 1, 3, 2)
+
+    def stream_stats(self, v1, v2, samples, pairs=1, settling_time=0, decimate=0, step=1, process_number=9, fifo=40, poll_interval=1e-3, bits=18):
+        """ Ramp AO1 and AO2 through the points (v1[k], v2[k]) (in V at the ADwin outputs. If v1 or v2 is None, the output
+        is kept at its current value) in process 'process_number' (sweep_ao1-2_stats_ai.TB9, loaded by the caller).
+        At each point the process waits 'settling_time' loops, then reads AI1 ... AI(2 x pairs) for 'samples' loops and
+        computes their mean, variance, minimum and maximum on the ADwin: only these 4 values per point and input are
+        transferred. If decimate > 0, the boxcar averages of 'decimate' loops are also transferred.
+        Yield (idx_, idx, stats, trace) whenever new points are completed (points idx_ ... idx - 1), where stats is a
+        (points, 2 x pairs) record array with fields avg, stddev, minimum, maximum (in V at the ADwin inputs) and trace is None or
+        the (points, samples // decimate, 2 x pairs) boxcar averages (in V). If boxcar averages are lost because the FIFO
+        is full (PAR_39), the execution is terminated, as the rest of the trace would be shifted. 'bits' is the input
+        resolution. """
+        channels = 2 * pairs
+        current = [self.adw.Get_Par(51), self.adw.Get_Par(52)]
+        n = max([len(v) for v in (v1, v2) if v is not None], default=1)
+        ao = [full(n, current[k]) if v is None else self.voltage2bin(array(v, dtype=float)) for k, v in enumerate((v1, v2))]
+        self.adw.SetData_Long(list(ao[0]), 21, 1, n)
+        self.adw.SetData_Long(list(ao[1]), 22, 1, n)
+        self.adw.Set_Par(37, int(pairs))
+        self.adw.Set_Par(38, int(step))
+        self.adw.Set_Par(41, n)
+        self.adw.Set_Par(44, int(settling_time))
+        self.adw.Set_Par(45, int(samples))
+        self.adw.Set_Par(46, int(decimate))
+        raw = zeros((n, channels, 4), dtype="float32")  # mean, variance, minimum, maximum (in bins)
+        stats = recarray((n, channels), dtype=[("avg", float), ("stddev", float), ("minimum", float), ("maximum", float)])
+        stats.fill(nan)
+        trace = None if decimate == 0 else zeros((n, samples // decimate, channels))
+        lsb = (9.99969 - (-10)) / 2**bits
+        self.adw.Start_Process(process_number)
+        idx_ = 0
+        read = 0  # number of values read from the FIFO
+        while idx_ < n:
+            running = self.adw.Process_Status(process_number)  # read status first: if stopped, PAR and FIFO are final
+            idx = min(self.adw.Get_Par(35) - (1 if running else 0), n)
+            if trace is not None:
+                m = min(self.adw.Fifo_Full(fifo), trace.size - read)
+                if m > 0:
+                    self.bin2voltage(ctypeslib.as_array(self.adw.GetFifo_Float(fifo, m)), bits=bits, out=trace.reshape(-1)[read:read + m])
+                    read = read + m
+            if idx > idx_:
+                if trace is not None and self.adw.Get_Par(39) > 0:
+                    exit(f"Process {process_number} lost {self.adw.Get_Par(39)} boxcar averages because FIFO {fifo} was full: the trace is shifted. Increase decimate or reduce poll_interval... Execution terminated.")
+                raw.reshape(-1)[idx_ * channels * 4:idx * channels * 4] = ctypeslib.as_array(self.adw.GetData_Float(32, idx_ * channels * 4 + 1, (idx - idx_) * channels * 4))
+                stats["avg"][idx_:idx] = self.bin2voltage(raw[idx_:idx, :, 0], bits=bits)
+                stats["stddev"][idx_:idx] = sqrt(raw[idx_:idx, :, 1]) * lsb
+                stats["minimum"][idx_:idx] = self.bin2voltage(raw[idx_:idx, :, 2], bits=bits)
+                stats["maximum"][idx_:idx] = self.bin2voltage(raw[idx_:idx, :, 3], bits=bits)
+                yield idx_, idx, stats, trace
+                idx_ = idx
+            elif not running:
+                exit(f"Process {process_number} stopped after {idx_} of {n} points.")
+            else:
+                time.sleep(poll_interval)
+
+    def stats(self, v1, v2, samples, pairs=1, settling_time=0, decimate=0, step=1, process_number=9, callback=None, fifo=40, poll_interval=1e-3, bits=18):
+        """ Measure the statistics of AI1 ... AI(2 x pairs) at the points (v1[k], v2[k]) (see stream_stats).
+        Return the (points, 2 x pairs) record array with fields avg, stddev, minimum, maximum (in V) and the boxcar averages
+        (None if decimate = 0). If given, callback(idx_, idx, stats, trace) is called whenever new points are completed. """
+        stats, trace = None, None
+        for idx_, idx, stats, trace in self.stream_stats(v1, v2, samples, pairs, settling_time, decimate, step, process_number, fifo, poll_interval, bits):
+            if callback is not None:
+                callback(idx_, idx, stats, trace)
+        return stats, trace
+
+    def voltage2bin(self, v, v_ref=-10, v_range=9.99969-(-10), bits=16, out=None):
+        """Convert a scalar or array of voltages into bins. Arrays are converted in a single vectorized pass
+        and the result is written into 'out' (integer or float array of the same shape) if provided.
+        As for scalars, bins are truncated towards zero."""
         if isinstance(v, ndarray):
-            bins = zeros(len(v), dtype=int)
-            for idx in range(len(v)):
-                bins[idx] = self.voltage2bin(v[idx], v_ref, v_range, bits)
-            return array(bins, dtype=int)
+            offset, span, full_scale = _conversion_table(v_ref, v_range, bits)
+            bins = subtract(v, offset, dtype=float)
+            divide(bins, span, out=bins)
+            multiply(bins, full_scale, out=bins)
+            if out is None:
+                return bins.astype(int)
+            copyto(out, bins, casting="unsafe")  # float to int casting truncates towards zero
+            return out
         else:
             return int((v - v_ref) / v_range * 2**bits)
 
-    def bin2voltage(self, bin, v_ref=-10, v_range=9.99969-(-10), bits=16):
-        """Convert a scalar or array of bins into voltage values"""
+    def bin2voltage(self, bin, v_ref=-10, v_range=9.99969-(-10), bits=16, out=None):
+        """Convert a scalar or array of bins into voltage values. Arrays (any integer or float dtype, e.g. the
+        float32 DATA arrays returned by ADwin) are converted in a single vectorized pass, into 'out' if provided."""
         if isinstance(bin, ndarray):
-            v = zeros(len(bin), dtype=float)
-            for idx in range(len(bin)):
-                v[idx] = self.bin2voltage(bin[idx], v_ref, v_range, bits)
+            offset, span, full_scale = _conversion_table(v_ref, v_range, bits)
+            v = multiply(bin, span, out=out, dtype=float)
+            divide(v, full_scale, out=v)
+            add(v, offset, out=v)
             return v
         else:
             return v_ref + bin * v_range / 2**bits
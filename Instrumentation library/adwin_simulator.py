@@ -0,0 +1,275 @@
+import os
+import time
+import numpy as np
+
+
+class ADwin():
+
+    ''' Software simulator of the ADwin Gold II, with the same API as ADwin.ADwin for the functions used by adwin.adwin and
+    the measurement scripts. It allows to run and profile the acquisition loops without the unit.
+    The processes in "Adwin Gold II/*.bas" are modelled by the name of the file passed to Load_Process (the process
+    number is the extension, e.g. "read_ai1-8.TB4" is process 4):
+        sweep_ao<n>_read_ai<n>      - ramp AO<n> (one bin per event) to DATA_2<n>[idx_scan], wait PAR_34 events, average
+                                      PAR_33 events of AI<n> into DATA_<n>[idx_scan], for idx_scan = 1 ... PAR_41
+        sweep_ao<n>                 - as above, without reading the inputs
+        read_ai1-<m>                - average PAR_33 events of AI1 ... AI<m> into DATA_1 ... DATA_<m>, PAR_41 (PAR_71 for
+                                      read_ai1-10) times. DATA_31 is the time between two scans (in s; declared
+                                      long in the .bas, stored as float here)
+        raster_ao1-2_read_ai        - ramp AO1 and AO2 (PAR_38 bins per event) to the PAR_41 points in DATA_21 and DATA_22,
+                                      wait PAR_44 events, then write PAR_36 samples of AI1 ... AI(2 x PAR_37), each
+                                      averaged over PAR_43 events, in the FIFO DATA_40. PAR_35 is the point index
+        sweep_ao1-2_stats_ai        - as raster_ao1-2_read_ai, but reads the inputs for PAR_45 events at each point and
+                                      writes their mean, variance, minimum and maximum in DATA_32, and the boxcar
+                                      averages of PAR_46 events in the FIFO DATA_40
+    "AO1-2" in the name means both outputs. PAR_35 is the scan index (the number of completed scans is PAR_35 - 1),
+    PAR_51 and PAR_52 the current output bins. A process ends when its arrays are completed (PAR_35 = PAR_41 + 1).
+    The event period of a process is Processdelay / clock. Processes are not run in a thread: their state is computed
+    from the elapsed time at each call, so the simulator is deterministic for a given call sequence and costs nothing
+    while the host is waiting.
+    The inputs are given by device(t, ao), which receives the time (in s, from the start of the process) and the output
+    voltages (a (2, n) array, AO1 and AO2) of n scans and returns the (16, n) input voltages (AI1 ... AI16).
+    Each call waits "latency" s, plus 1 / "transfer_rate" s per transferred value, to model the host link. '''
+
+    clock = 300e6  # clock frequency (in Hz): the event period is Processdelay / clock
+    size = 50000  # length of the DATA arrays
+
+    def __init__(self, DeviceNo=0x1, raiseExceptions=1, device=None, latency=200e-6, transfer_rate=5e6, noise=1e-4, seed=None):
+        """
+        :param DeviceNo: [int] device number, unused (same signature as ADwin.ADwin)
+        :param raiseExceptions: [int] unused
+        :param device: [function] device(t, ao) returning the input voltages. If None, AI<k> is 0.5 x AO1 for odd k and
+        0.5 x AO2 for even k
+        :param latency: [float] time (in s) of each call
+        :param transfer_rate: [float] transferred values per second in Get/SetData
+        :param noise: [float] rms noise (in V) added to the inputs
+        :param seed: [int] seed of the noise generator
+        """
+        self.device = self.resistor if device is None else device
+        self.latency = latency
+        self.transfer_rate = transfer_rate
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.booted = False
+        self.par = np.zeros(81, dtype=np.int64)
+        self.fpar = np.zeros(81)
+        self.data = {n: np.zeros(self.size + 1, dtype=np.int32 if 21 <= n <= 28 else np.float32) for n in list(range(1, 17)) + list(range(21, 29)) + [31]}
+        self.data[32] = np.zeros(64 * self.size + 1, dtype=np.float32)  # statistics: 4 values x 16 inputs per point
+        self.fifo = {40: []}  # FIFO arrays: list of chunks
+        self.processes = {}  # process number: state
+
+    '''----- Models -----'''
+
+    @staticmethod
+    def resistor(t, ao):
+        # default device: inputs follow the outputs through a 1:2 divider
+        ai = np.zeros((16, ao.shape[1]))
+        ai[0::2] = 0.5 * ao[0]
+        ai[1::2] = 0.5 * ao[1]
+        return ai
+
+    @staticmethod
+    def model(name):
+        # outputs, inputs and length parameter of the process in file "name"
+        name = os.path.splitext(os.path.basename(name))[0].lower()
+        if name.startswith("read_ai1-"):
+            m = int(name.split("-")[1])
+            return {"name": name, "outputs": [], "inputs": list(range(1, m + 1)), "length": 71 if m == 10 else 41}
+        if name.startswith("sweep_ao1-2_stats_ai"):
+            return {"name": name, "outputs": [1, 2], "inputs": [], "length": 41, "stats": True}
+        if name.startswith("raster_ao1-2"):
+            return {"name": name, "outputs": [1, 2], "inputs": [], "length": 41, "raster": True}
+        if name.startswith("sweep_ao"):
+            channels = name[len("sweep_ao"):].split("_read_ai")
+            outputs = [1, 2] if channels[0] == "1-2" else [int(channels[0])]
+            inputs = [] if len(channels) == 1 else ([1, 2] if channels[1] == "1-2" else [int(channels[1])])
+            return {"name": name, "outputs": outputs, "inputs": inputs, "length": 41}
+        exit(f"ADwin simulator: process {name} is not modelled.")
+
+    @staticmethod
+    def bin2voltage(bins, bits):
+        return -10 + bins * (9.99969 - (-10)) / 2**bits
+
+    @staticmethod
+    def voltage2bin(v, bits):
+        return np.clip((v - (-10)) / (9.99969 - (-10)) * 2**bits, 0, 2**bits - 1)
+
+    '''----- Simulation -----'''
+
+    def link(self, values=0):
+        # wait for the host link
+        time.sleep(self.latency + values / self.transfer_rate)
+
+    def advance(self):
+        # bring all the running processes to the current time
+        now = time.perf_counter()
+        for p in self.processes.values():
+            if not p["running"]:
+                continue
+            events = (now - p["start"]) * self.clock / p["delay"]
+            done = int(np.searchsorted(p["events"], events, side="right"))
+            if done > p["done"]:
+                self.fill(p, p["done"], done)
+                p["done"] = done
+            self.par[35] = done // p["samples"] + 1
+            if p["outputs"]:
+                k = min(done // p["samples"], p["ao_bins"].shape[1] - 1)  # point being ramped
+                self.par[51], self.par[52] = p["ao_bins"][:, k]
+            if done == len(p["events"]):
+                p["running"] = False
+
+    def fill(self, p, start, stop):
+        # write the averaged inputs of scans start ... stop - 1 (0-based) in the DATA arrays
+        t = p["events"][start:stop] * p["delay"] / self.clock
+        point = np.arange(start, stop) // p["samples"]
+        if p.get("stats"):
+            self.statistics(self.device(t, p["ao"][:, point]), start, stop)
+            return
+        average = self.par[43] if p.get("raster") else self.par[33]
+        ai = self.device(t, p["ao"][:, point]) + self.noise / np.sqrt(max(average, 1)) * self.rng.standard_normal((16, stop - start))
+        if p.get("raster"):
+            self.fifo[40].append(self.voltage2bin(ai[:2 * self.par[37]], 18).T.reshape(-1).astype(np.float32))
+            return
+        for ch in p["inputs"]:
+            self.data[ch][start + 1:stop + 1] = self.voltage2bin(ai[ch - 1], 18)
+        if not p["outputs"]:
+            self.data[31][start + 1:stop + 1] = np.diff(np.concatenate(([0 if start == 0 else p["events"][start - 1]], p["events"][start:stop]))) * p["delay"] / self.clock
+
+    def statistics(self, ai, start, stop):
+        # read PAR_45 events of the inputs ai (16, n) at points start ... stop - 1 and write their statistics and boxcars
+        channels, events, box = 2 * int(self.par[37]), max(int(self.par[45]), 1), int(self.par[46])
+        raw = self.voltage2bin(ai[:channels, :, None] + self.noise * self.rng.standard_normal((channels, stop - start, events)), 18)
+        stats = np.stack((raw.mean(axis=2), raw.var(axis=2), raw.min(axis=2), raw.max(axis=2)), axis=2)  # (channels, n, 4)
+        self.data[32][start * 4 * channels + 1:stop * 4 * channels + 1] = stats.transpose(1, 0, 2).reshape(-1)
+        if box > 0:
+            boxcars = raw[:, :, :events // box * box].reshape(channels, stop - start, -1, box).mean(axis=3)
+            self.fifo[40].append(boxcars.transpose(1, 2, 0).reshape(-1).astype(np.float32))
+
+    def schedule(self, p):
+        # event index at which each scan is completed
+        n = int(self.par[p["length"]])
+        if not 0 < n <= self.size:
+            exit(f"ADwin simulator: invalid array length PAR_{p['length']} = {n}.")
+        average = max(int(self.par[33]), 1)
+        start = np.array([[self.par[51]], [self.par[52]]])  # outputs at the start of the process
+        bins = np.repeat(start, n, axis=1)
+        p["samples"] = 1  # scans per point
+        if p.get("raster") or p.get("stats"):
+            bins = np.stack((self.data[21][1:n + 1], self.data[22][1:n + 1])).astype(np.int64)
+            ramp = np.ceil(np.abs(np.diff(bins, axis=1, prepend=start)) / max(int(self.par[38]), 1)).max(axis=0).astype(np.int64)
+            if p.get("raster"):
+                samples, average = max(int(self.par[36]), 1), max(int(self.par[43]), 1)
+            else:
+                samples, average = 1, max(int(self.par[45]), 1)
+            measure = np.maximum(ramp, 1) + int(self.par[44]) + 1  # events before the first sample of each point
+            first = np.cumsum(measure + samples * average) - samples * average
+            p["events"] = (first[:, None] + average * np.arange(1, samples + 1)).reshape(-1)
+            p["samples"] = samples
+            p["ao_bins"] = bins
+            p["ao"] = self.bin2voltage(bins, 16)
+            self.fifo[40] = []
+            return
+        if p["outputs"]:
+            for k, ch in enumerate([1, 2]):
+                if ch in p["outputs"]:
+                    bins[k] = self.data[20 + ch][1:n + 1]
+            ramp = np.abs(np.diff(bins, axis=1, prepend=start)).max(axis=0)
+            per_scan = np.maximum(ramp, 1) + int(self.par[34]) + 1 + (average if p["inputs"] else 0)
+        else:
+            per_scan = np.full(n, average)
+        p["events"] = np.cumsum(per_scan)
+        p["ao_bins"] = bins
+        p["ao"] = self.bin2voltage(bins, 16)
+
+    '''----- ADwin API -----'''
+
+    def Boot(self, Filename):
+        self.link()
+        self.booted = True
+
+    def Test_Version(self):
+        self.link()
+        return 0 if self.booted else 1
+
+    def Load_Process(self, Filename):
+        self.link()
+        number = int(os.path.splitext(Filename)[1][3:])  # .TBn
+        self.processes[number] = dict(self.model(Filename), running=False, start=0, done=0, delay=1000, events=np.zeros(0))
+
+    def Set_Processdelay(self, ProcessNo, Processdelay):
+        self.link()
+        self.processes[ProcessNo]["delay"] = Processdelay
+
+    def Get_Processdelay(self, ProcessNo):
+        self.link()
+        return self.processes[ProcessNo]["delay"]
+
+    def Start_Process(self, ProcessNo):
+        self.link()
+        self.advance()
+        p = self.processes[ProcessNo]
+        self.schedule(p)
+        self.par[35] = 1
+        p["done"] = 0
+        p["start"] = time.perf_counter()
+        p["running"] = True
+
+    def Stop_Process(self, ProcessNo):
+        self.link()
+        self.advance()
+        self.processes[ProcessNo]["running"] = False
+
+    def Process_Status(self, ProcessNo):
+        self.link()
+        self.advance()
+        return int(ProcessNo in self.processes and self.processes[ProcessNo]["running"])
+
+    def Get_Par(self, Index):
+        self.link()
+        self.advance()
+        return int(self.par[Index])
+
+    def Set_Par(self, Index, Value):
+        self.link()
+        self.par[Index] = Value
+
+    def Get_FPar(self, Index):
+        self.link()
+        return float(self.fpar[Index])
+
+    def Set_FPar(self, Index, Value):
+        self.link()
+        self.fpar[Index] = Value
+
+    def GetData_Float(self, DataNo, Startindex, Count):
+        self.link(Count)
+        self.advance()
+        return np.ctypeslib.as_ctypes(self.data[DataNo][Startindex:Startindex + Count].astype(np.float32))
+
+    def GetData_Long(self, DataNo, Startindex, Count):
+        self.link(Count)
+        self.advance()
+        return np.ctypeslib.as_ctypes(self.data[DataNo][Startindex:Startindex + Count].astype(np.int32))
+
+    def SetData_Float(self, Data, DataNo, Startindex, Count):
+        self.link(Count)
+        self.data[DataNo][Startindex:Startindex + Count] = np.asarray(Data, dtype=float)[:Count]
+
+    def SetData_Long(self, Data, DataNo, Startindex, Count):
+        self.link(Count)
+        self.data[DataNo][Startindex:Startindex + Count] = np.asarray(Data)[:Count]
+
+    def Fifo_Full(self, FifoNo):
+        self.link()
+        self.advance()
+        return int(sum(len(chunk) for chunk in self.fifo[FifoNo]))
+
+    def Fifo_Clear(self, FifoNo):
+        self.link()
+        self.fifo[FifoNo] = []
+
+    def GetFifo_Float(self, FifoNo, Count):
+        self.link(Count)
+        self.advance()
+        values = np.concatenate(self.fifo[FifoNo]) if self.fifo[FifoNo] else np.zeros(0, dtype=np.float32)
+        self.fifo[FifoNo] = [values[Count:]] if len(values) > Count else []
+        return np.ctypeslib.as_ctypes(values[:Count].copy())
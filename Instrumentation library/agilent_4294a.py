@@ -11,7 +11,7 @@ class agilent4294a():
         self.visa.write("*RST")       # preset (sweep mode is set to HOLD)
         #self.visa.write("PRES")        # preset (does not reset instrument BASIC)
         self.visa.write("HOLD")         # hold the trigger (IDLE state)
-        self.visa.write("FORM4")      # format ascii
+        self.visa.write("FORM3")      # format IEEE 64-bit floating point (binary)
         self.visa.write("TRGS INT")   # selects trigger source
         self.visa.write("E4TP OFF")  # adapter type NONE (E4TP M1: 1m extension, E4TP M2: 2m extension)
         #self.visa.write("CALST OFF")  # turns off the user calibration function
@@ -20,6 +20,7 @@ class agilent4294a():
         #self.visa.write("COMSTC OFF")  # turn off LOAD compensation
         self.visa.write("BEEPWARN ON")  # sets the point averaging count (1 to 256, default 4)
         #self.visa.write("E4TP M1")
+        self.frequency = None  # sweep parameter values, read once after each change of the sweep condition
 
     # set settings function
     def wait_commands_exec(self):
@@ -61,6 +62,7 @@ class agilent4294a():
         self.visa.write("POIN {}".format(points))      # number of points per sweep (deafult 201, max 801)
         self.visa.write("SDELT {}".format(sweep_delay))     # sets delay time for each sweep (deafult 0, max 30s)
         self.visa.write("PDELT {}".format(point_delay))     # sets delay time for each point (deafult 0, max 30s)
+        self.frequency = None
 
     def set_onscreen_arrangement(self): # sets autoscale on trace A and B (only for tool display)
         self.visa.write('TRAC A')
@@ -123,7 +125,38 @@ class agilent4294a():
 
         self.visa.write("ECALDON")  # turn off LOAD
 
-    # sweep frequency on defined range and return modulus, phase and frequency
+    # read the binary response of command: an IEEE 488.2 block "#<n><byte count><data>" of 64-bit floats (FORM3, MSB first),
+    # decoded in place (read-only array)
+    def read_block(self, command):
+        self.visa.write(command)
+        raw = self.visa.read_raw()
+        digits = int(raw[1:2])
+        count = int(raw[2:2 + digits]) // 8
+        return np.frombuffer(raw, dtype=">f8", count=count, offset=2 + digits)
+
+    # return readout and subsidiary values of trace ("A" or "B") as the two columns of a (points, 2) array
+    def read_trace(self, trace="A"):
+        self.visa.write("TRAC {}".format(trace))
+        return self.read_block("OUTPDTRC?").reshape(-1, 2)
+
+    # return the sweep parameter values (e.g. frequencies), read from the unit only after a change of the sweep condition
+    def read_sweep_parameter(self):
+        if self.frequency is None:
+            self.frequency = np.array(self.read_block("OUTPSWPRM?"))
+        return self.frequency
+
+    # return readout and subsidiary of trace A and B of the last sweep as a structured array with fields "frequency",
+    # "a", "a_subsidiary", "b" and "b_subsidiary"
+    def read_traces(self):
+        a = self.read_trace("A")
+        b = self.read_trace("B")
+        data = np.empty(len(a), dtype=[("frequency", float), ("a", float), ("a_subsidiary", float), ("b", float), ("b_subsidiary", float)])
+        data["frequency"] = self.read_sweep_parameter()
+        data["a"], data["a_subsidiary"] = a[:, 0], a[:, 1]
+        data["b"], data["b_subsidiary"] = b[:, 0], b[:, 1]
+        return data
+
+    # sweep frequency on defined range and return frequency, trace A and trace B (e.g. modulus and phase)
     def sweep_and_acquire(self):
 
         self.set_onscreen_arrangement()
@@ -135,26 +168,6 @@ class agilent4294a():
         #self.wait_commands_exec()                # waits
         self.visa.write("*WAI")
 
-        # select trace A    (trace A and B are defined by MEAS)
-        self.visa.write('TRAC A')
-        nop = self.visa.query('POIN?')                        # ask for acquired points number
-        a_data = self.visa.query_ascii_values('OUTPDTRC?')    # ask for acquired points number
-        trace_a_readout = np.zeros(int(nop))
-        trace_a_subsidiary = np.zeros(int(nop))
-        for x in range(0, int(nop)):
-            trace_a_readout[x] = a_data[2*x]        # readout
-            trace_a_subsidiary[x] = a_data[2*x+1]   # subsidiary
-
-        # select trace B (phase theta)
-        self.visa.write('TRAC B')
-        b_data = self.visa.query_ascii_values('OUTPDTRC?')
-        trace_b_readout = np.zeros(int(nop))
-        trace_b_subsidiary = np.zeros(int(nop))
-        for x in range(0, int(nop)):
-            trace_b_readout[x] = b_data[2*x]        # readout
-            trace_b_subsidiary[x] = a_data[2*x+1]   # subsidiary
-
-        freq = self.visa.query_ascii_values('OUTPSWPRM?')     # frequencies
-        self.visa.write("*WAI")
-
-        return freq, trace_a_readout, trace_b_readout
+        # trace A and B are defined by MEAS (e.g. modulus and phase theta)
+        data = self.read_traces()
+        return data["frequency"], data["a"], data["b"]
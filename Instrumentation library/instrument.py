@@ -0,0 +1,108 @@
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+class instrument():
+
+    ''' Base class of the VISA drivers. All the communications with the unit go through "write" and "query", which:
+    - pace the commands according to "pacing":
+        "opc"   - after each write, query *OPC? and return when the unit has processed the command (IEEE 488.2 units)
+        "sleep" - wait "wait" seconds after each write and query (fixed delay, for units without *OPC?)
+        "none"  - do not wait (units that reply to every command, e.g. Mercury iTC)
+    - collect the commands written inside a "with self.batch():" block and send them as few lines as possible,
+      joined by "separator" and not longer than "max_line" characters. If "separator" is None, commands are sent one by one.
+    - record the latency of each write and query in "latency", a list of (command, time in s) of the last "log_size" operations.
+    Drivers set "pacing", "separator" and "max_line" as class attributes, according to the manual of the unit. '''
+
+    pacing = "opc"
+    separator = ";"
+    max_line = 255
+    log_size = 10000
+
+    def __init__(self, visa, wait=0.01):
+
+        self.visa = visa
+        self.wait = wait  # Wait time (in s) after each read / write operation when pacing is "sleep"
+        self.latency = deque(maxlen=self.log_size)
+        self.commands = None  # commands waiting to be sent, when inside a batch
+
+    '''----- Communication functions -----'''
+
+    def write(self, command, pace=True):
+        # write command, or queue it if inside a batch. Use pace=False for commands which start an overlapped operation
+        # (e.g. a trigger or a scan) or whose response is read with visa.read_raw, so that *OPC? is not queried
+        if self.commands is not None:
+            self.commands.append(command)
+            if not pace:
+                self.flush(pace=False)
+        else:
+            self.send(command, pace)
+
+    def query(self, command, pace=True):
+        # query command. Queued commands are sent first, so that the reply reflects them
+        self.flush()
+        start = time.perf_counter()
+        val = self.visa.query(command)
+        if pace and self.pacing == "sleep":
+            time.sleep(self.wait)
+        self.latency.append((command, time.perf_counter() - start))
+        return val
+
+    def send(self, line, pace=True):
+        # write one line and wait for the unit to be ready
+        start = time.perf_counter()
+        self.visa.write(line)
+        if pace:
+            self.sync()
+        self.latency.append((line, time.perf_counter() - start))
+
+    def sync(self):
+        # wait until the unit has processed all the commands
+        if self.pacing == "opc":
+            self.visa.query("*OPC?")
+        elif self.pacing == "sleep":
+            time.sleep(self.wait)
+
+    def flush(self, pace=True):
+        # send queued commands, joined in lines of at most max_line characters
+        if not self.commands:
+            return
+        commands = self.commands
+        self.commands = []
+        if self.separator is None:
+            for command in commands:
+                self.send(command, pace)
+            return
+        line = commands[0]
+        for command in commands[1:]:
+            if len(line) + len(self.separator) + len(command) > self.max_line:
+                self.send(line, pace)
+                line = command
+            else:
+                line = line + self.separator + command
+        self.send(line, pace)
+
+    @contextmanager
+    def batch(self):
+        # queue the commands written inside the block and send them when the block ends. Batches can be nested
+        if self.commands is not None:
+            yield
+            return
+        self.commands = []
+        try:
+            yield
+        finally:
+            self.flush()
+            self.commands = None
+
+    def get_latency(self):
+        # return total time (in s) and number of operations per command mnemonic, sorted by total time
+        summary = defaultdict(lambda: [0.0, 0])
+        for line, duration in self.latency:
+            commands = [line] if self.separator is None else line.split(self.separator)
+            for command in commands:
+                mnemonic = command.strip().split(" ")[0]
+                summary[mnemonic][0] = summary[mnemonic][0] + duration / len(commands)  # batched lines: time split equally
+                summary[mnemonic][1] = summary[mnemonic][1] + 1
+        return dict(sorted(summary.items(), key=lambda x: x[1][0], reverse=True))
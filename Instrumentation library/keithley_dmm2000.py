@@ -35,6 +35,9 @@ class dmm2000():
         # clear buffer
         self.visa.write("trace:clear")
 
+        # local registry of the settings, populated by the "set" functions. When adding/removing parameters, amend "get_settings" method
+        self.registry = {"dmm unit": self.model}
+
     def set_status_register(self, register):
         # enable the measurement status register BFL (buffer full). Note: The sum of the decimal weights of the bits that you wish
         # to set is sent as the parameter (<NRf>) for the appropriate :ENABle command. For example, to set the BFL and RAV bits
@@ -46,6 +49,8 @@ class dmm2000():
     def set_sense_function(self, function="dc:volt"):
         # set sense to voltage dc. # Note: the apexes '' are required
         self.visa.write("sense:function '{}'".format(function))
+        # range, nplc and filter are set per function: forget those of the previous function
+        self.registry = {"dmm unit": self.model, "sense function": function}
 
     def set_digits(self, digits, sense_function):
         # set resolution to seven digits (affects the display only)
@@ -54,25 +59,30 @@ class dmm2000():
     def set_sense_range(self, sense_range, sense_function):
         # set the range between 0.1, 1, 10, 100 volts
         self.visa.write("sense:{}:range {}".format(sense_function, sense_range))
+        self.registry["sense range"] = sense_range
 
     def set_nplc(self, nplc, sense_function):
         # set number of nplc between 0.01 (200 us) and 10 (200 ms)
         self.visa.write("sense:{}:nplcycles {}".format(sense_function, nplc))
+        self.registry["nplc"] = nplc
 
     def set_filter_state(self, state, sense_function):
         # enable (1)/disable (0) digital filter
         self.visa.write("sense:{}:average:state {}".format(sense_function, self.scpi_w["filter_status"][state]))
+        self.registry["filter status"] = state
 
     def set_filter_type(self, type, sense_function):
         # set digital filter to moving (MOV)/ repeat REP). Note: if the repeat filter is enabled, then the instrument samples the
         # specified number of reading conversions to yield a single filtered reading. If the moving filter is active, or filter is
         # disabled, then only one reading conversion is performed.
         self.visa.write("sense:{}:average:tcontrol {}".format(sense_function, self.scpi_w["filter_type"][type]))
+        self.registry["filter type"] = type
 
     def set_filter_samples(self, n, sense_function):
         # set number of digital samples to average between 1 and 100
         # Note: each measurement will take the time 20 ms * NPLC * filter samples
         self.visa.write("sense:{}:average:count {}".format(sense_function, n))
+        self.registry["filter samples"] = n
 
     def set_bandwidth(self, bandwidth):
         # set the bandwidth of the dmm
@@ -196,14 +206,21 @@ class dmm2000():
     def clear_event_register(self):
         self.visa.write("*cls")
 
-    def get_settings(self):
-        return {"dmm unit": self.read_model(),
-                "sense function": self.read_sense_function(),
-                "sense range": self.read_sense_range(self.read_sense_function()),
-                "nplc": self.read_nplc(self.read_sense_function()),
-                "filter status": self.read_filter_status(self.read_sense_function()),
-                "filter type": self.read_filter_type(self.read_sense_function()),
-                "filter samples": self.read_filter_samples(self.read_sense_function())}
+    def get_settings(self, refresh=False):
+        # return the local registry. Settings missing from the registry are read from the unit. If refresh is True, all settings are read from the unit
+        if refresh or any(key not in self.registry for key in ["sense range", "nplc", "filter status", "filter type", "filter samples"]):
+            sense_function = self.read_sense_function()  # queried once, and not cached: it is the unit's name of the function
+        read = {"dmm unit": self.read_model,
+                "sense function": self.read_sense_function,
+                "sense range": lambda: self.read_sense_range(sense_function),
+                "nplc": lambda: self.read_nplc(sense_function),
+                "filter status": lambda: self.read_filter_status(sense_function),
+                "filter type": lambda: self.read_filter_type(sense_function),
+                "filter samples": lambda: self.read_filter_samples(sense_function)}
+        for key in read:
+            if refresh or key not in self.registry:
+                self.registry[key] = read[key]()
+        return {key: self.registry[key] for key in read}
 
     def program_measure_on_trigger(self, sense_function="voltage:dc", sense_range=0.1, nplc=1, filter_state="off", filter_type="moving", filter_samples=1,
                                    trigger_source="bus", trigger_count="infinity", trigger_delay_auto="on", sample_count=1, buffer_size=1024, digits=7,
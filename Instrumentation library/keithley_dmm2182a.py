@@ -1,23 +1,41 @@
 import numpy as np
 import time
+import threading
 from collections import defaultdict
+from instrument import instrument
 
 
-class dmm2182a():
+class dmm2182a(instrument):
+
+    # commands are paced by *OPC? and may be sent on one line separated by ";"
+    pacing = "opc"
+    separator = ";"
+    max_line = 255
+    timeout_error = -1073807339  # VI_ERROR_TMO, raised by wait_for_srq when no service request arrives in time
 
     '''----- Initialize object -----'''
 
     def __init__(self, visa, wait=0.01):
 
-        self.visa = visa
-        self.wait = wait
+        super().__init__(visa, wait)
         self.model = self.read_model()
 
         # Restore factory defaults of smu
-        self.visa.write(":syst:pres")
-        self.visa.write("*rst")
+        self.write(":syst:pres")
+        self.write("*rst")
+        # local registry of the settings (channel 1, voltage), populated by the "set" functions. When adding/removing parameters, amend "get_settings" method
+        self.registry = {"dmm unit": self.model}
         # Clears all event registers and Error Queue
         self.clear_measurement_event_register()
+        # arguments of the last "configure": "read" reprograms the unit only when they change
+        self.configuration = None
+        self.triggers = 0  # triggers left before the unit goes idle, after "configure"
+        # buffered and continuous acquisitions
+        self.buffer = {}  # settings of the armed trace buffer
+        self.listener = None  # background thread of the continuous acquisition
+        self.readings = []  # (time, reading) collected by the continuous acquisition
+        self.error = None  # exception raised in the background thread, which stops it
+        self.stop_event = threading.Event()
 
 
 
@@ -25,85 +43,99 @@ class dmm2182a():
 
     def set_function(self, function="'voltage'"):
         # 'voltage' or 'temperature', apex necessary
-        self.visa.write(":sense:function {}".format(function))
-        time.sleep(self.wait)
+        self.write(":sense:function {}".format(function))
 
     def set_channel(self, channel=1):
         # Select channel to measure; 0, 1 or 2 (0 = internal temperature sensor).
-        self.visa.write(":sense:channel {}".format(channel))
-        time.sleep(self.wait)
+        self.write(":sense:channel {}".format(channel))
 
     def set_range(self, channel=1, sense_range=0.1):
         # Range is the expected reading: 0 to 120 (volts). The 2182a sets the range accordingly to measure the value
-        self.visa.write(":sense:voltage:channel{}:range:upper {}".format(channel, sense_range))
-        time.sleep(self.wait)
+        self.write(":sense:voltage:channel{}:range:upper {}".format(channel, sense_range))
+        if channel == 1:
+            self.registry["range"] = float(sense_range)  # as returned by read_range
 
     def set_autorange(self, channel=1, state="on"):
-        self.visa.write(":sense:voltage:channel{}:range:auto {}".format(channel, state))
-        time.sleep(self.wait)
+        self.write(":sense:voltage:channel{}:range:auto {}".format(channel, state))
+        if channel == 1:
+            self.registry["autorange"] = {"1": "on", "0": "off"}.get(str(state).lower(), str(state).lower())  # as returned by read_autorange
 
     def set_nplc(self, function="voltage", nplc=1):
-        self.visa.write(":sense:{}:nplcycles {}".format(function, nplc))
-        time.sleep(self.wait)
+        self.write(":sense:{}:nplcycles {}".format(function, nplc))
+        if function == "voltage":
+            self.registry["nplc"] = float(nplc)  # as returned by read_nplc
 
     def set_digits(self, function="voltage", digits=8):
-        self.visa.write(":sense:{}:digits {}".format(function, digits))
-        time.sleep(self.wait)
+        self.write(":sense:{}:digits {}".format(function, digits))
 
     def set_lpf(self, function="voltage", state="on"):
-        self.visa.write(":sense:{}:lpass:state {}".format(function, state))
-        time.sleep(self.wait)
+        self.write(":sense:{}:lpass:state {}".format(function, state))
+        if function == "voltage":
+            self.registry["low pass filter"] = state
 
     def set_filter_state(self, function="voltage", state="on"):
-        self.visa.write(":sense:{}:dfilter:state {}".format(function, state))
-        time.sleep(self.wait)
+        self.write(":sense:{}:dfilter:state {}".format(function, state))
+        if function == "voltage":
+            self.registry["digital filter"] = state
 
     def set_filter_count(self, function="voltage", n=1):
         # n from 1 to 100
-        self.visa.write(":sense:{}:dfilter:count {}".format(function, n))
-        time.sleep(self.wait)
+        self.write(":sense:{}:dfilter:count {}".format(function, n))
+        if function == "voltage":
+            self.registry["digital samples"] = n
 
     def set_filter_control(self, function="voltage", control="repeat"):
         # moving or repeat
-        self.visa.write(":sense:{}:dfilter:tcontrol {}".format(function, control))
-        time.sleep(self.wait)
+        self.write(":sense:{}:dfilter:tcontrol {}".format(function, control))
 
     # def set_filter_window(self, function="voltage", window=10):
     #     self.visa.write(":sense:{}:dfilter:window {}".format(function, window))
 
     def set_trigger_source(self, source="bus"):
-        self.visa.write(":trigger:source {}".format(source))
-        time.sleep(self.wait)
+        self.write(":trigger:source {}".format(source))
 
     def set_trigger_delay(self, delay="default"):
         # delay in seconds from 0 to 999999.99, or default = 100 ms
-        self.visa.write(":trigger:delay {}".format(delay))
-        time.sleep(self.wait)
+        self.write(":trigger:delay {}".format(delay))
 
     def set_trigger_autodelay(self, state="on"):
-        self.visa.write(":trigger:delay:auto {}".format(state))
-        time.sleep(self.wait)
+        self.write(":trigger:delay:auto {}".format(state))
 
     def set_trigger_count(self, n="inf"):
         # from 1 to 9999 or infinite
-        self.visa.write(":trigger:count {}".format(n))
-        time.sleep(self.wait)
+        self.write(":trigger:count {}".format(n))
 
     def set_sample_count(self, n=1):
-        self.visa.write(":sample:count {}".format(n))
-        time.sleep(self.wait)
+        self.write(":sample:count {}".format(n))
+
+    def set_trigger_timer(self, interval=0.1):
+        # interval (in s) between triggers when the trigger source is "timer", from 0.001 to 999999.999
+        self.write(":trigger:timer {}".format(interval))
+
+    def set_trace_points(self, n=1024):
+        # number of readings stored in the trace buffer, from 2 to 1024
+        self.write(":trace:points {}".format(n))
+
+    def set_trace_feed(self, feed="sense"):
+        # readings stored in the trace buffer: "sense" (raw readings), "calculate" (math results) or "none"
+        self.write(":trace:feed {}".format(feed))
+
+    def set_trace_control(self, control="next"):
+        # "next" fills the buffer and stops, "never" disables the buffer
+        self.write(":trace:feed:control {}".format(control))
+
+    def clear_trace(self):
+        self.write(":trace:clear")
 
     def set_initiate_continuous(self, state="on"):
-        self.visa.write(":initiate:continuous {}".format(state))
-        time.sleep(self.wait)
+        self.write(":initiate:continuous {}".format(state))
 
     def set_status_measurement_register(self, status=32):
         # Bit B5 (32), Reading Available (RAV) - Set bit indicates that a reading was taken and processed.
         # Bit B7 (128), Buffer Available (BAV) - Set bit indicates that there are at least two readings in the trace buffer.
         # Bit B8 (256), Buffer Half Full (BHF) - Set bit indicates that the trace buffer is half full.
         # Bit B9 (512), Buffer Full (BFL) - Set bit indicates that the trace buffer is full.
-        self.visa.write(":status:measurement:enable {}".format(status))
-        time.sleep(self.wait)
+        self.write(":status:measurement:enable {}".format(status))
 
     def set_sre_register(self, status=1):
         # 0 Clears enable register
@@ -114,190 +146,299 @@ class dmm2182a():
         # 32 Set ESB (Bit 5)
         # 128 Set OSB (Bit 7)
         # 255 Set all bits
-        self.visa.write("*sre {}".format(status))
-        time.sleep(self.wait)
+        self.write("*sre {}".format(status))
 
     def set_line_sync(self, state="off"):
-        self.visa.write(":system:lsync {}".format(state))
-        time.sleep(self.wait)
+        self.write(":system:lsync {}".format(state))
 
     '''----- Read function -----'''
 
     def read_function(self):
-        val = self.visa.query(":sense:function?").strip("\n").lower()
-        time.sleep(self.wait)
+        val = self.query(":sense:function?").strip("\n").lower()
         return val
 
     def read_channel(self):
-        val = self.visa.query(":sense:channel?").strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":sense:channel?").strip("\n")
         return val
 
     def read_range(self, channel=1):
-        val = self.visa.query(":sense:voltage:channel{}:range?".format(channel)).strip("\n")
-        time.sleep(self.wait)
+        val = float(self.query(":sense:voltage:channel{}:range?".format(channel)).strip("\n"))
         return val
 
     def read_autorange(self, channel=1):
-        val = self.visa.query(":sense:voltage:channel{}:range:auto?".format(channel)).strip("\n")
-        time.sleep(self.wait)
-        return val
+        val = self.query(":sense:voltage:channel{}:range:auto?".format(channel)).strip("\n")
+        if val == "1":
+            return "on"
+        if val == "0":
+            return "off"
 
     def read_nplc(self, function="voltage"):
-        val = self.visa.query(":sense:{}:nplc?".format(function)).strip("\n")
-        time.sleep(self.wait)
+        val = float(self.query(":sense:{}:nplc?".format(function)).strip("\n"))
         return val
 
     def read_digits(self, function="voltage"):
-        val = self.visa.query(":sense:{}:digits?".format(function)).strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":sense:{}:digits?".format(function)).strip("\n")
         return val
 
     def read_lpf(self, function="voltage"):
-        val = self.visa.query(":sense:{}:lpass:state?".format(function)).strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":sense:{}:lpass:state?".format(function)).strip("\n")
         if val == "1":
             return "on"
         if val == "0":
             return "off"
 
     def read_filter_state(self, function="voltage"):
-        val = self.visa.query(":sense:{}:dfilter:state?".format(function)).strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":sense:{}:dfilter:state?".format(function)).strip("\n")
         if val == "1":
             return "on"
         if val == "0":
             return "off"
 
     def read_filter_control(self, function="voltage"):
-        val = self.visa.query(":sense:{}:dfilter:tcontrol?".format(function)).lower().strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":sense:{}:dfilter:tcontrol?".format(function)).lower().strip("\n")
         if val == "rep":
             return "repeat"
         if val == "mov":
             return "moving"
 
     def read_filter_count(self, function="voltage"):
-        val = int(self.visa.query(":sense:{}:dfilter:count?".format(function)).strip("\n"))
-        time.sleep(self.wait)
+        val = int(self.query(":sense:{}:dfilter:count?".format(function)).strip("\n"))
         return val
 
     def read_filter_window(self, function="voltage"):
-        val = self.visa.query(":sense:{}:dfilter:window?".format(function)).strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":sense:{}:dfilter:window?".format(function)).strip("\n")
         return val
 
     def read_trigger_source(self):
-        val = self.visa.query(":trigger:source?").lower().strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":trigger:source?").lower().strip("\n")
         return val
 
     def read_trigger_count(self):
-        val = float(self.visa.query(":trigger:count?").strip("\n"))
-        time.sleep(self.wait)
+        val = float(self.query(":trigger:count?").strip("\n"))
         if val > 9999:
             return "infinite"
         else:
             return val
 
     def read_initiate_continuous(self):
-        val = self.visa.query(":initiate:continuous?").lower().strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":initiate:continuous?").lower().strip("\n")
         if val == "1":
             return "on"
         if val == "0":
             return "off"
 
     def read_status_measurement_register(self):
-        val = self.visa.query(":status:measurement:enable?").lower().strip("\n")
-        time.sleep(self.wait)
+        val = self.query(":status:measurement:enable?").lower().strip("\n")
         return val
 
     def read_model(self):
-        val = self.visa.query("*idn?").strip("\n").lower()
-        time.sleep(self.wait)
+        val = self.query("*idn?").strip("\n").lower()
         return val
 
     def read_sre_register(self):
-        val = self.visa.query("*sre?").strip("\n")
-        time.sleep(self.wait)
+        val = self.query("*sre?").strip("\n")
         return val
 
     '''----- Operation function -----'''
 
     def initiate(self):
-        self.visa.write(":initiate:immediate")
-        time.sleep(self.wait)
+        # initiate is an overlapped command: *OPC? would not return until the measurement is completed
+        self.write(":initiate:immediate", pace=False)
 
     def clear_srq_enable_register(self):
-        self.visa.write("*sre 0")
-        time.sleep(self.wait)
+        self.write("*sre 0")
 
     def clear_measurement_event_register(self):
-        self.visa.write("*cls")
-        time.sleep(self.wait)
+        self.write("*cls")
 
     def read_new(self):
-        val = self.visa.query(":sense:data:fresh?")
+        val = self.query(":sense:data:fresh?", pace=False)
         return val
 
     def read_last(self):
-        val = float(self.visa.query(":sense:data:latest?"))
+        val = float(self.query(":sense:data:latest?", pace=False))
         return val
 
+    def configure_sense(self, lpf="on", samples=1, sense_range=10e-3, nplc=1, autorange="off"):
+        # program the measurement of channel 1 (voltage): integration, range, analog and digital filters
+        with self.batch():
+            self.set_function()
+            self.set_channel()
+            self.set_nplc(nplc=nplc)
+            self.set_digits()
+            self.set_range(sense_range=sense_range)
+            self.set_autorange(state=autorange)
+            # configure analog and digital filter
+            self.set_lpf(state=lpf)
+            self.set_filter_state(state="on")
+            self.set_filter_count(n=samples)
+            # # self.set_filter_window()
+            self.set_filter_control()
+            self.set_line_sync()
+
     def configure(self, lpf="on", samples=1, sense_range=10e-3, nplc=1, trigger_source="bus", trigger_count="inf", trigger_delay="default",
                      trigger_autodelay_state="on", autorange="off"):
         # program measurement. A trigger is needed to initiate the measurement
-        self.set_initiate_continuous("off")
-        self.set_function()
-        self.set_channel()
-        self.set_nplc(nplc=nplc)
-        self.set_digits()
-        self.set_range(sense_range=sense_range)
-        self.set_autorange(state=autorange)
-        # configure analog and digital filter
-        self.set_lpf(state=lpf)
-        self.set_filter_state(state="on")
-        self.set_filter_count(n=samples)
-        # # self.set_filter_window()
-        self.set_filter_control()
-        self.set_line_sync()
-        # # configure trigger
-        self.set_sample_count(n=1)
-        self.set_trigger_source(source=trigger_source)
-        self.set_trigger_count(n=trigger_count)
-        self.set_trigger_delay(delay=trigger_delay)
-        self.set_trigger_autodelay(state=trigger_autodelay_state)
-        # configure measurement status register and service request enable register to raise a request upon measurement completion
-        self.set_sre_register(1)
-        self.set_status_measurement_register(32)
-        self.visa.write("*wai")
-        self.initiate()
+        with self.batch():
+            self.set_initiate_continuous("off")
+            self.configure_sense(lpf, samples, sense_range, nplc, autorange)
+            # # configure trigger
+            self.set_sample_count(n=1)
+            self.set_trigger_source(source=trigger_source)
+            self.set_trigger_count(n=trigger_count)
+            self.set_trigger_delay(delay=trigger_delay)
+            self.set_trigger_autodelay(state=trigger_autodelay_state)
+            # configure measurement status register and service request enable register to raise a request upon measurement completion
+            self.set_sre_register(1)
+            self.set_status_measurement_register(32)
+            self.write("*wai")
+            self.initiate()
+        self.configuration = (lpf, samples, sense_range, nplc, trigger_source, trigger_count, trigger_delay, trigger_autodelay_state, autorange)
+        self.triggers = float("inf") if str(trigger_count).lower().startswith("inf") else int(trigger_count)
 
     def read(self, lpf="on", samples=1, sense_range=10e-3, nplc=1, trigger_source="bus", trigger_count="inf", trigger_delay="default",
              trigger_autodelay_state="on"):
-        # program measurement. A trigger is needed to initiate the measurement
-        self.configure(lpf, samples, sense_range, nplc, trigger_source, trigger_count, trigger_delay, trigger_autodelay_state)
+        # Trigger a measurement and return the reading. The unit is programmed only if the arguments differ from the last
+        # "configure": with an infinite trigger count it stays armed between readings, so a reading costs a trigger, a
+        # service request and a query. With a finite count the unit goes idle after the last trigger, and it is initiated
+        # again before the next reading. Note: call "configure" again after changing settings with the "set" functions
+        configuration = (lpf, samples, sense_range, nplc, trigger_source, trigger_count, trigger_delay, trigger_autodelay_state, "off")
+        if configuration != self.configuration:
+            self.configure(*configuration)
+        elif self.triggers == 0:  # idle: arm the trigger model again
+            self.initiate()
+            self.triggers = int(trigger_count)
+        self.clear_measurement_event()
         self.send_trigger()
+        self.triggers = self.triggers - 1
         self.wait_for_srq()
         return self.read_last()
 
+    def clear_measurement_event(self):
+        # read (and clear) the measurement event register, so that the service request of the previous reading is not
+        # raised again by the summary bit
+        return int(self.query(":status:measurement:event?", pace=False))
+
+    '''----- Buffered and continuous acquisition -----'''
+
+    def arm_buffer(self, n, trigger_source="external", interval=0.1, lpf="on", samples=1, sense_range=10e-3, nplc=1, trigger_delay=0, autorange="off"):
+        # Arm the trace buffer to store n readings (2 to 1024), one per trigger from trigger_source: "external" (trigger
+        # link, e.g. hardware timed by the source of the sweep), "timer" (one reading every "interval" s), "immediate" or
+        # "bus". The unit raises a service request when the buffer is full. Fetch the readings with "fetch_buffer"
+        with self.batch():
+            self.set_initiate_continuous("off")
+            self.configure_sense(lpf, samples, sense_range, nplc, autorange)
+            self.clear_trace()
+            self.set_trace_points(n)
+            self.set_trace_feed("sense")
+            self.set_trace_control("next")
+            self.set_sample_count(n=1)
+            self.set_trigger_source(source=trigger_source)
+            self.set_trigger_count(n=n)
+            self.set_trigger_delay(delay=trigger_delay)
+            if trigger_source == "timer":
+                self.set_trigger_timer(interval)
+            # raise a service request when the buffer is full (BFL)
+            self.set_sre_register(1)
+            self.set_status_measurement_register(512)
+        self.configuration = None  # the trigger model of "configure" is overwritten
+        self.clear_measurement_event()
+        self.buffer = {"n": n, "trigger source": trigger_source, "interval": interval}
+        self.initiate()
+
+    def fetch_buffer(self, timeout=None):
+        # Wait for the buffer to be full and read it in one transfer (:trace:data?). Return a structured array with fields
+        # "time" (in s from the first reading) and "reading" (in V). The time is known only with the timer trigger
+        # (readings "interval" apart): with other trigger sources it is NaN, and the caller time-stamps its triggers
+        self.wait_for_srq(timeout)
+        data = self.query(":trace:data?", pace=False)
+        data = np.fromstring(data.strip("\r\n").rstrip(","), dtype=float, sep=",")
+        buffer = np.empty(len(data), dtype=[("time", float), ("reading", float)])
+        buffer["reading"] = data
+        if self.buffer["trigger source"] == "timer":
+            buffer["time"] = self.buffer["interval"] * np.arange(len(data))
+        else:
+            buffer["time"] = np.nan
+        return buffer
+
+    def read_buffer(self, n, trigger_source="external", interval=0.1, lpf="on", samples=1, sense_range=10e-3, nplc=1, trigger_delay=0, timeout=None):
+        # arm the trace buffer, collect n readings and return them (see arm_buffer and fetch_buffer). With the bus trigger,
+        # the n triggers are sent over the bus and "time" is the time (in s from the first trigger) each trigger was sent
+        self.arm_buffer(n, trigger_source, interval, lpf, samples, sense_range, nplc, trigger_delay)
+        sent = []
+        if trigger_source == "bus":
+            for _ in range(n):
+                sent.append(time.perf_counter())
+                self.send_trigger()
+        buffer = self.fetch_buffer(timeout)
+        if sent:
+            k = min(len(sent), len(buffer))
+            buffer["time"][:k] = np.array(sent[:k]) - sent[0]
+        return buffer
+
+    def start_continuous(self, callback=None, lpf="on", samples=1, sense_range=10e-3, nplc=1, trigger_delay=0, timeout=1):
+        # Measure continuously (immediate trigger, infinite trigger count) and collect the readings in a background thread.
+        # The thread waits for the "reading available" service request, reads the new reading and time-stamps it (in s from
+        # the start), then calls callback(t, reading) if given. The thread checks every "timeout" s whether it has to stop.
+        # Note: the unit must not be addressed by other threads until "stop_continuous"
+        self.configure(lpf, samples, sense_range, nplc, "immediate", "inf", trigger_delay, "off")
+        self.configuration = None  # the unit is free running: "read" must reprogram it
+        self.readings = []
+        self.error = None
+        self.stop_event.clear()
+        self.listener = threading.Thread(target=self.listen, args=(callback, timeout), daemon=True)
+        self.listener.start()
+
+    def listen(self, callback, timeout):
+        # loop of the background thread of the continuous acquisition
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                self.wait_for_srq(timeout * 1e3)
+            except Exception as e:
+                if getattr(e, "error_code", None) == self.timeout_error:  # no reading yet: check whether to stop
+                    continue
+                self.error = e
+                break
+            t = time.perf_counter() - start
+            self.clear_measurement_event()
+            reading = self.read_last()
+            self.readings.append((t, reading))
+            if callback is not None:
+                callback(t, reading)
+
+    def stop_continuous(self):
+        # stop the continuous acquisition and return the readings as a structured array with fields "time" (in s) and "reading"
+        self.stop_event.set()
+        if self.listener is not None:
+            self.listener.join()
+            self.listener = None
+        self.stop()
+        if self.error is not None:
+            exit(f"Continuous acquisition stopped by an error: {self.error}")
+        return np.array(self.readings, dtype=[("time", float), ("reading", float)])
+
     def send_trigger(self):
-        self.visa.write("*trg")
+        self.write("*trg", pace=False)
 
     def wait_for_srq(self, timeout=None):
         self.visa.wait_for_srq(timeout=timeout)
 
     def stop(self):
-        self.visa.write("abort")
-
-    def get_settings(self):
-        return {"dmm unit": self.read_model(),
-                "autorange": self.read_autorange(),
-                "range": self.read_range(),
-                "nplc": self.read_nplc(),
-                "low pass filter": self.read_lpf(),
-                "digital filter": self.read_filter_state(),
-                "digital samples": self.read_filter_count()
+        self.write("abort", pace=False)
+
+    def get_settings(self, refresh=False):
+        # return the local registry. Settings missing from the registry are read from the unit. If refresh is True, all settings are read from the unit
+        read = {"dmm unit": self.read_model,
+                "autorange": self.read_autorange,
+                "range": self.read_range,
+                "nplc": self.read_nplc,
+                "low pass filter": self.read_lpf,
+                "digital filter": self.read_filter_state,
+                "digital samples": self.read_filter_count
                 }
+        for key in read:
+            if refresh or key not in self.registry:
+                self.registry[key] = read[key]()
+        return {key: self.registry[key] for key in read}
 
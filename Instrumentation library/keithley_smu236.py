@@ -1,4 +1,5 @@
 import numpy as np
+import re
 import time
 from collections import defaultdict
 
@@ -119,6 +120,11 @@ class smu236():
                      100E-3: 0,
                      1: 0,
                      "auto": None}
+    # items of the sweep buffer (G command), in the order they are returned by the unit
+    buffer_items = {"source": 1,
+                    "delay": 2,
+                    "measure": 4,
+                    "time": 8}
     # endregion
 
     '''----- Initialize object -----'''
@@ -141,21 +147,27 @@ class smu236():
         self.visa.write("N0X")
         time.sleep(self.wait)
 
+        # local registry of the settings, populated by the "set" functions. When adding/removing parameters, amend "get_settings" method
+        self.registry = {"smu unit": self.model}
+
     '''----- Set settings functions -----'''
 
     def set_filter(self, samples=0):
         # set samples
         self.visa.write("P{}X".format(self.scpi_w["filt"][samples]))
+        self.registry["samples"] = samples
         time.sleep(self.wait)
 
     def set_sensing(self, sensing="local"):
         # set sensing to local or remote
         self.visa.write("O{}X".format(self.scpi_w["sens"][sensing]))
+        self.registry["sensing"] = sensing
         time.sleep(self.wait)
 
     def set_integration_time(self, integration_time=416e-6):
         # set the integration time (nlpc)
         self.visa.write("S{}X".format(self.scpi_w["time"][integration_time]))
+        self.registry["integration time"] = integration_time
         time.sleep(self.wait)
 
     def set_srq_mask(self, srq_mask="sweep done"):
@@ -167,6 +179,7 @@ class smu236():
         # set the sense range
         sense = self.read_sense().lower()
         self.visa.write("L,{}X".format(self.scpi_w["rang_sens"][sense][range]))
+        self.registry["sense range"] = range
         time.sleep(self.wait)
 
     def set_compliance(self, level="auto"):
@@ -177,11 +190,14 @@ class smu236():
             pass
         else:
             self.visa.write("L{},X".format(level))
+            self.registry["compliance"] = level
         time.sleep(self.wait)
 
     def set_source(self, source):
         # set source to "i" or "v"
         self.visa.write("F{},X".format(self.scpi_w["sour"][source]))
+        self.registry["source"] = source
+        self.registry.pop("sense", None)  # the sense function follows the source function
         time.sleep(self.wait)
 
     def set_function(self, function):
@@ -339,7 +355,10 @@ class smu236():
         measure = float(data.split(",")[1])
         return source, measure
 
-    def read_buffer(self):
+    def read_buffer(self, items=("source", "measure", "time"), mode="binary"):
+        # Read the whole sweep buffer in one talk. Return a structured array with one element per point and fields "items"
+        # (any of "source", "delay", "measure", "time", always in this order), e.g. buffer["measure"] is the measure array.
+        # The time value is in ms from the trigger that started the sweep.
         # query format is: G(items) ,(format) ,(lines)
         # items (sum decimal values): O = No items,
         #                             1 = Source value,
@@ -354,11 +373,46 @@ class smu236():
         # lines: 0 = One line of data per talk,
         #        1 = One line of sweep data per talk,
         #        2 = All lines of sweep data per talk
-        data = np.array([float(x) for x in self.visa.query("G5,2,2X").strip("\r\n").split(",")])
-        time.sleep(self.wait)
-        measure = data[1::2]
-        source = data[::2]
-        return source, measure
+        # "binary" (HP binary) transfers 4 bytes per value, decoded in place. "ascii" is parsed in a single pass.
+        items = [x for x in self.buffer_items if x in items]
+        code = sum(self.buffer_items[x] for x in items)
+        if mode == "binary":
+            self.visa.write("G{},3,2X".format(code))
+            data = self.decode_binary(self.visa.read_raw())
+        elif mode == "ascii":
+            data = self.decode_ascii(self.visa.query("G{},2,2X".format(code)))
+        else:
+            exit(f"Unknown buffer transfer mode ({mode}): use \"binary\" or \"ascii\"... Execution terminated.")
+        time.sleep(self.wait)
+        return self.to_records(data, items)
+
+    @staticmethod
+    def decode_binary(raw):
+        # decode a HP binary buffer: "#A", the byte count (2 bytes, MSB first), then IEEE float32 values (MSB first) and
+        # the terminator. The number of values is taken from the length of the transfer (the terminator is shorter
+        # than a value), decoded in place (read-only array)
+        if raw[:2] != b"#A":
+            exit("Cannot decode binary buffer: HP binary header not found... Execution terminated.")
+        return np.frombuffer(raw, dtype=">f4", count=(len(raw) - 4) // 4, offset=4)
+
+    @staticmethod
+    def decode_ascii(text):
+        # decode an ASCII buffer (no prefix or suffix): comma separated values, possibly with a CR LF between points
+        text = text.strip("\r\n,").replace("\r\n", ",")
+        try:
+            data = np.fromstring(text, dtype=float, sep=",")
+        except ValueError:
+            data = None
+        if data is None or len(data) != text.count(",") + 1:  # unexpected characters: pick the numbers out of the text
+            data = np.array(re.findall(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?", text), dtype=float)
+        return data
+
+    @staticmethod
+    def to_records(data, items):
+        # view the flat sequence of values (point after point, "items" values per point) as a structured array
+        n = len(data) // len(items)
+        data = np.ascontiguousarray(data[:n * len(items)], dtype=float).reshape(n, len(items))
+        return data.view(np.dtype([(x, float) for x in items]))[:, 0]
 
     def create_linear_staircase(self, start, stop, step, source_range="auto", delay=0):
         # Note: delay is in ms, and the maximum number of steps is 1000. More steps will raise a buffer full error
@@ -433,8 +487,80 @@ class smu236():
                 self.append_linear_staircase(stop - step, stop - 2 * (stop - start), step, source_range, delay)
                 self.append_linear_staircase(stop - 2 * (stop - start) + step, start, step, source_range, delay)
         elif type == "log":
-            print("Not yet implemented")
- 
+            # step is the number of points per decade (5, 10, 25 or 50). A log staircase cannot start at 0 or sweep
+            # through 0, so the hysteresis-like scan (mode 2) is not available
+            if start == 0 or stop == 0 or (start > 0) != (stop > 0):
+                exit("A logarithmic staircase cannot start, stop or sweep through 0... Execution terminated.")
+            if mode == 0:
+                self.create_logarithmic_staircase(start, stop, step, source_range, delay)
+            elif mode == 1:
+                self.create_logarithmic_staircase(start, stop, step, source_range, delay)
+                self.append_logarithmic_staircase(stop / 10 ** (1 / step) if abs(stop) > abs(start) else stop * 10 ** (1 / step),
+                                                  start, step, source_range, delay)
+            elif mode == 2:
+                exit("Hysteresis-like scan is not available for a logarithmic staircase... Execution terminated.")
+
+    def program_staircase(self, levels, source_range="auto", delay=0):
+        # Program an arbitrary sequence of source levels (e.g. a line of FET.Sweep) in the unit buffer. Runs of at least
+        # 3 points with constant step are programmed as linear staircases, runs of equal points as fixed staircases with
+        # count, the remaining points as single fixed levels. The first segment creates the staircase, the others are
+        # appended. Note: delay is in ms, and the maximum number of points is 1000. Returns the number of points.
+        levels = np.round(np.asarray(levels, dtype=float), 12)  # drop floating point residues (e.g. 0.30000000000000004)
+        if len(levels) > 1000:
+            exit(f"Cannot program {len(levels)} points: the buffer of the unit holds 1000 points... Execution terminated.")
+        step = np.diff(levels)
+        tol = 1e-9 * max(np.max(np.abs(levels)), 1e-9)
+        k = 0
+        while k < len(levels):
+            # end (included) of the run of constant step starting at k
+            m = k
+            while m + 1 < len(levels) and abs(step[m] - step[k]) <= tol:
+                m = m + 1
+            if m - k >= 1 and abs(step[k]) <= tol:
+                # equal points: fixed staircase with count
+                if k == 0:
+                    self.create_fixed_staircase(levels[k], source_range, delay, m - k + 1)
+                else:
+                    self.append_fixed_staircase(levels[k], source_range, delay, m - k + 1)
+            elif m - k >= 2:
+                if k == 0:
+                    self.create_linear_staircase(levels[k], levels[m], round(abs(step[k]), 12), source_range, delay)
+                else:
+                    self.append_linear_staircase(levels[k], levels[m], round(abs(step[k]), 12), source_range, delay)
+            else:
+                m = k
+                if k == 0:
+                    self.create_fixed_staircase(levels[k], source_range, delay)
+                else:
+                    self.append_fixed_staircase(levels[k], source_range, delay)
+            k = m + 1
+        return len(levels)
+
+    def program_sweep(self, source, levels, source_range="auto", sense_range="auto", delay=0, samples=0, integration_time=20e-3, sensing="local",
+                      compliance="auto", srq_mask="sweep done", trigger_origin="immediate", trigger_in="continuous", trigger_out="none", trigger_end="disabled"):
+        # Program a sweep through an arbitrary sequence of source levels in unit's hardware that is activated upon receiving
+        # a trigger. The levels can be swept again by sending a new trigger, with no further programming.
+        # Note: delay is in ms. Returns the number of points.
+        self.set_source(source)
+        self.set_function("sweep")
+        self.set_sense_range(sense_range)
+        self.set_filter(samples)
+        self.set_integration_time(integration_time)
+        self.set_sensing(sensing)
+        self.set_compliance(compliance)
+        self.set_srq_mask(srq_mask)
+        self.set_trigger_off()
+        self.set_trigger_control(trigger_origin, trigger_in, trigger_out, trigger_end)
+        self.set_trigger_on()
+        return self.program_staircase(levels, source_range, delay)
+
+    def run_sweep(self, points=None, timeout=None):
+        # Trigger the programmed sweep, wait for the "sweep done" service request and read the whole buffer in one talk.
+        # If points is given, only the first "points" points are returned (e.g. when a ramp is appended to the sweep)
+        self.send_trigger()
+        self.wait_for_srq(timeout)
+        return self.read_buffer()[:points]
+
     def make_iv(self, source, start, stop, step, mode=0, type="lin",
                 source_range="auto", sense_range="auto", delay=0, samples=0, integration_time=20e-3, sensing="local", compliance="auto", suppress=False):
         # Make an iv and return measurement data
@@ -494,12 +620,17 @@ class smu236():
         # send a trigger to the unit over the bus
         self.visa.write("H0X")
 
-    def get_settings(self):
-        return {"smu unit": self.read_model(),
-                "source": self.read_source(),
-                "sense": self.read_sense(),
-                "sensing": self.read_sensing(),
-                "sense range": self.read_sense_range(),
-                "compliance": self.read_compliance(),
-                "samples": self.read_filter(),
-                "integration time": self.read_integration_time()}
+    def get_settings(self, refresh=False):
+        # return the local registry. Settings missing from the registry are read from the unit. If refresh is True, all settings are read from the unit
+        read = {"smu unit": self.read_model,
+                "source": self.read_source,
+                "sense": self.read_sense,
+                "sensing": self.read_sensing,
+                "sense range": self.read_sense_range,
+                "compliance": self.read_compliance,
+                "samples": self.read_filter,
+                "integration time": self.read_integration_time}
+        for key in read:
+            if refresh or key not in self.registry:
+                self.registry[key] = read[key]()
+        return {key: self.registry[key] for key in read}
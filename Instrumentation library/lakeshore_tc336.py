@@ -1,15 +1,20 @@
-import time
 from collections import defaultdict
+from instrument import instrument
 
 
-class tc336():
+class tc336(instrument):
 
     """ Instrumentation drivers """
 
+    # commands are paced by *OPC? and may be sent on one line separated by ";"
+    pacing = "opc"
+    separator = ";"
+    max_line = 64
+
     # SCPI dictionary for writing to instrumentation (refer to manual)
     scpi_w = {"range": {"off": "0", "low": "1", "medium": "2", "high": "3"},
               "filter": {"on": "1", "off": "0"},
-              "read": {"all": "0", "a": "1", "b": "2", "c": "3", "d": "4"}}
+              "read": {"all": "0", "a": "A", "b": "B", "c": "C", "d": "D"}}
 
     # SCPI dictionary for reading from instrumentation
     scpi_r = defaultdict(dict)
@@ -21,10 +26,10 @@ class tc336():
         # create an empty local registry and populate the registry with the current instrumentation settings
         # when adding/removing parameters, amend "get_settings" method
 
-        self.visa = visa
-        self.wait = wait
+        super().__init__(visa, wait)
         self.t_switch_range = t_switch_range
         self.model = self.read_model()
+        self.registry = {"model": self.model}
         # self.visa.write("*rst")  # reset controller parameters to power-up settings
 
     '''----- Set functions ------'''
@@ -33,55 +38,51 @@ class tc336():
         # channel is "a", "b", "c" or "d"
         # state is "on" or "off"
         # max samples value = 64
-        self.visa.write("filter {},{},{},{}".format(channel, self.scpi_w["filter"][state], samples, window))
-        time.sleep(self.wait)
+        self.write("filter {},{},{},{}".format(channel, self.scpi_w["filter"][state], samples, window))
+        self.registry["filter channel {} (state, samples, window)".format(channel)] = [state, samples, window]
 
     def set_heater_range(self, heater, range):
         # heater is 1 or 2
         # range is "off", "low", "medium", or "high"
-        self.visa.write("range {},{}".format(heater, self.scpi_w["range"][range]))
-        time.sleep(self.wait)
+        self.write("range {},{}".format(heater, self.scpi_w["range"][range]))
+        self.registry["heater {} range".format(heater)] = range
 
     def set_pid(self, pid, p, i, d):
         # pid is 1 or 2
-        self.visa.write("pid {},{},{},{}".format(pid, p, i, d))
-        time.sleep(self.wait)
+        self.write("pid {},{},{},{}".format(pid, p, i, d))
+        self.registry["pid {} settings (p, i, d)".format(pid)] = [p, i, d]
 
     def set_temperature(self, output, setpoint):
         # set temperature setpoint.
         # Note: output can be either 1 (stage) or 2 (shield), and t is in kelvin
-        if setpoint < self.t_switch_range:
-            self.set_heater_range(1, "medium")
-            self.set_heater_range(2, "medium")
-        elif setpoint >= self.t_switch_range:
-            self.set_heater_range(1, "high")
-            self.set_heater_range(2, "high")
-        self.visa.write("SETP {},{}".format(output, setpoint))
-        time.sleep(self.wait)
+        with self.batch():
+            if setpoint < self.t_switch_range:
+                self.set_heater_range(1, "medium")
+                self.set_heater_range(2, "medium")
+            elif setpoint >= self.t_switch_range:
+                self.set_heater_range(1, "high")
+                self.set_heater_range(2, "high")
+            self.write("SETP {},{}".format(output, setpoint))
 
     '''----- Read functions -----'''
 
     def read_filter(self, channel):
         # return samples, window
-        val = self.visa.query("filter? {}".format(channel)).split(",")
-        time.sleep(self.wait)
+        val = self.query("filter? {}".format(channel)).split(",")
         return val
 
     def read_heater_range(self, channel):
-        val = self.scpi_r["range"][self.visa.query("range? {}".format(channel)).strip("\n").strip("\r")]
-        time.sleep(self.wait)
+        val = self.scpi_r["range"][self.query("range? {}".format(channel)).strip("\n").strip("\r")]
         return val
 
     def read_pid(self, pid):
         # return p, i , d
-        val = [float(x) for x in self.visa.query("pid? {}".format(pid)).split(",")]
-        time.sleep(self.wait)
+        val = [float(x) for x in self.query("pid? {}".format(pid)).split(",")]
         return val
 
     def read_model(self):
         # return model number
-        val = self.visa.query("*IDN?").rstrip()
-        time.sleep(self.wait)
+        val = self.query("*IDN?").rstrip()
         return val
 
 
@@ -90,47 +91,52 @@ class tc336():
 
     def read_temperature(self, sensor="all"):
         # read temperature from sensors ("all", "a", "b", "c" or "d")
+        # "all" reads the four sensors with a single query and returns a list [a, b, c, d]: to poll stage and shield,
+        # read "all" rather than one query per sensor
         if sensor == "all":
-            val = [float(x) for x in self.visa.query("KRDG? {}".format(self.scpi_w["sensor"][sensor])).split(",")]
+            val = [float(x) for x in self.query("KRDG? {}".format(self.scpi_w["read"][sensor])).split(",")]
         else:
-            val = float(self.visa.query("KRDG? " + self.scpi_w["sensor"][sensor]))
-        time.sleep(self.wait)
+            val = float(self.query("KRDG? {}".format(self.scpi_w["read"][sensor])))
         return val
 
     def warm_up(self):
         # set stage and shield temperature setpoint(s) to room temperature
-        self.visa.write("SETP 1, 300")
-        time.sleep(self.wait)
-        self.visa.write("SETP 2, 300")
-        time.sleep(self.wait)
+        with self.batch():
+            self.write("SETP 1, 300")
+            self.write("SETP 2, 300")
 
     def off(self):
         # switch stage and shield heaters off
-        self.visa.write("range 1, off")
-        time.sleep(self.wait)
-        self.visa.write("range 2, off")
-        time.sleep(self.wait)
+        with self.batch():
+            self.set_heater_range(1, "off")
+            self.set_heater_range(2, "off")
 
     def configure(self, range_heater_1="high", range_heater_2="high", filter_state="on", filter_samples=64,
                   filter_window=2, p1=75, i1=15, d1=0, p2=50, i2=20, d2=0):
-        self.set_filter("a", filter_state, filter_samples, filter_window)
-        self.set_filter("b", filter_state, filter_samples, filter_window)
-        self.set_filter("c", filter_state, filter_samples, filter_window)
-        self.set_filter("d", filter_state, filter_samples, filter_window)
-        self.set_heater_range(1, range_heater_1)
-        self.set_heater_range(2, range_heater_2)
-        self.set_pid(1, p1, i1, d1)
-        self.set_pid(2, p2, i2, d2)
-
-    def get_settings(self):
-        return {"model": self.read_model(),
-                "filter channel a (state, samples, window)": self.read_filter("a"),
-                "filter channel b (state, samples, window)": self.read_filter("b"),
-                "filter channel c (state, samples, window)": self.read_filter("c"),
-                "filter channel d (state, samples, window)": self.read_filter("d"),
-                "heater 1 range": self.read_heater_range(1),
-                "heater 2 range": self.read_heater_range(1),
-                "pid 1 settings (p, i, d)": self.read_pid(1),
-                "pid 2 settings (p, i, d)": self.read_pid(2),
+        with self.batch():
+            self.set_filter("a", filter_state, filter_samples, filter_window)
+            self.set_filter("b", filter_state, filter_samples, filter_window)
+            self.set_filter("c", filter_state, filter_samples, filter_window)
+            self.set_filter("d", filter_state, filter_samples, filter_window)
+            self.set_heater_range(1, range_heater_1)
+            self.set_heater_range(2, range_heater_2)
+            self.set_pid(1, p1, i1, d1)
+            self.set_pid(2, p2, i2, d2)
+
+    def get_settings(self, refresh=False):
+        # return the local registry. Settings missing from the registry are read from the unit. If refresh is True, all settings are read from the unit
+        read = {"model": self.read_model,
+                "filter channel a (state, samples, window)": lambda: self.read_filter("a"),
+                "filter channel b (state, samples, window)": lambda: self.read_filter("b"),
+                "filter channel c (state, samples, window)": lambda: self.read_filter("c"),
+                "filter channel d (state, samples, window)": lambda: self.read_filter("d"),
+                "heater 1 range": lambda: self.read_heater_range(1),
+                "heater 2 range": lambda: self.read_heater_range(2),
+                "pid 1 settings (p, i, d)": lambda: self.read_pid(1),
+                "pid 2 settings (p, i, d)": lambda: self.read_pid(2),
                 }
+        for key in read:
+            if refresh or key not in self.registry:
+                self.registry[key] = read[key]()
+        return {key: self.registry[key] for key in read}
 
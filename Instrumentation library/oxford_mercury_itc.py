@@ -1,63 +1,127 @@
 import time
+import re
+import numpy as np
 from collections import defaultdict
+from instrument import instrument
 
 
-class mercuryitc():
+class mercuryitc(instrument):
 
-    def __init__(self, visa, wait=0.01):
+    # the unit replies to every command (SET commands included), so the reply paces the communication.
+    # Commands cannot be joined on one line
+    pacing = "none"
+    separator = None
 
-        self.visa = visa
-        self.wait = wait
-        self.visa.query("*RST")
+    # temperature sensors and the uid of their board. Each sensor has a control loop, whose heater output (in %) is HSET
+    sensors = {"a": "DB7.T1",  # hehigh
+               "b": "DB6.T1",  # he4pot
+               "c": "MB1.T1",  # he3sorb
+               "d": "DB8.T1"}  # helow
+
+    def __init__(self, visa, wait=0.01, reset=False):
+
+        super().__init__(visa, wait)
+        if reset:
+            self.query("*RST")
         self.model = self.read_model()
+        # discover the current state instead of resetting it: the boards fitted in the unit and the loop settings
+        self.catalog = self.read_catalog()
+        self.configured = [x for x in self.sensors if self.sensors[x] in self.catalog] if self.catalog else list(self.sensors)
+        self.registry = {"tc unit": self.model}
+        self.get_settings(refresh=True)
 
     '''----- Set functions ------'''
 
     def set_temperature(self, output, setpoint):
         # Note: "output" can be either 0 (HeHigh or He3Pot) or 1 (He4Pot), and "setpoint" is in K
         if output == 0:
-            val = self.visa.query("SET:DEV:DB7.T1:TEMP:LOOP:TSET:{}".format(setpoint))
+            val = self.query("SET:DEV:DB7.T1:TEMP:LOOP:TSET:{}".format(setpoint))
+            self.registry["setpoint a"] = setpoint
         elif output == 1:
-            val = self.visa.query("SET:DEV:DB6.T1:TEMP:LOOP:TSET:{}".format(setpoint))
-        time.sleep(self.wait)
+            val = self.query("SET:DEV:DB6.T1:TEMP:LOOP:TSET:{}".format(setpoint))
+            self.registry["setpoint b"] = setpoint
         return val
 
     def set_heater_percentage_auto(self, heater, value="ON"):
         # Note: heater can be either 1 (HeHigh or He3Pot) or 2 (He4Pot), and t is in kelvin
         if heater == 1:
-            val = self.visa.query("SET:DEV:DB7.T1:TEMP:LOOP:ENAB:{}".format(value))
+            val = self.query("SET:DEV:DB7.T1:TEMP:LOOP:ENAB:{}".format(value))
+            self.registry["heater auto a"] = value
         elif heater == 2:
-            val =self.visa.query("SET:DEV:DB6.T1:TEMP:LOOP:ENAB:{}".format(value))
-        time.sleep(self.wait)
+            val = self.query("SET:DEV:DB6.T1:TEMP:LOOP:ENAB:{}".format(value))
+            self.registry["heater auto b"] = value
         time.sleep(5)
         return val
 
     '''----- Read functions ------'''
 
     def read_modules(self):
-        val = self.visa.query("READ:SYS:CAT").split(".")
-        time.sleep(self.wait)
+        val = self.query("READ:SYS:CAT").split(".")
         return val
 
+    def read_catalog(self):
+        # return the boards fitted in the unit as {uid: type}, e.g. {"MB1.T1": "TEMP", "DB6.T1": "TEMP", "MB0.H1": "HTR"}
+        val = self.query("READ:SYS:CAT").strip("\n")
+        return dict(re.findall(r"DEV:([^:]+):([A-Z]+)", val))
+
     def read_model(self):
-        val = self.visa.query("READ:SYS:MAN").strip("\n")
-        time.sleep(self.wait)
+        val = self.query("READ:SYS:MAN").strip("\n")
         return val
 
+    @staticmethod
+    def parse(reply, noun):
+        # return the value of noun (e.g. "SIG:TEMP") in the reply "STAT:DEV:<uid>:TEMP:SIG:TEMP:105.1234K:LOOP:HSET:12.3",
+        # as a string with the units removed
+        val = reply.strip("\n").split(noun + ":", 1)[1].split(":")[0]
+        number = re.match(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?", val)
+        return number.group() if number else val
+
+    def read_value(self, command, number=True):
+        # read a single value, e.g. "READ:DEV:DB7.T1:TEMP:LOOP:TSET"
+        noun = ":".join(command.split(":")[-2:])
+        val = self.parse(self.query(command), noun)
+        return float(val) if number else val
+
     def read_temperature(self, sensor):
         # sensor can be either "a" (hehigh), "b" (he4pot), "c" (he3sorb) or "d" ("helow")
-        if sensor == "c":
-            val = float(self.visa.query("READ:DEV:MB1.T1:TEMP:SIG:TEMP").strip("\n").split(":")[-1][:-1])
-        if sensor == "b":
-            val = float(self.visa.query("READ:DEV:DB6.T1:TEMP:SIG:TEMP").strip("\n").split(":")[-1][:-1])
-        if sensor == "a":
-            val = float(self.visa.query("READ:DEV:DB7.T1:TEMP:SIG:TEMP").strip("\n").split(":")[-1][:-1])
-        if sensor == "d":
-            val = float(self.visa.query("READ:DEV:DB8.T1:TEMP:SIG:TEMP").strip("\n").split(":")[-1][:-1])
-        time.sleep(self.wait)
-        return val
+        # "all" reads the four sensors in one round trip and returns a list [a, b, c, d] (nan for sensors not fitted)
+        # (all the READ commands are written before the replies are read, see read_record): to poll stage and shield,
+        # read "all" rather than one round trip per sensor
+        if sensor == "all":
+            record = self.read_record(heaters=False)
+            return [float(record[x]) if x in self.configured else np.nan for x in self.sensors]
+        return float(self.parse(self.query(f"READ:DEV:{self.sensors[sensor]}:TEMP:SIG:TEMP"), "SIG:TEMP"))
+
+    def read_record(self, sensors=None, heaters=True):
+        # Read temperature (in K) and, if heaters is True, heater output (in %) of sensors (default: all configured sensors)
+        # in one round trip: a compound READ per sensor (temperature and loop heater output of the same board) is
+        # written for all the sensors before the replies are read. Return a record with fields "time" (time.time() at
+        # the middle of the transaction), the sensor names and "<sensor> heater"
+        sensors = self.configured if sensors is None else sensors
+        commands = [f"READ:DEV:{self.sensors[x]}:TEMP:SIG:TEMP" + (":LOOP:HSET" if heaters else "") for x in sensors]
+        self.flush()
+        start = time.perf_counter()
+        t = time.time()
+        for command in commands:
+            self.visa.write(command)
+        replies = [self.visa.read() for _ in commands]
+        duration = time.perf_counter() - start
+        self.latency.append(("READ", duration))
+        fields = [("time", float)] + [(x, float) for x in sensors] + ([(f"{x} heater", float) for x in sensors] if heaters else [])
+        values = [t + duration / 2] + [float(self.parse(x, "SIG:TEMP")) for x in replies]
+        if heaters:
+            values = values + [float(self.parse(x, "LOOP:HSET")) for x in replies]
+        return np.array(tuple(values), dtype=fields)[()]
+
+    def get_settings(self, refresh=False):
+        # return the local registry (discovered at initialization and updated by the "set" functions)
+        if refresh:
+            for sensor in self.configured:
+                self.registry[f"setpoint {sensor}"] = self.read_value(f"READ:DEV:{self.sensors[sensor]}:TEMP:LOOP:TSET")
+                self.registry[f"heater auto {sensor}"] = self.read_value(f"READ:DEV:{self.sensors[sensor]}:TEMP:LOOP:ENAB", number=False)
+        return dict(self.registry)
 
     ''' ----- Operation functions ----- '''
 
     def clear_status(self):
-        self.visa.write("*CLS")
\ No newline at end of file
+        self.write("*CLS")
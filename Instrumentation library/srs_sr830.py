@@ -1,10 +1,10 @@
 import numpy as np
 import time
-import struct
 from collections import defaultdict
+from instrument import instrument
 
 
-class sr830():
+class sr830(instrument):
 
     ''' Communications with the SR830 uses ASCII characters. Commands may be in either UPPER or lower case and may contain any number of
 embedded space characters. A command to the SR830 consists of a four character command mnemonic, arguments if necessary, and a command terminator.
@@ -19,6 +19,11 @@ the SR830 will hold off handshaking on the GPIB and attempt to hold off handshak
 character output buffer to store outputs until the host computer is ready to receive. If either buffer overflows,
 both buffers are cleared and an error reported. '''
 
+    # commands are paced by *OPC? and may be sent on one line separated by ";" (256 characters input buffer)
+    pacing = "opc"
+    separator = ";"
+    max_line = 255
+
     # SCPI dictionary for writing to instrumentation (refer to manual)
     scpi_w = {"fmod": {"internal": "1",
                        "external": "0"},
@@ -109,9 +114,9 @@ both buffers are cleared and an error reported. '''
                        "gpib": "1"},
               "sync": {"off": "0",
                        "on": "1"},
-              "tran": {"off": 0,
-                       "on dos": 1,
-                       "on win": 2}}
+              "tran": {"off": "0",
+                       "on dos": "1",
+                       "on win": "2"}}
 
     # SCPI dictionary for reading from instrumentation
     scpi_r = defaultdict(dict)
@@ -120,13 +125,13 @@ both buffers are cleared and an error reported. '''
             scpi_r[key][subval] = subkey
 
     def __init__(self, visa, wait=0.01):
-        # create an empty local registry and populate the registry with the current instrumentation settings
+        # create an empty local registry, populated by the "set" functions with the current instrumentation settings
         # when adding/removing parameters, amend "get_settings" method
 
-        self.visa = visa
-        self.wait = wait  # Wait time (in s) after each read / write operation
+        super().__init__(visa, wait)  # wait time (in s) after each read / write operation, if pacing is "sleep"
         self.model = self.read_model()
-        self.visa.write("*RST")  # restore unit to factory default
+        self.write("*RST")  # restore unit to factory default
+        self.registry = {"unit": self.model}
         self.set_interface("gpib")
         self.set_amplitude(0)
 
@@ -135,91 +140,90 @@ both buffers are cleared and an error reported. '''
 
     def set_reference(self, reference):
         # set reference
-        self.visa.write("FMOD {}".format(self.scpi_w["fmod"][reference]))
-        time.sleep(self.wait)
+        self.write("FMOD {}".format(self.scpi_w["fmod"][reference]))
+        self.registry["reference"] = reference
+        self.registry.pop("frequency", None)  # with external reference the frequency is set by the reference signal
 
     def set_frequency(self, frequency):
         # set frequency
-        self.visa.write("FREQ {}".format(frequency))
-        time.sleep(self.wait)
+        self.write("FREQ {}".format(frequency))
+        self.registry["frequency"] = float(frequency)  # as returned by read_frequency
 
     def set_harmonic(self, harmonic):
         # set harmonic
-        self.visa.write("HARM {}".format(harmonic))
-        time.sleep(self.wait)
+        self.write("HARM {}".format(harmonic))
+        self.registry["harmonic"] = int(harmonic)  # as returned by read_harmonic
 
     def set_input(self, input):
         # set input
-        self.visa.write("ISRC {}".format(self.scpi_w["isrc"][input]))
-        time.sleep(self.wait)
+        self.write("ISRC {}".format(self.scpi_w["isrc"][input]))
+        self.registry["input"] = input
 
     def set_shield(self, shield):
         # set shield
-        self.visa.write("IGND {}".format(self.scpi_w["ignd"][shield]))
-        time.sleep(self.wait)
+        self.write("IGND {}".format(self.scpi_w["ignd"][shield]))
+        self.registry["shield"] = shield
 
     def set_coupling(self, coupling):
         # set coupling
-        self.visa.write("ICPL {}".format(self.scpi_w["icpl"][coupling]))
-        time.sleep(self.wait)
+        self.write("ICPL {}".format(self.scpi_w["icpl"][coupling]))
+        self.registry["coupling"] = coupling
 
     def set_notch(self, notch):
         # set notch
-        self.visa.write("ILIN {}".format(self.scpi_w["ilin"][notch]))
-        time.sleep(self.wait)
+        self.write("ILIN {}".format(self.scpi_w["ilin"][notch]))
+        self.registry["notch filter"] = notch
 
     def set_sensitivity(self, sensitivity):
         # set sensitivity
-        self.visa.write("SENS {}".format(self.scpi_w["sens"][sensitivity]))
-        time.sleep(self.wait)
+        self.write("SENS {}".format(self.scpi_w["sens"][sensitivity]))
+        self.registry["sensitivity"] = sensitivity
 
     def set_reserve(self, reserve):
         # set reserve
-        self.visa.write("RMOD {}".format(self.scpi_w["rmod"][reserve]))
-        time.sleep(self.wait)
+        self.write("RMOD {}".format(self.scpi_w["rmod"][reserve]))
+        self.registry["reserve"] = reserve
 
     def set_integration_time(self, integration_time):
         # set integration time
-        self.visa.write("OFLT {}".format(self.scpi_w["oflt"][integration_time]))
-        time.sleep(self.wait)
+        self.write("OFLT {}".format(self.scpi_w["oflt"][integration_time]))
+        self.registry["integration time"] = integration_time
 
     def set_filter(self, filter):
         # set filter
-        self.visa.write("OFSL {}".format(self.scpi_w["ofsl"][filter]))
-        time.sleep(self.wait)
+        self.write("OFSL {}".format(self.scpi_w["ofsl"][filter]))
+        self.registry["filter"] = filter
 
     def set_sync_filter(self, sync):
         # set synchronous filter
-        self.visa.write("SYNC {}".format(self.scpi_w["sync"][sync]))
-        time.sleep(self.wait)
+        self.write("SYNC {}".format(self.scpi_w["sync"][sync]))
+        self.registry["ADC line sync"] = sync
 
     def set_interface(self, interface):
         # set communication interface
-        self.visa.write("OUTX {}".format(self.scpi_w["outx"][interface]))
-        time.sleep(self.wait)
+        self.write("OUTX {}".format(self.scpi_w["outx"][interface]))
 
     def set_sampling_frequency(self, frequency):
         # set sampling frequency
-        self.visa.write("SRAT {}".format(self.scpi_w["srat"][frequency]))
-        time.sleep(self.wait)
+        self.write("SRAT {}".format(self.scpi_w["srat"][frequency]))
+        self.registry["sampling frequency"] = frequency
 
     def set_buffer_type(self, buffer):
         # When the buffer becomes full, data storage can stop or continue. The first case is called 1 Shot (data points are stored for a single buffer length).
         # At the end of the buffer, data storage stops and an audio alarm sounds. The second case is called Loop. In this case, data storage continues at
         # the end of the buffer. The data buffer will store 16383 points and start storing at the beginning again. The most recent 16383 points will be
         # contained in the buffer. Once the buffer has looped around, the oldest point (at any time) is at bin#0 and the most recent point is at bin
-        self.visa.write("SEND {}".format(self.scpi_w["send"][buffer]))
-        time.sleep(self.wait)
+        self.write("SEND {}".format(self.scpi_w["send"][buffer]))
+        self.registry["buffer type"] = buffer
 
     def set_amplitude(self, amplitude):
         # The "SLVL x" command sets or queries the amplitude of the sine output.
         # The parameter x is a voltage (real number of Volts). The value of x will
         # be rounded to 0.002V. The value of x is limited to 0.004 <= x <= 5.000.
         if amplitude <= 0.004:
-            self.visa.write("SLVL 0.004")
+            self.write("SLVL 0.004")
         else:
-            self.visa.write("SLVL {}".format(amplitude))
-        time.sleep(self.wait)
+            self.write("SLVL {}".format(amplitude))
 
     def set_data_transfer_mode(self, mode="off"):
         # data transfer mode can be slow ("off") fast for windows ("on win") or fast for dos ("on dos")
@@ -236,110 +240,92 @@ both buffers are cleared and an error reported. '''
         # listener. Remember, the first transfer will occur with the first point in the scan. If the
         # scan is started from the front panel or from a trigger, then make sure that the SR830 is
         # a talker and the controlling interface a listener BEFORE the scan actually starts.
-        self.visa.write("fast {}".format(self.scpi_w["tran"][mode]))
-        time.sleep(self.wait)
+        self.write("fast {}".format(self.scpi_w["tran"][mode]))
 
     '''----- Read settings functions -----'''
 
     def read_reference(self):
         # read reference
-        val = self.scpi_r["fmod"][self.visa.query("FMOD?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["fmod"][self.query("FMOD?").strip("\n")]
         return val
 
     def read_frequency(self):
         # read frequency
-        val = self.visa.query("FREQ?").strip("\n")
-        time.sleep(self.wait)
+        val = float(self.query("FREQ?").strip("\n"))
         return val
 
     def read_harmonic(self):
         # read harmonic
-        val = self.visa.query("HARM?").strip("\n")
-        time.sleep(self.wait)
+        val = int(self.query("HARM?").strip("\n"))
         return val
 
     def read_input(self):
         # read input
-        val = self.scpi_r["isrc"][self.visa.query("ISRC?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["isrc"][self.query("ISRC?").strip("\n")]
         return val
 
     def read_shield(self):
         # read shield
-        val = self.scpi_r["ignd"][self.visa.query("IGND?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["ignd"][self.query("IGND?").strip("\n")]
         return val
 
     def read_coupling(self):
         # read coupling
-        val = self.scpi_r["icpl"][self.visa.query("ICPL?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["icpl"][self.query("ICPL?").strip("\n")]
         return val
 
     def read_notch(self):
         # read notch
-        val = self.scpi_r["ilin"][self.visa.query("ILIN?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["ilin"][self.query("ILIN?").strip("\n")]
         return val
 
     def read_sensitivity(self):
         # read sensitivity
-        val = self.scpi_r["sens"][self.visa.query("SENS?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["sens"][self.query("SENS?").strip("\n")]
         return val
 
     def read_reserve(self):
         # read reserve
-        val = self.scpi_r["rmod"][self.visa.query("RMOD?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["rmod"][self.query("RMOD?").strip("\n")]
         return val
 
     def read_integration_time(self):
         # read integration time
-        val = self.scpi_r["oflt"][self.visa.query("OFLT?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["oflt"][self.query("OFLT?").strip("\n")]
         return val
 
     def read_filter(self):
         # read filter
-        val = self.scpi_r["ofsl"][self.visa.query("OFSL?").strip("\n").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["ofsl"][self.query("OFSL?").strip("\n").strip("\n")]
         return val
 
     def read_sync_filter(self):
         # read synchronous filter
-        val = self.scpi_r["sync"][self.visa.query("SYNC?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["sync"][self.query("SYNC?").strip("\n")]
         return val
 
     def read_interface(self):
         # read communication interface
-        val = self.scpi_r["outx"][self.visa.query("OUTX?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["outx"][self.query("OUTX?").strip("\n")]
         return val
 
     def read_sampling_frequency(self):
         # read sampling frequency
-        val = self.scpi_r["srat"][self.visa.query("SRAT?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["srat"][self.query("SRAT?").strip("\n")]
         return val
 
     def read_buffer_type(self):
         # read buffer type
-        val = self.scpi_r["send"][self.visa.query("SEND?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["send"][self.query("SEND?").strip("\n")]
         return val
 
     def read_model(self):
         # return model number
-        val = self.visa.query("*IDN?").strip("\n")
-        time.sleep(self.wait)
+        val = self.query("*IDN?").strip("\n")
         return val
 
     def read_data_transfer_mode(self):
-        val = self.scpi_r["tran"][self.visa.query("fast?").strip("\n")]
-        time.sleep(self.wait)
+        val = self.scpi_r["tran"][self.query("fast?").strip("\n")]
         return val
 
     '''----- Operation functions -----'''
@@ -357,8 +343,7 @@ both buffers are cleared and an error reported. '''
                 time.sleep(delay)
 
     def read(self):
-        xy = self.visa.query("SNAP? 1, 2, 9")
-        time.sleep(self.wait)
+        xy = self.query("SNAP? 1, 2, 9")
         x = np.single(xy.split(",")[0])
         y = np.single(xy.split(",")[1])
         # freq = np.single(xy.split(",")[2])
@@ -366,61 +351,92 @@ both buffers are cleared and an error reported. '''
 
     def read_buffer(self, channel, bin_start=0, bin_end=16383, mode="ascii"):
         # read buffer in mode "mode". Bins are numbered from 0 to N-1, where N is the number of samples stored in buffer
+        # "ascii" (TRCA?) returns comma separated values, "binary" (TRCB?) returns IEEE float32 values (4 bytes, little endian)
         self.pause_buffer()
         if mode == "ascii":
-            reading = self.visa.query("TRCA?{},{},{}".format(channel, bin_start, bin_end)).split(",")[0:-1]
-            reading = np.array([float(x) for x in reading])
+            reading = self.query("TRCA?{},{},{}".format(channel, bin_start, bin_end))
+            reading = np.fromstring(reading.strip("\n").rstrip(","), dtype=float, sep=",")
         elif mode == "binary":
-            self.visa.write("TRCB?{},{},{}".format(channel, bin_start, bin_end))
-            reading = self.visa.read_raw()
-            reading = np.array([float(x[0]) for x in struct.iter_unpack('f', reading)])
-        time.sleep(self.wait)
+            self.write("TRCB?{},{},{}".format(channel, bin_start, bin_end), pace=False)
+            reading = np.frombuffer(self.visa.read_raw(), dtype="<f4")  # decoded in place, no copy (read-only array)
         return reading
 
+    def stream(self, samples, chunk=512, mode="on win", expand=1):
+        # Stream X and Y while the scan is running, using the fast data transfer mode (FAST 1/2 and STRD).
+        # Each sample is a pair of 16-bit signed integers (X first, then Y), where ±30000 is ±sensitivity / expand.
+        # Yield X and Y (float32, in V or A) every "chunk" samples, until "samples" samples are transferred.
+        # The sampling rate is the one set by set_sampling_frequency (up to 512 Hz). The buffer is set to "loop",
+        # so that the transfer does not stop after 16383 samples. The visa timeout must be longer than chunk / sampling rate.
+        sensitivity = self.registry["sensitivity"] if "sensitivity" in self.registry else self.read_sensitivity()
+        scale = np.float32(sensitivity / 30000 / expand)
+        self.set_buffer_type("loop")
+        self.set_data_transfer_mode(mode)
+        self.reset_buffer()
+        self.write("STRD", pace=False)  # start scan after 0.5 s. The first transfer occurs with the first point in the scan
+        try:
+            transferred = 0
+            while transferred < samples:
+                n = min(chunk, samples - transferred)
+                xy = np.frombuffer(self.visa.read_bytes(4 * n), dtype="<i2").reshape(n, 2) * scale
+                transferred = transferred + n
+                yield xy[:, 0], xy[:, 1]
+        finally:
+            self.write("PAUS", pace=False)  # no *OPC? while binary samples are still on the bus
+            self.visa.clear()  # discard samples transferred after the pause
+            self.set_data_transfer_mode("off")
+
+    def read_stream(self, samples, chunk=512, mode="on win", expand=1):
+        # stream "samples" samples of X and Y (see stream) into preallocated arrays
+        x = np.empty(samples, dtype=np.float32)
+        y = np.empty(samples, dtype=np.float32)
+        idx = 0
+        for x_, y_ in self.stream(samples, chunk, mode, expand):
+            x[idx:idx + len(x_)] = x_
+            y[idx:idx + len(y_)] = y_
+            idx = idx + len(x_)
+        return x, y
+
     def start_filling_buffer(self):
         self.reset_buffer()
-        self.visa.write("STRT")
-        time.sleep(self.wait)
+        self.write("STRT", pace=False)
 
     def pause_buffer(self):
         # reset buffer
-        self.visa.write("PAUS")
-        time.sleep(self.wait)
+        self.write("PAUS")
 
     def reset_buffer(self):
         # stop buffer storage and reset buffer
-        self.visa.write("REST")
-        time.sleep(self.wait)
+        self.write("REST")
 
     def send_trigger(self):
-        self.visa.write("TRIG")  # send a trigger signal to the lockin
-        time.sleep(self.wait)
+        self.write("TRIG", pace=False)  # send a trigger signal to the lockin
 
     def stop(self):
-        self.visa.write("SLVL 0.004")
-        time.sleep(self.wait)
+        self.write("SLVL 0.004")
 
     def configure(self, reference="internal", amplitude=0, frequency=1000, harmonic=1, input="a-b", shield="float", coupling="ac", sensitivity="20 uV/pA",
                 reserve="normal", integration_time=100e-3, filter="24 dB/oct", notch="no filter", sampling=512, buffer="shot", sync="off"):
         # the unit is always on. To start storing readings in the buffer one has to run "measure"
-        self.set_reference(reference)
-        if reference == "internal":
-            self.set_frequency(frequency)
+        # all settings are sent as a few command lines, paced by *OPC?
+        with self.batch():
+            self.set_reference(reference)
+            if reference == "internal":
+                self.set_frequency(frequency)
+                self.set_amplitude(amplitude)
+            self.set_harmonic(harmonic)
             self.set_amplitude(amplitude)
-        self.set_harmonic(harmonic)
-        self.set_amplitude(amplitude)
-        self.set_input(input)
-        self.set_shield(shield)
-        self.set_coupling(coupling)
-        self.set_sensitivity(sensitivity)
-        self.set_reserve(reserve)
-        self.set_integration_time(integration_time)
-        self.set_filter(filter)
-        self.set_notch(notch)
-        self.set_sampling_frequency(sampling)
-        self.set_buffer_type(buffer)
-        self.set_sync_filter(sync)
-        self.reset_buffer()
+            self.set_input(input)
+            self.set_shield(shield)
+            self.set_coupling(coupling)
+            self.set_sensitivity(sensitivity)
+            self.set_reserve(reserve)
+            self.set_integration_time(integration_time)
+            self.set_filter(filter)
+            self.set_notch(notch)
+            self.set_sampling_frequency(sampling)
+            self.set_buffer_type(buffer)
+            self.set_sync_filter(sync)
+            self.reset_buffer()
 
     def measure(self, samples, reference="internal", frequency=1000, harmonic=1, input="a", shield="float", coupling="ac", sensitivity="1 V/uA",
                 reserve="normal", time=1E-3, filter="6 dB/oct", notch="both", sampling=512, buffer="shot", sync="off"):
@@ -434,25 +450,30 @@ both buffers are cleared and an error reported. '''
 
     def wait_for_buffer_full(self, size):
         # sr830 cannot raise a service request when the buffer is full. One should query the buffer size and wait until full
-        while int(self.visa.query("SPTS?").strip("\n")) < size:
+        while int(self.query("SPTS?", pace=False).strip("\n")) < size:
             time.sleep(self.wait)
             continue
 
-    def get_settings(self):
+    def get_settings(self, refresh=False):
         # read local registry and return a list of tuples (dictionary)
-        return {"unit": self.read_model(),
-                "frequency": self.read_frequency(),
-                "reference": self.read_reference(),
-                "harmonic": self.read_harmonic(),
-                "input": self.read_input(),
-                "shield": self.read_shield(),
-                "coupling": self.read_coupling(),
-                "sensitivity": self.read_sensitivity(),
-                "reserve": self.read_reserve(),
-                "integration time": self.read_integration_time(),
-                "filter": self.read_filter(),
-                "notch filter": self.read_notch(),
-                "sampling frequency": self.read_sampling_frequency(),
-                "buffer type": self.read_buffer_type(),
-                "ADC line sync": self.read_sync_filter(),
+        # settings missing from the registry (not set since *RST) are read from the unit. If refresh is True, all settings are read from the unit
+        read = {"unit": self.read_model,
+                "frequency": self.read_frequency,
+                "reference": self.read_reference,
+                "harmonic": self.read_harmonic,
+                "input": self.read_input,
+                "shield": self.read_shield,
+                "coupling": self.read_coupling,
+                "sensitivity": self.read_sensitivity,
+                "reserve": self.read_reserve,
+                "integration time": self.read_integration_time,
+                "filter": self.read_filter,
+                "notch filter": self.read_notch,
+                "sampling frequency": self.read_sampling_frequency,
+                "buffer type": self.read_buffer_type,
+                "ADC line sync": self.read_sync_filter,
                 }
+        for key in read:
+            if refresh or key not in self.registry:
+                self.registry[key] = read[key]()
+        return {key: self.registry[key] for key in read}
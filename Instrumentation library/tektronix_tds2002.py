@@ -0,0 +1,164 @@
+import numpy as np
+from instrument import instrument
+
+
+class tds2002(instrument):
+
+    """ Class of Tektronix TDS2002 oscilloscope. Waveforms are transferred as signed binary integers (RIBinary), one byte
+    per point, and scaled with the waveform preamble (WFMPre?) of the channel, which is read once and cached until the
+    vertical or horizontal settings change. """
+
+    # commands are paced by *OPC? and may be sent on one line separated by ";"
+    pacing = "opc"
+    separator = ";"
+    max_line = 255
+
+    # fields of the waveform preamble (WFMPre?, with headers off), in the order returned by the unit
+    preamble_fields = ["byt_nr", "bit_nr", "encdg", "bn_fmt", "byt_or", "nr_pt", "wfid", "pt_fmt", "xincr", "pt_off", "xzero", "xunit",
+                       "ymult", "yzero", "yoff", "yunit"]
+
+    def __init__(self, visa, wait=0.01):
+
+        super().__init__(visa, wait)
+        self.visa.timeout = None
+        self.write("header off")  # replies without command headers
+        self.model = self.read_model()
+        self.preamble = {}  # cached preamble of each channel
+        self.start = 1  # first and last point of the transferred waveforms
+        self.stop = 2500
+        self.set_data()
+
+    ''' ----- Set functions -----'''
+
+    def set_channel(self, channel=1, scale=1, coupling="dc", bandwidth="off", position=0, invert="off"):
+        # vertical settings of channel: scale (in V/div), coupling ("dc", "ac" or "gnd"), 20 MHz bandwidth limit ("on" or "off")
+        with self.batch():
+            self.write("ch{}:bandwidth {}".format(channel, bandwidth))
+            self.write("ch{}:coupling {}".format(channel, coupling))
+            self.write("ch{}:invert {}".format(channel, invert))
+            self.write("ch{}:position {}".format(channel, position))
+            self.write("ch{}:scale {}".format(channel, scale))
+        self.preamble.clear()
+
+    def set_horizontal(self, sec_div=1e-3, position=0):
+        # time base (in s/div) and trigger position (in s)
+        with self.batch():
+            self.write("horizontal:main:secdiv {}".format(sec_div))
+            self.write("horizontal:main:position {}".format(position))
+        self.preamble.clear()
+
+    def set_trigger(self, source="ch1", level=0, coupling="dc", slope="rise", mode="normal"):
+        # edge trigger on source ("ch1", "ch2", "ext", "line") at level (in V). Mode is "normal" or "auto"
+        with self.batch():
+            self.write("trigger:main:type edge")
+            self.write("trigger:main:edge:source {}".format(source))
+            self.write("trigger:main:edge:coupling {}".format(coupling))
+            self.write("trigger:main:edge:slope {}".format(slope))
+            self.write("trigger:main:mode {}".format(mode))
+            self.write("trigger:main:level {}".format(level))
+
+    def set_acquire(self, mode="sample", averages=16, stop_after="sequence"):
+        # acquisition mode ("sample", "peakdetect" or "average", with averages = 4, 16, 64 or 128 waveforms).
+        # stop_after "sequence" acquires a single (averaged) waveform for each "acquire:state run", "runstop" runs continuously
+        with self.batch():
+            self.write("acquire:mode {}".format(mode))
+            if mode == "average":
+                self.write("acquire:numavg {}".format(averages))
+            self.write("acquire:stopafter {}".format(stop_after))
+        self.preamble.clear()
+
+    def set_data(self, start=1, stop=2500):
+        # transfer points start to stop (1 to 2500) as signed binary integers, one byte per point (the ADC has 8 bits)
+        with self.batch():
+            self.write("data:encdg ribinary")
+            self.write("data:width 1")
+            self.write("data:start {}".format(start))
+            self.write("data:stop {}".format(stop))
+        self.start = start
+        self.stop = stop
+        self.preamble.clear()
+
+    def set_source(self, channel=1):
+        # select the channel transferred by "curve?"
+        self.write("data:source ch{}".format(channel))
+
+    def autoset(self):
+        self.write("autoset execute")
+        self.preamble.clear()
+
+    ''' ----- Read functions -----'''
+
+    def read_model(self):
+        return self.query("*idn?").strip("\n")
+
+    def read_preamble(self, channel=1):
+        # return the preamble of channel, read from the unit only the first time
+        if channel not in self.preamble:
+            self.set_source(channel)
+            values = self.query("wfmpre?").strip("\n").split(";")
+            preamble = dict(zip(self.preamble_fields, values))
+            for key in ["xincr", "pt_off", "xzero", "ymult", "yzero", "yoff"]:
+                preamble[key] = float(preamble[key])
+            self.preamble[channel] = preamble
+        return self.preamble[channel]
+
+    def read_time(self, channel=1):
+        # time (in s) of the transferred points of channel
+        p = self.read_preamble(channel)
+        return p["xzero"] + p["xincr"] * (np.arange(self.start, self.stop + 1) - p["pt_off"])
+
+    def read_curve(self, channel=1, out=None):
+        # transfer the waveform of channel as raw ADC codes (int8). The IEEE 488.2 block "#<n><count><data>" is decoded in
+        # place. If out is given, the codes are copied into it (e.g. a row of a preallocated array)
+        self.set_source(channel)
+        self.write("curve?", pace=False)
+        raw = self.visa.read_raw()
+        digits = int(raw[1:2])
+        count = int(raw[2:2 + digits])
+        codes = np.frombuffer(raw, dtype=np.int8, count=count, offset=2 + digits)
+        if out is None:
+            return codes
+        out[:] = codes
+        return out
+
+    def scale(self, codes, channel=1):
+        # convert ADC codes of channel to volts
+        p = self.read_preamble(channel)
+        return (codes - p["yoff"]) * p["ymult"] + p["yzero"]
+
+    def read_waveform(self, channel=1):
+        # return time (in s) and voltage (in V) of the waveform on screen
+        self.read_preamble(channel)
+        return self.read_time(channel), self.scale(self.read_curve(channel), channel)
+
+    ''' ----- Operation functions -----'''
+
+    def run(self):
+        self.write("acquire:state run", pace=False)
+
+    def stop_acquisition(self):
+        self.write("acquire:state stop")
+
+    def single(self):
+        # acquire one sequence and wait until it is completed: with "stop after sequence", *OPC? returns when the
+        # acquisition is done
+        self.write("acquire:state run")
+
+    def capture(self, shots, channels=(1, 2), callback=None):
+        # Acquire "shots" single triggered sequences and transfer the waveforms of channels after each of them, into a
+        # preallocated (shots, channels, points) array of ADC codes. callback(shot, codes), if given, is called after each
+        # shot with the codes of that shot. Return time (in s, of the first channel) and voltage (in V) of all shots.
+        # Note: the acquisition must be set to stop after a sequence (set_acquire) and the trigger to "normal"
+        for channel in channels:
+            self.read_preamble(channel)
+        codes = np.empty((shots, len(channels), self.stop - self.start + 1), dtype=np.int8)
+        for shot in range(shots):
+            self.single()
+            for k, channel in enumerate(channels):
+                self.read_curve(channel, out=codes[shot, k])
+            if callback is not None:
+                callback(shot, codes[shot])
+        ymult = np.array([self.preamble[x]["ymult"] for x in channels])[:, None]
+        yoff = np.array([self.preamble[x]["yoff"] for x in channels])[:, None]
+        yzero = np.array([self.preamble[x]["yzero"] for x in channels])[:, None]
+        return self.read_time(channels[0]), (codes - yoff) * ymult + yzero
@@ -0,0 +1,946 @@
+import re
+import time
+from collections import deque
+import numpy as np
+try:
+    from pyvisa.errors import VisaIOError
+except ImportError:  # pyvisa not installed: same constructor and error_code attribute as pyvisa.errors.VisaIOError
+    class VisaIOError(Exception):
+        def __init__(self, error_code):
+            super().__init__(f"VISA error {error_code}")
+            self.error_code = error_code
+
+timeout_error = -1073807339  # VI_ERROR_TMO
+resource_error = -1073807343  # VI_ERROR_RSRC_NFOUND
+
+
+class ResourceManager():
+
+    ''' Software simulator of the VISA resource manager, with the same API as pyvisa.ResourceManager for the functions
+    used by the measurement scripts. It allows to run and profile the drivers of "Instrumentation library" without the
+    units. The units are given as {address: unit}, where unit is either the name of the driver class ("sr830", "smu236",
+    "dmm2182a", "tc336", "mercuryitc", "agilent4294a", "tds2002"; any other name gives a generic unit, which stores the
+    settings written and returns them when queried) or a simulated unit (e.g. SR830(latency=5e-3)). In a script:
+        rm = visa_simulator.ResourceManager({settings.lockin1.address: "sr830"}) if simulate else pyvisa.ResourceManager() '''
+
+    def __init__(self, units=None, **kwargs):
+        """
+        :param units: [dict] address: name of the driver class or simulated unit
+        :param kwargs: arguments of the units given by name (e.g. latency, jitter, bandwidth, speed, seed)
+        """
+        self.units = {}
+        for address, unit in ({} if units is None else units).items():
+            if isinstance(unit, str):
+                unit = models.get(unit.lower(), Resource)(**kwargs)
+            unit.resource_name = address
+            self.units[address] = unit
+
+    def list_resources(self, query="?*::INSTR"):
+        return tuple(self.units)
+
+    def open_resource(self, resource_name, **kwargs):
+        if resource_name not in self.units:
+            raise VisaIOError(resource_error)
+        unit = self.units[resource_name]
+        for key, val in kwargs.items():  # e.g. timeout, read_termination
+            setattr(unit, key, val)
+        return unit
+
+    def close(self):
+        pass
+
+
+class Plant():
+
+    ''' First order thermal model of the sensors of a temperature controller, used by the simulated controllers. The
+    temperature of a sensor whose loop is active relaxes exponentially, with time constant "tau" (in s), to the setpoint,
+    otherwise to "base". The heater output (in %) is proportional to the temperature rise held, 100% for "span" K. '''
+
+    def __init__(self, sensors, base=300, tau=60, span=300):
+        self.base = base
+        self.tau = tau
+        self.span = span
+        self.temperature = dict.fromkeys(sensors, float(base))
+        self.setpoint = dict.fromkeys(sensors, float(base))
+        self.active = dict.fromkeys(sensors, False)
+        self.time = 0
+
+    def update(self, now):
+        # bring the temperatures to the time "now" (in s, clock of the unit)
+        decay = np.exp(-max(now - self.time, 0) / self.tau)
+        for x in self.temperature:
+            target = self.setpoint[x] if self.active[x] else self.base
+            self.temperature[x] = target + (self.temperature[x] - target) * decay
+        self.time = now
+
+    def heater(self, sensor):
+        if not self.active[sensor]:
+            return 0.0
+        return float(np.clip(100 * (self.setpoint[sensor] - self.base) / self.span, 0, 100))
+
+
+class ThermalPlant(Plant):
+
+    ''' Stage and radiation shield model, to test the thermalization of the measurement scripts: the sensors relax as in
+    Plant with time constant "tau", except the sensors in "shields" ({shield sensor: stage sensor}), which relax to the
+    temperature of their stage with time constant "tau_shield". A shield lags behind its stage (second order approach)
+    and settles last. Used as device of the simulated temperature controllers, e.g.
+        MercuryITC(device=ThermalPlant(["DB7.T1", "DB6.T1"], {"DB6.T1": "DB7.T1"}, base=4.2)) '''
+
+    def __init__(self, sensors, shields, base=300, tau=60, tau_shield=300, span=300):
+        super().__init__(sensors, base, tau, span)
+        self.shields = dict(shields)
+        self.tau_shield = tau_shield if abs(tau_shield - tau) > 1e-6 * tau else tau * (1 + 1e-6)  # distinct time constants
+
+    def update(self, now):
+        # bring the temperatures to the time "now" (in s, clock of the unit), with the exact response of the shields to
+        # the exponential approach of their stage
+        dt = max(now - self.time, 0)
+        decay = np.exp(-dt / self.tau)
+        decay_shield = np.exp(-dt / self.tau_shield)
+        for x in self.temperature:
+            if x in self.shields:
+                continue
+            target = self.setpoint[x] if self.active[x] else self.base
+            start = self.temperature[x] - target
+            self.temperature[x] = target + start * decay
+            for shield in [y for y in self.shields if self.shields[y] == x]:
+                a = start * self.tau / (self.tau - self.tau_shield)
+                self.temperature[shield] = target + a * decay + (self.temperature[shield] - target - a) * decay_shield
+        self.time = now
+
+
+class Resource():
+
+    ''' Simulated message-based unit, with the API of the pyvisa resources used by the drivers: write, read, query,
+    read_raw, read_bytes, wait_for_srq, clear and timeout (in ms, None for no timeout).
+    Each line written is split in commands at "separator" and each command is executed by "execute", which returns the
+    reply (str, sent with "terminator", or bytes for binary blocks) or None. Replies are queued until read, one message
+    per reply. The base class stores the settings written ("HEADER args") and returns them when queried ("HEADER?"),
+    answers *IDN? and *OPC?, and waits on *OPC? and *WAI for the end of the running operation ("busy"). The units
+    override "execute" for the commands that return data.
+    Link model: each write and read waits "latency" s, plus a random delay of rms "jitter" s, plus 1 / "bandwidth" s
+    per byte. The unit processes the commands one after the other, each for the time of its mnemonic in "commands", a
+    dict {mnemonic: time in s} matched at the start of the command (case insensitive), e.g. {"TRCA?": 5e-3}. A reply
+    can be read when the commands up to its own are processed, so that commands written before reading their replies
+    (pipelining) overlap the processing with the link.
+    Unit model: acquisitions (sweeps, readings, scans) are timed on the clock of the unit, which runs "speed" times faster
+    than real time, and computed from the elapsed time at each call (no threads). The link always runs in real time.
+    "traffic" counts writes, reads, bytes and time spent on the link, e.g. to regression-test the round trips of a driver. '''
+
+    idn = "SIMULATED,UNIT,0,0"
+    separator = ";"
+    terminator = "\n"
+    latency = 1e-3  # default link model of the unit
+    bandwidth = 100e3
+    commands = {}
+    noise = 0
+    defaults = {}  # replies to the queries of settings not written yet, {normalized header: reply}
+
+    def __init__(self, device=None, latency=None, jitter=0, bandwidth=None, commands=None, noise=None, speed=1, seed=None):
+        """
+        :param device: model of the device under test, see the unit. If None, the default of the unit
+        :param latency: [float] time (in s) of each write and read. If None, the default of the unit
+        :param jitter: [float] rms of the random delay (in s) added to each write and read
+        :param bandwidth: [float] transferred bytes per second. If None, the default of the unit
+        :param commands: [dict] processing time (in s) of each command mnemonic, added to the defaults of the unit
+        :param noise: [float] rms noise of the readings (in the units of the readings). If None, the default of the unit
+        :param speed: [float] speed of the clock of the unit relative to real time
+        :param seed: [int] seed of the noise and jitter generator
+        """
+        self.resource_name = None
+        self.timeout = 2000
+        self.read_termination = None
+        self.write_termination = None
+        self.device = self.default_device() if device is None else device
+        self.latency = self.latency if latency is None else latency
+        self.jitter = jitter
+        self.bandwidth = self.bandwidth if bandwidth is None else bandwidth
+        self.commands = {key.upper(): val for key, val in {**self.commands, **({} if commands is None else commands)}.items()}
+        self.noise = self.noise if noise is None else noise
+        self.speed = speed
+        self.rng = np.random.default_rng(seed)
+        self.origin = time.perf_counter()
+        self.output = deque()  # (time when ready, reply) of the replies waiting to be read
+        self.ready = time.perf_counter()  # time when the unit has processed the commands written
+        self.traffic = {"writes": 0, "reads": 0, "bytes": 0, "time": 0.0}
+        self.reset()
+
+    def default_device(self):
+        return None
+
+    def reset(self):
+        # power-up state of the unit (*RST)
+        self.settings = dict(self.defaults)
+        self.busy = 0  # time (clock of the unit) at which the running operation ends
+        self.srq = None  # time (clock of the unit) of the pending service request
+
+    '''----- Link -----'''
+
+    def link(self, size):
+        # wait for the transfer of "size" bytes
+        dt = self.latency + size / self.bandwidth
+        if self.jitter:
+            dt = dt + abs(self.rng.normal(0, self.jitter))
+        time.sleep(dt)
+        self.traffic["bytes"] = self.traffic["bytes"] + size
+        self.traffic["time"] = self.traffic["time"] + dt
+
+    def processing(self, command):
+        # processing time of command: the longest mnemonic in "commands" which command starts with
+        command = command.strip().upper()
+        matches = [key for key in self.commands if command.startswith(key)]
+        return self.commands[max(matches, key=len)] if matches else 0
+
+    def now(self):
+        # time (in s) on the clock of the unit
+        return (time.perf_counter() - self.origin) * self.speed
+
+    def sleep_until(self, t):
+        # wait until the time t of the clock of the unit
+        dt = (t - self.now()) / self.speed
+        if dt > 0:
+            time.sleep(dt)
+
+    def timed_out(self):
+        if self.timeout is not None:
+            time.sleep(self.timeout / 1e3)
+        raise VisaIOError(timeout_error)
+
+    '''----- VISA resource functions -----'''
+
+    def write(self, message):
+        self.link(len(message) + 1)
+        self.traffic["writes"] = self.traffic["writes"] + 1
+        for command in self.split(message):
+            self.ready = max(self.ready, time.perf_counter()) + self.processing(command)
+            reply = self.execute(command)
+            if reply is not None:
+                self.output.append((self.ready, reply if isinstance(reply, bytes) else (reply + self.terminator).encode()))
+        return len(message)
+
+    def read_raw(self, size=None):
+        if not self.output:
+            self.timed_out()
+        ready, message = self.output.popleft()
+        time.sleep(max(ready - time.perf_counter(), 0))
+        self.link(len(message))
+        self.traffic["reads"] = self.traffic["reads"] + 1
+        return message
+
+    def read(self):
+        return self.read_raw().decode("latin-1")
+
+    def query(self, message, delay=None):
+        self.write(message)
+        return self.read()
+
+    def read_bytes(self, count, chunk_size=None, break_on_termchar=False):
+        # read count bytes of the output, across replies
+        data = bytearray()
+        while len(data) < count:
+            if not self.output:
+                self.timed_out()
+            ready, message = self.output.popleft()
+            time.sleep(max(ready - time.perf_counter(), 0))
+            n = count - len(data)
+            data = data + message[:n]
+            if len(message) > n:
+                self.output.appendleft((ready, message[n:]))
+        self.link(count)
+        self.traffic["reads"] = self.traffic["reads"] + 1
+        return bytes(data)
+
+    def wait_for_srq(self, timeout=25000):
+        # wait for the next service request of the unit (timeout in ms, None for no timeout). With no service request
+        # pending and no timeout, the error is raised at once instead of waiting forever
+        t = self.pending_srq()
+        limit = None if timeout is None else self.now() + timeout / 1e3 * self.speed
+        if t is None or (limit is not None and t > limit):
+            if limit is not None:
+                self.sleep_until(limit)
+            raise VisaIOError(timeout_error)
+        self.sleep_until(t)
+        self.service_srq(t)
+
+    def pending_srq(self):
+        # time of the next service request (clock of the unit), or None
+        return self.srq
+
+    def service_srq(self, t):
+        self.srq = None
+
+    def clear(self):
+        # device clear: discard the replies not read yet
+        self.output.clear()
+
+    def close(self):
+        pass
+
+    '''----- Commands -----'''
+
+    def split(self, message):
+        # commands in the line "message"
+        if self.separator is None:
+            return [message.strip()]
+        return [x.strip() for x in message.strip().split(self.separator) if x.strip()]
+
+    def parse(self, command):
+        # return normalized header, whether the command is a query, and arguments, e.g. "TRCA?1,0,10" -> "TRCA", True, "1,0,10"
+        header, query, args = re.match(r"\s*([^\s?]*)(\??)\s*(.*)", command).groups()
+        return self.normalize(header), query == "?", args.strip()
+
+    def normalize(self, header):
+        return header.upper()
+
+    def value(self, args):
+        # setting stored for the arguments written
+        return args
+
+    def execute(self, command):
+        header, query, args = self.parse(command)
+        if header == "*IDN" and query:
+            return self.idn
+        if header == "*OPC" and query:
+            self.sleep_until(self.busy)
+            return "1"
+        if header == "*WAI":
+            self.sleep_until(self.busy)
+            return None
+        if header == "*RST":
+            self.reset()
+            return None
+        if header == "*CLS":
+            return None
+        if query:  # settings of a channel, e.g. "RANGE? 1", are stored by the units as "RANGE 1"
+            return self.settings.get(f"{header} {args.upper()}" if args else header, self.settings.get(header, "0"))
+        self.settings[header] = self.value(args)
+        return None
+
+
+class SCPI(Resource):
+
+    ''' Simulated SCPI unit: headers are compared in short form (":sense:voltage:nplcycles" and "SENS:VOLT:NPLC" are the
+    same setting), "on" and "off" are stored as "1" and "0", keywords in short form. "aliases" maps the optional nodes. '''
+
+    aliases = {}
+
+    @staticmethod
+    def short(word):
+        # short form of a keyword: the first four letters (three if the fourth is a vowel) and the numeric suffix
+        name, suffix = re.match(r"(\*?[A-Za-z]*)(.*)", word).groups()
+        if len(name) > 4 and not name.startswith("*"):
+            name = name[:3] if name[3].lower() in "aeiou" else name[:4]
+        return (name + suffix).upper()
+
+    def normalize(self, header):
+        header = ":".join(self.short(x) for x in header.strip(":").split(":"))
+        return self.aliases.get(header, header)
+
+    def value(self, args):
+        words = []
+        for x in args.split(","):
+            x = x.strip()
+            x = {"on": "1", "off": "0"}.get(x.lower(), x)
+            words.append(self.short(x) if re.fullmatch(r"[A-Za-z]+\d*", x) else x)
+        return ",".join(words)
+
+
+class SR830(Resource):
+
+    ''' Stanford Research SR830 lock-in amplifier. The data buffer stores X (channel 1) and Y (channel 2) at the sampling
+    rate (SRAT) between STRT (or STRD, which starts the scan after 0.5 s) and PAUS, and is read with TRCA? (ASCII) or
+    TRCB? (float32, little endian). With FAST 1 or 2, STRD streams X and Y as 16-bit integers (read_bytes), with ±30000
+    for ±sensitivity. SNAP? returns X, Y, R, theta and the reference frequency (parameters 1, 2, 3, 4 and 9).
+    device(t, freq) returns the complex rms phasor X + iY (in V) at times t (array, in s, clock of the unit) and
+    reference frequency freq (in Hz). Default: 1 uV at 30 deg. "noise" is the rms noise on X and Y. '''
+
+    idn = "Stanford_Research_Systems,SR830,s/n00000,ver1.07"
+    latency = 1e-3
+    bandwidth = 100e3
+    noise = 1e-9
+    size = 16383  # points of the data buffer
+    sensitivities = [m * 10.0 ** e for e in range(-9, 0) for m in (2, 5, 10)]  # sensitivity (in V) of each SENS code
+    defaults = {"FMOD": "1", "FREQ": "1000.000", "HARM": "1", "ISRC": "0", "IGND": "0", "ICPL": "0", "ILIN": "3", "SENS": "26",
+                "RMOD": "1", "OFLT": "10", "OFSL": "3", "SYNC": "0", "OUTX": "1", "SRAT": "13", "SEND": "1", "FAST": "0", "SLVL": "1.000"}
+
+    def default_device(self):
+        return lambda t, freq: np.full(np.shape(t), 1e-6 * np.exp(1j * np.pi / 6))
+
+    def reset(self):
+        super().reset()
+        self.scan = None  # start and pause time of the scan filling the buffer
+        self.stream = None  # samples transferred by the fast data transfer
+
+    def rate(self):
+        # sampling rate (in Hz): 62.5 mHz x 2^SRAT
+        return 2.0 ** (int(self.settings["SRAT"]) - 4)
+
+    def sample(self, t):
+        z = self.device(np.asarray(t, dtype=float), float(self.settings["FREQ"]))
+        return z + self.noise * (self.rng.standard_normal(np.shape(t)) + 1j * self.rng.standard_normal(np.shape(t)))
+
+    def points(self):
+        # number of points in the buffer
+        if self.scan is None:
+            return 0
+        end = self.now() if self.scan["pause"] is None else self.scan["pause"]
+        if end < self.scan["start"]:
+            return 0
+        return min(int((end - self.scan["start"]) * self.rate()) + 1, self.size)
+
+    def trace(self, channel, start, count):
+        # values of channel (1: X, 2: Y) in bins start to start + count - 1 (the points in the buffer only)
+        k = np.arange(start, min(start + count, self.points()))
+        z = self.sample(self.scan["start"] + k / self.rate()) if len(k) else np.zeros(0, dtype=complex)
+        return z.real if channel == 1 else z.imag
+
+    def execute(self, command):
+        header, query, args = self.parse(command)
+        if header == "SNAP" and query:
+            z = complex(self.sample(self.now()))
+            snap = {1: z.real, 2: z.imag, 3: abs(z), 4: np.degrees(np.angle(z)), 9: float(self.settings["FREQ"])}
+            return ",".join("{:.6e}".format(snap.get(int(x), 0)) for x in args.split(","))
+        if header == "REST":
+            self.scan = None
+            self.stream = None
+            return None
+        if header in ["STRT", "STRD"]:
+            self.scan = {"start": self.now() + (0.5 if header == "STRD" else 0), "pause": None}
+            if header == "STRD" and self.settings["FAST"] != "0":
+                self.stream = 0
+            return None
+        if header == "PAUS":
+            if self.scan is not None and self.scan["pause"] is None:
+                self.scan["pause"] = self.now()
+            self.stream = None
+            return None
+        if header == "SPTS" and query:
+            return str(self.points())
+        if header in ["TRCA", "TRCB"] and query:
+            channel, start, count = [int(x) for x in args.split(",")]
+            values = self.trace(channel, start, count)
+            if header == "TRCB":
+                return values.astype("<f4").tobytes()
+            return "".join("{:.6e},".format(x) for x in values)
+        return super().execute(command)
+
+    def read_bytes(self, count, chunk_size=None, break_on_termchar=False):
+        # during a fast data transfer, the samples are sent as they are acquired
+        if self.stream is not None:
+            n = (count - sum(len(x[1]) for x in self.output)) // 4
+            if n > 0:
+                k = self.stream + np.arange(n)
+                t = self.scan["start"] + k / self.rate()
+                self.sleep_until(t[-1])
+                z = self.sample(t) * 30000 / self.sensitivities[int(self.settings["SENS"])]
+                xy = np.clip(np.round(np.column_stack((z.real, z.imag))), -32768, 32767).astype("<i2")
+                self.output.append((time.perf_counter(), xy.tobytes()))
+                self.stream = self.stream + n
+        return super().read_bytes(count, chunk_size, break_on_termchar)
+
+
+class SMU236(Resource):
+
+    ''' Keithley 236 source measure unit. Commands are a letter and comma separated arguments, terminated by "X" (several
+    commands can be sent in one line). Implemented: F (source and function), B (bias), L (compliance), P, S, O, W, Z, N,
+    M (SRQ mask), T and R (trigger), J0 (reset), Q0-Q2 and Q6-Q8 (fixed, linear and log staircases, created or appended),
+    H0 (trigger), G (output: items, format 2 ASCII or 3 HP binary, one or all lines) and U0, U3, U4, U5 (status).
+    A trigger (H0) runs the programmed sweep (function 1) or takes a reading (function 0). Each point takes its delay
+    plus the integration time x 2^filter; the sweep done (2) or reading done (8) service request is raised at the end,
+    if enabled in the mask. device(level, source) returns the measure (in A or V) of the source levels (array, in V or A)
+    and source ("v" or "i"). Default: 1 MOhm resistor. "noise" is the rms noise relative to the compliance. '''
+
+    idn = "236A06"
+    separator = "X"
+    latency = 5e-3
+    bandwidth = 50e3
+    noise = 1e-6
+    integration = {"0": 416e-6, "1": 4e-3, "2": 16.67e-3, "3": 20e-3}  # integration time (in s) of each S code
+    points_per_decade = {"0": 5, "1": 10, "2": 25, "3": 50}
+
+    def default_device(self):
+        return lambda level, source: level / 1e6 if source == "v" else level * 1e6
+
+    def reset(self):
+        super().reset()
+        self.state = {"F": ["0", "0"], "B": ["0", "0", "0"], "L": ["1.000E-03", "0"], "P": ["0"], "S": ["0"], "O": ["0"], "W": ["1"],
+                      "Z": ["0"], "N": ["0"], "M": ["0", "0"], "T": ["0", "0", "0", "0"], "R": ["0"], "G": ["5", "2", "0"]}
+        self.staircase = []  # (level, delay in ms) of the points of the sweep
+        self.buffer = np.zeros((0, 4))  # source, delay, measure and time (in ms from the trigger) of the points of the last sweep
+        self.started = 0  # time of the trigger of the last sweep
+        self.last = np.zeros(4)  # last reading
+
+    def measure(self, levels):
+        source = "i" if self.state["F"][0] == "1" else "v"
+        levels = np.asarray(levels, dtype=float) * (self.state["N"][0] == "1")  # output in standby: 0
+        compliance = abs(float(self.state["L"][0]))
+        value = self.device(levels, source) + self.noise * compliance * self.rng.standard_normal(np.shape(levels))
+        return np.clip(value, -compliance, compliance)
+
+    def program(self, kind, values):
+        # add the points of staircase Q<kind> to the sweep (kind < 6 creates a new sweep)
+        if kind in [0, 6]:
+            count = int(values[3]) if len(values) > 3 and values[3] else 1
+            delay = float(values[2])
+            levels = np.full(count, float(values[0]))
+        elif kind in [1, 7]:
+            start, stop, step, delay = float(values[0]), float(values[1]), abs(float(values[2])), float(values[4])
+            n = int(round(abs(stop - start) / step)) + 1 if step else 1
+            levels = start + np.sign(stop - start) * step * np.arange(n)
+        elif kind in [2, 8]:
+            start, stop, delay = float(values[0]), float(values[1]), float(values[4])
+            ppd = self.points_per_decade[values[2]]
+            decades = np.log10(stop / start)
+            levels = start * 10 ** (np.sign(decades) * np.arange(int(np.floor(round(abs(decades) * ppd, 9))) + 1) / ppd)
+        else:
+            return
+        if kind < 6:
+            self.staircase = []
+        self.staircase = self.staircase + [(x, delay) for x in levels]
+
+    def trigger(self):
+        # run the sweep or take a reading
+        start = self.now()
+        filt = 2 ** int(self.state["P"][0])
+        mask = int(self.state["M"][0])
+        if self.state["F"][1] == "1":
+            if not self.staircase:
+                return
+            levels, delays = np.array(self.staircase).T
+            t = np.cumsum(delays / 1e3 + self.integration[self.state["S"][0]] * filt)
+            self.buffer = np.column_stack((levels, delays, self.measure(levels), t * 1e3))
+            self.started = start
+            self.busy = start + t[-1]
+            self.last = self.buffer[-1]
+            if mask & 2:
+                self.srq = self.busy
+        else:
+            level, delay = float(self.state["B"][0]), float(self.state["B"][2])
+            t = delay / 1e3 + self.integration[self.state["S"][0]] * filt
+            self.last = np.array([level, delay, float(self.measure(level)), t * 1e3])
+            self.busy = start + t
+            if mask & 8:
+                self.srq = self.busy
+
+    def output_data(self):
+        # reply to G<items>,<format>,<lines>: the last reading (lines 0) or the points of the sweep done so far
+        items, fmt, lines = int(self.state["G"][0]), self.state["G"][1], self.state["G"][2]
+        columns = [k for k, bit in enumerate([1, 2, 4, 8]) if items & bit]
+        if lines == "0":
+            data = self.last[None, columns]
+        else:
+            data = self.buffer[self.started + self.buffer[:, 3] / 1e3 <= self.now()][:, columns]
+        data = data.ravel()
+        if fmt == "3":
+            return b"#A" + (4 * len(data) % 2 ** 16).to_bytes(2, "big") + data.astype(">f4").tobytes() + b"\r\n"
+        return ",".join("{:+.4E}".format(x) for x in data)  # formats 0 and 1 (prefixes) are sent as format 2
+
+    def status(self, kind):
+        F, L, S = self.state["F"], self.state["L"], self.state
+        if kind == "0":
+            return self.idn
+        if kind == "3":
+            return "B0,0,0I0,0K0M{:03d},0N{}R{}T{},{},{},{}Y0".format(int(S["M"][0]), S["N"][0], S["R"][0], *S["T"])
+        if kind == "4":
+            sense = "I" if F[0] == "0" else "V"
+            return "{}MPL,{:02d}F{},{}O{}P{}S{}W{}Z{}".format(sense, int(L[1] or 0), F[0], F[1], S["O"][0], S["P"][0], S["S"][0], S["W"][0], S["Z"][0])
+        if kind == "5":
+            return "ICP{:.3E}".format(float(L[0]))
+        return "0"
+
+    def execute(self, command):
+        letter, values = command[0].upper(), command[1:].split(",")
+        if letter in self.state:
+            for k, x in enumerate(values[:len(self.state[letter])]):
+                if x.strip() != "":
+                    self.state[letter][k] = x.strip()
+            if letter == "G":
+                return self.output_data()
+        elif letter == "J":
+            self.reset()
+        elif letter == "Q":
+            self.program(int(values[0]), values[1:])
+        elif letter == "H":
+            self.trigger()
+        elif letter == "U":
+            return self.status(values[0])
+        return None
+
+
+class DMM2182A(SCPI):
+
+    ''' Keithley 2182A nanovoltmeter. INITiate arms the trigger model: with the immediate, external (assumed as fast as
+    the readings) or timer trigger the unit takes readings one after the other (timer: one per interval), with the bus
+    trigger one per *TRG, up to the trigger count. A reading takes NPLC / line frequency, times the filter count with
+    the repeat filter, plus "overhead". With the trace feed control "next" at INITiate, the first TRACe:POINts readings
+    are stored in the buffer (TRACe:DATA?). The measurement event register holds "reading available" (32) and "buffer
+    full" (512) until read: they raise a service request if enabled (STATus:MEASurement:ENABle) and *SRE 1.
+    device(t) returns the voltage (in V) at times t (array, in s, clock of the unit). Default: 1 uV. "noise" is the rms
+    noise (in V). '''
+
+    idn = "KEITHLEY INSTRUMENTS INC.,MODEL 2182A,0000000,C04 /A02"
+    latency = 1e-3
+    bandwidth = 100e3
+    noise = 10e-9
+    line_frequency = 50
+    overhead = 1e-3
+    aliases = {"SENS:VOLT:CHAN1:RANG:UPP": "SENS:VOLT:CHAN1:RANG", "SENS:VOLT:CHAN2:RANG:UPP": "SENS:VOLT:CHAN2:RANG", "INIT:IMM": "INIT"}
+    defaults = {"SENS:FUNC": '"VOLT"', "SENS:CHAN": "1", "SENS:VOLT:CHAN1:RANG": "120", "SENS:VOLT:CHAN1:RANG:AUTO": "1",
+                "SENS:VOLT:NPLC": "5", "SENS:VOLT:DIG": "8", "SENS:VOLT:LPAS:STAT": "1", "SENS:VOLT:DFIL:STAT": "1",
+                "SENS:VOLT:DFIL:TCON": "MOV", "SENS:VOLT:DFIL:COUN": "10", "SENS:VOLT:DFIL:WIND": "0.01", "TRIG:SOUR": "IMM",
+                "TRIG:COUN": "1", "TRIG:TIM": "0.1", "INIT:CONT": "1", "STAT:MEAS:ENAB": "0", "*SRE": "0", "TRAC:POIN": "2",
+                "TRAC:FEED": "SENS", "TRAC:FEED:CONT": "NEV"}
+
+    def default_device(self):
+        return lambda t: np.full(np.shape(t), 1e-6)
+
+    def reset(self):
+        super().reset()
+        self.run = None  # trigger model armed by INITiate
+        self.cleared = 0  # last time the measurement event register was read
+        self.serviced = 0  # last service request
+
+    def period(self):
+        # duration (in s) of a reading
+        count = int(self.settings["SENS:VOLT:DFIL:COUN"]) if (self.settings["SENS:VOLT:DFIL:STAT"] == "1" and
+                                                             self.settings["SENS:VOLT:DFIL:TCON"] == "REP") else 1
+        return float(self.settings["SENS:VOLT:NPLC"]) / self.line_frequency * count + self.overhead
+
+    def arm(self):
+        count = float(self.settings["TRIG:COUN"]) if self.settings["TRIG:COUN"].upper() not in ["INF", "INFINITE"] else np.inf
+        source = self.settings["TRIG:SOUR"]
+        period = self.period()
+        step = max(float(self.settings["TRIG:TIM"]), period) if source == "TIM" else period
+        buffer = int(self.settings["TRAC:POIN"]) if self.settings["TRAC:FEED:CONT"] == "NEXT" else 0
+        self.run = {"source": source, "count": count, "first": self.now() + period, "step": step, "period": period, "done": [], "buffer": buffer}
+        if buffer:
+            self.settings["TRAC:FEED:CONT"] = "NEV"
+
+    def times(self, stop, count=np.inf):
+        # times of the first readings (at most count) of the run completed by "stop"
+        r = self.run
+        if r is None:
+            return np.zeros(0)
+        if r["source"] == "BUS":
+            t = np.array(r["done"][:int(min(count, len(r["done"])))])
+        else:
+            n = min(count, r["count"], np.floor((stop - r["first"]) / r["step"]) + 1)
+            t = r["first"] + r["step"] * np.arange(max(int(n), 0))
+        return t[t <= stop]
+
+    def next_time(self, after):
+        # time of the first reading of the run after "after", or None
+        r = self.run
+        if r is None:
+            return None
+        if r["source"] == "BUS":
+            t = [x for x in r["done"] if x > after]
+            return t[0] if t else None
+        k = max(np.floor((after - r["first"]) / r["step"]) + 1, 0)
+        return r["first"] + r["step"] * k if k < r["count"] else None
+
+    def full_time(self):
+        # time at which the buffer is full, or None
+        r = self.run
+        if r is None or not r["buffer"]:
+            return None
+        if r["source"] == "BUS":
+            return r["done"][r["buffer"] - 1] if len(r["done"]) >= r["buffer"] else None
+        return r["first"] + r["step"] * (r["buffer"] - 1) if r["buffer"] <= r["count"] else None
+
+    def events(self, start, stop):
+        # bits of the measurement event register set in (start, stop]
+        t = self.next_time(start)
+        full = self.full_time()
+        return 32 * (t is not None and t <= stop) + 512 * (full is not None and start < full <= stop)
+
+    def pending_srq(self):
+        if not int(self.settings["*SRE"]) & 1 or self.run is None:
+            return None
+        enable = int(self.settings["STAT:MEAS:ENAB"])
+        after = max(self.cleared, self.serviced)
+        candidates = []
+        if enable & 32:
+            candidates.append(self.next_time(after))
+        if enable & 512:
+            full = self.full_time()
+            candidates.append(full if full is not None and full > after else None)
+        candidates = [x for x in candidates if x is not None]
+        return min(candidates) if candidates else None
+
+    def service_srq(self, t):
+        self.serviced = t
+
+    def reading(self, t):
+        t = np.asarray(t, dtype=float)
+        return self.device(t) + self.noise * self.rng.standard_normal(np.shape(t))
+
+    def execute(self, command):
+        header, query, args = self.parse(command)
+        now = self.now()
+        if header == "SYST:PRES":
+            self.reset()
+        elif header == "INIT":
+            self.arm()
+        elif header == "ABOR":
+            self.run = None
+        elif header == "*TRG":
+            if self.run is not None and self.run["source"] == "BUS" and len(self.run["done"]) < self.run["count"]:
+                last = self.run["done"][-1] if self.run["done"] else now
+                self.run["done"].append(max(now, last) + self.run["period"])
+        elif header == "*CLS":
+            self.cleared = now
+        elif header == "STAT:MEAS:EVEN" and query:
+            events = self.events(self.cleared, now)
+            self.cleared = now
+            return str(events)
+        elif header in ["SENS:DATA:LAT", "SENS:DATA:FRES", "FETC"] and query:
+            t = self.times(now)
+            return "{:+.9E}".format(float(self.reading(t[-1])) if len(t) else 9.9e37)
+        elif header == "TRAC:DATA" and query:
+            t = self.times(now, self.run["buffer"] if self.run is not None else 0)
+            return ",".join("{:+.9E}".format(x) for x in self.reading(t))
+        elif header == "TRAC:CLE":
+            if self.run is not None:
+                self.run["buffer"] = 0
+        else:
+            return super().execute(command)
+        return None
+
+
+class TC336(Resource):
+
+    ''' Lakeshore 336 temperature controller: KRDG? returns the temperature (in K) of input A-D, or of all inputs (0).
+    Output 1 controls input A and output 2 input B, when its heater range is not off. Settings of an input or output,
+    e.g. "RANGE 1,3", are stored per channel and returned by "RANGE? 1".
+    device is the thermal model of the inputs (a Plant). Default: first order, 300 K base. "noise" is the rms noise (in K). '''
+
+    idn = "LSCI,MODEL336,0000000/0000000,1.0"
+    latency = 5e-3
+    bandwidth = 20e3
+    noise = 1e-3
+    inputs = ["A", "B", "C", "D"]
+    loops = {"1": "A", "2": "B"}  # input controlled by each output
+    defaults = {"RANGE 1": "0", "RANGE 2": "0", "SETP 1": "0", "SETP 2": "0", "PID 1": "+50.0,+20.0,+0", "PID 2": "+50.0,+20.0,+0",
+                "FILTER A": "1,10,2", "FILTER B": "1,10,2", "FILTER C": "1,10,2", "FILTER D": "1,10,2"}
+
+    def default_device(self):
+        return Plant(self.inputs, base=300)
+
+    def temperature(self, channel):
+        self.device.update(self.now())
+        return self.device.temperature[channel] + self.noise * self.rng.standard_normal()
+
+    def execute(self, command):
+        header, query, args = self.parse(command)
+        if header == "KRDG" and query:
+            channels = self.inputs if args.strip() in ["", "0"] else [args.strip().upper()]
+            return ",".join("{:+.3f}".format(self.temperature(x)) for x in channels)
+        if header[0] != "*" and not query and "," in args:
+            channel, value = args.split(",", 1)
+            channel = channel.strip().upper()
+            self.settings[f"{header} {channel}"] = value.strip()
+            if channel in self.loops and header in ["SETP", "RANGE"]:
+                self.device.update(self.now())
+                loop = self.loops[channel]
+                if header == "SETP":
+                    self.device.setpoint[loop] = float(value)
+                self.device.active[loop] = self.settings.get(f"RANGE {channel}", "0") != "0"
+            return None
+        return super().execute(command)
+
+
+class MercuryITC(Resource):
+
+    ''' Oxford Instruments Mercury iTC temperature controller. Every command is sent on its own line and replied to:
+    READ:SYS:CAT (boards fitted), READ:SYS:MAN, READ:DEV:<uid>:TEMP:<noun>... with the nouns SIG:TEMP, LOOP:TSET,
+    LOOP:HSET and LOOP:ENAB (several nouns in one command), SET:DEV:<uid>:TEMP:LOOP:TSET:<value> and ...:LOOP:ENAB:ON/OFF.
+    The loop of a sensor holds its setpoint when enabled.
+    device is the thermal model of the sensors (a Plant). Default: first order, 4.2 K base. "noise" is the rms noise (in K). '''
+
+    idn = "IDN:OXFORD INSTRUMENTS:MERCURY ITC:000000:1.0"
+    separator = None
+    latency = 2e-3
+    bandwidth = 10e3
+    commands = {"READ:": 10e-3, "SET:": 10e-3}
+    noise = 1e-4
+    boards = {"MB0.H1": "HTR", "MB1.T1": "TEMP", "DB6.T1": "TEMP", "DB7.T1": "TEMP", "DB8.T1": "TEMP"}
+
+    def default_device(self):
+        return Plant([x for x in self.boards if self.boards[x] == "TEMP"], base=4.2, tau=60, span=300)
+
+    def noun(self, uid, noun):
+        # value of noun of sensor uid, as replied by the unit
+        plant = self.device
+        if noun == "SIG:TEMP":
+            return "{:.4f}K".format(plant.temperature[uid] + self.noise * self.rng.standard_normal())
+        if noun == "LOOP:TSET":
+            return "{:.4f}K".format(plant.setpoint[uid])
+        if noun == "LOOP:HSET":
+            return "{:.4f}".format(plant.heater(uid))
+        if noun == "LOOP:ENAB":
+            return "ON" if plant.active[uid] else "OFF"
+        return "NOT_FOUND"
+
+    def execute(self, command):
+        command = command.strip()
+        nodes = command.split(":")
+        if command == "*CLS":
+            return None
+        if command.startswith("*"):
+            return self.idn if command == "*IDN?" else f"STAT:{command}:VALID"
+        if command == "READ:SYS:CAT":
+            return "STAT:SYS:CAT" + "".join(f":DEV:{uid}:{kind}" for uid, kind in self.boards.items())
+        if command == "READ:SYS:MAN":
+            return "STAT:SYS:MAN:HVER:MERCURY ITC:FVER:1.0:SERL:000000"
+        if len(nodes) < 6 or nodes[1] != "DEV" or self.boards.get(nodes[2]) != "TEMP":
+            return f"STAT:{':'.join(nodes[1:])}:INVALID"
+        uid = nodes[2]
+        self.device.update(self.now())
+        if nodes[0] == "READ":
+            nouns = [":".join(nodes[k:k + 2]) for k in range(4, len(nodes) - 1, 2)]
+            return f"STAT:DEV:{uid}:TEMP" + "".join(f":{x}:{self.noun(uid, x)}" for x in nouns)
+        if nodes[0] == "SET" and len(nodes) == 7:
+            noun, value = ":".join(nodes[4:6]), nodes[6]
+            if noun == "LOOP:TSET":
+                self.device.setpoint[uid] = float(value)
+            elif noun == "LOOP:ENAB":
+                self.device.active[uid] = value.upper() == "ON"
+            return f"STAT:{command}:VALID"
+        return f"STAT:{':'.join(nodes[1:])}:INVALID"
+
+
+class Agilent4294A(Resource):
+
+    ''' Agilent 4294A precision impedance analyzer. SING measures a sweep (STAR, STOP, POIN, SWPT LIN or LOG) in
+    POIN x (point time x BWFACT + PDELT) + SDELT s; *WAI waits for its end. OUTPDTRC? returns the readout and subsidiary
+    (0) of each point of the trace selected by TRAC (A or B) for the parameters of MEAS (IMPH: |Z| and theta, IRIM: R and
+    X, AMPH: |Y| and theta, ARIM: G and B), OUTPSWPRM? the sweep parameter values. Data are sent in the format of FORM2
+    (float32), FORM3 (float64), FORM4 (ASCII) or FORM5 (float32, little endian) as IEEE 488.2 blocks.
+    device(f) returns the complex impedance (in Ohm) at frequencies f (array, in Hz). Default: 1 MOhm parallel to 10 pF.
+    "noise" is the rms noise relative to the readout. '''
+
+    idn = "HEWLETT-PACKARD,4294A,MY00000000,01.20"
+    latency = 1e-3
+    bandwidth = 500e3
+    noise = 1e-4
+    point_time = 3e-3  # measurement time (in s) of a point with bandwidth 1
+    blocks = {"2": ">f4", "3": ">f8", "5": "<f4"}
+    defaults = {"MEAS": "IMPH", "SWPP": "FREQ", "SWPT": "LIN", "STAR": "40", "STOP": "110000000", "POIN": "201", "TRAC": "A", "BWFACT": "1",
+                "PAVERFACT": "4", "PAVER": "OFF", "SDELT": "0", "PDELT": "0", "POWMOD": "VOLT", "POWE": "0.5", "DCMOD": "VOLT", "DCV": "0",
+                "DCI": "0", "FORM": "4"}
+
+    def default_device(self):
+        return lambda f: 1 / (1 / 1e6 + 2j * np.pi * f * 10e-12)
+
+    def reset(self):
+        super().reset()
+        self.z = None  # impedance measured by the last sweep
+
+    def frequency(self):
+        start, stop, points = float(self.settings["STAR"]), float(self.settings["STOP"]), int(float(self.settings["POIN"]))
+        return np.geomspace(start, stop, points) if self.settings["SWPT"].upper() == "LOG" else np.linspace(start, stop, points)
+
+    def sweep(self):
+        f = self.frequency()
+        z = self.device(f)
+        self.z = z * (1 + self.noise * self.rng.standard_normal(len(f)))
+        self.busy = self.now() + len(f) * (self.point_time * float(self.settings["BWFACT"]) + float(self.settings["PDELT"])) + float(self.settings["SDELT"])
+
+    def trace(self):
+        if self.z is None:
+            self.sweep()
+        z = self.z
+        meas = self.settings["MEAS"].upper()
+        if meas in ["AMPH", "ARIM"]:
+            z = 1 / z
+        if meas in ["IRIM", "ARIM"]:
+            readout = z.real if self.settings["TRAC"].upper() == "A" else z.imag
+        else:
+            readout = np.abs(z) if self.settings["TRAC"].upper() == "A" else np.degrees(np.angle(z))
+        return np.column_stack((readout, np.zeros(len(z)))).ravel()
+
+    def block(self, values):
+        fmt = self.settings["FORM"]
+        if fmt not in self.blocks:
+            return ",".join("{:+.12E}".format(x) for x in values)
+        data = np.asarray(values).astype(self.blocks[fmt]).tobytes()
+        count = str(len(data))
+        return f"#{len(count)}{count}".encode() + data + b"\n"
+
+    def execute(self, command):
+        header, query, args = self.parse(command)
+        if header.startswith("FORM") and len(header) == 5:
+            self.settings["FORM"] = header[4]
+            return None
+        if header == "SING":
+            self.sweep()
+            return None
+        if header == "OUTPDTRC" and query:
+            return self.block(self.trace())
+        if header == "OUTPSWPRM" and query:
+            return self.block(self.frequency())
+        if header in ["STAR", "STOP", "POIN", "SWPT"] and not query:
+            self.z = None
+        return super().execute(command)
+
+
+class TDS2002(SCPI):
+
+    ''' Tektronix TDS2002 oscilloscope. With ACQuire:STOPAfter SEQuence, ACQuire:STATE RUN acquires one waveform after the
+    next trigger ("trigger_period" s) and 10 divisions of the time base; *OPC? waits for it. CURVe? returns the points
+    DATa:STARt to DATa:STOP of the channel DATa:SOUrce as signed bytes (RIBinary, 25 codes per division), WFMPre? the
+    preamble to scale them (with headers off). With ACQuire:MODe AVErage the noise is divided by sqrt(ACQuire:NUMAVg).
+    device(t, channel) returns the voltage (in V) of channel at times t (array, in s from the trigger). Default: a 1 V
+    step at t = 0 on channel 2 and its response through a 1 ms RC filter on channel 1. "noise" is the rms noise (in V). '''
+
+    idn = "TEKTRONIX,TDS 2002,0,CF:91.1CT FV:v4.12 TDS2CM:CMV:v1.04"
+    latency = 2e-3
+    bandwidth = 100e3
+    noise = 2e-3
+    record = 2500
+    trigger_period = 10e-3
+    defaults = {"CH1:SCAL": "1", "CH2:SCAL": "1", "CH1:POS": "0", "CH2:POS": "0", "HOR:MAIN:SECD": "5e-4", "HOR:MAIN:POS": "0",
+                "DATA:SOUR": "CH1", "DATA:STAR": "1", "DATA:STOP": "2500", "ACQ:MODE": "SAMP", "ACQ:NUM": "16", "ACQ:STOP": "RUNS"}
+
+    def default_device(self):
+        return lambda t, channel: (t >= 0) * (1.0 if channel == 2 else 1 - np.exp(-np.clip(t, 0, None) / 1e-3))
+
+    def preamble(self, channel):
+        # xincr, xzero, ymult and yoff of channel: the record spans 10 divisions around the trigger position
+        secdiv = float(self.settings["HOR:MAIN:SECD"])
+        return {"xincr": 10 * secdiv / self.record, "xzero": float(self.settings["HOR:MAIN:POS"]) - 5 * secdiv,
+                "ymult": float(self.settings[f"CH{channel}:SCAL"]) / 25, "yoff": -25 * float(self.settings[f"CH{channel}:POS"])}
+
+    def source(self):
+        return int(self.settings["DATA:SOUR"][2:])
+
+    def execute(self, command):
+        header, query, args = self.parse(command)
+        if header == "WFMP" and query:
+            channel = self.source()
+            p = self.preamble(channel)
+            points = int(self.settings["DATA:STOP"]) - int(self.settings["DATA:STAR"]) + 1
+            wfid = '"Ch{}, DC coupling, {} V/div, {} s/div, {} points, Sample mode"'.format(channel, self.settings[f"CH{channel}:SCAL"],
+                                                                                           self.settings["HOR:MAIN:SECD"], self.record)
+            return ";".join(str(x) for x in [1, 8, "BIN", "RI", "MSB", points, wfid, "Y", "{:.4E}".format(p["xincr"]), 0,
+                                             "{:.4E}".format(p["xzero"]), '"s"', "{:.4E}".format(p["ymult"]), "0.0E0",
+                                             "{:.4E}".format(p["yoff"]), '"Volts"'])
+        if header == "CURV" and query:
+            channel = self.source()
+            p = self.preamble(channel)
+            k = np.arange(int(self.settings["DATA:STAR"]), int(self.settings["DATA:STOP"]) + 1)
+            averages = int(self.settings["ACQ:NUM"]) if self.settings["ACQ:MODE"] == "AVER" else 1
+            v = self.device(p["xzero"] + p["xincr"] * k, channel) + self.noise / np.sqrt(averages) * self.rng.standard_normal(len(k))
+            codes = np.clip(np.round(v / p["ymult"] + p["yoff"]), -128, 127).astype(np.int8).tobytes()
+            count = str(len(codes))
+            return f"#{len(count)}{count}".encode() + codes + b"\n"
+        if header == "ACQ:STAT" and not query and self.value(args) in ["1", "RUN"]:
+            self.busy = self.now() + self.trigger_period + 10 * float(self.settings["HOR:MAIN:SECD"])
+        return super().execute(command)
+
+
+# simulated unit of each driver class
+models = {"sr830": SR830, "smu236": SMU236, "dmm2182a": DMM2182A, "tc336": TC336, "mercuryitc": MercuryITC, "agilent4294a": Agilent4294A,
+          "tds2002": TDS2002}
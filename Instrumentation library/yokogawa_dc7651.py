@@ -1,9 +1,14 @@
 import time
 import numpy as np
 from collections import defaultdict
+from instrument import instrument
 
 
-class dc7651():
+class dc7651(instrument):
+
+    # the unit does not support *OPC?: commands are paced by a fixed wait and sent one by one
+    pacing = "sleep"
+    separator = None
 
     # SCPI dictionary for writing to instrumentation (refer to manual)
     scpi_w = {"function": {"v": "1",
@@ -38,7 +43,7 @@ class dc7651():
                 scpi_r[key][subval] = subkey
 
     def __init__(self, visa, wait=0.01):
-        self.visa = visa
+        super().__init__(visa, wait)
         self.reset_unit()
         # self.model =
 
@@ -46,34 +51,27 @@ class dc7651():
 
     def set_function(self, function):
         # function can be either "i" or "v"
-        self.visa.write("F{}".format(self.scpi_w["function"][function]))
-        time.sleep(self.wait)
+        self.write("F{}".format(self.scpi_w["function"][function]))
 
     def set_range(self, function, source_range):
-        self.visa.write("R{}".format(self.scpi_w["range"][function][source_range]))
-        time.sleep(self.wait)
+        self.write("R{}".format(self.scpi_w["range"][function][source_range]))
 
     def set_output_level(self, level):
-        self.visa.write("S{}".format(level))
-        time.sleep(self.wait)
+        self.write("S{}".format(level))
 
     def set_mode(self, mode):
-        self.visa.write("M{}".format(mode))
-        time.sleep(self.wait)
+        self.write("M{}".format(mode))
 
     def set_voltage_compliance(self, level):
         # value in Volts
-        self.visa.write("LV{}".format(level))
-        time.sleep(self.wait)
+        self.write("LV{}".format(level))
 
     def set_current_compliance(self, level):
         # value in mA
-        self.visa.write("LA{}".format(level))
-        time.sleep(self.wait)
+        self.write("LA{}".format(level))
 
     def set_polarity(self, polarity):
-        self.visa.write("SG{}".format(polarity))
-        time.sleep(self.wait)
+        self.write("SG{}".format(polarity))
 
     ''' ----- Read functions ----- '''
 
@@ -81,21 +79,43 @@ class dc7651():
 
     def switch_on(self):
         # a trigger is required to execute the commands
-        self.visa.write("O1")
-        time.sleep(self.wait)
+        self.write("O1")
         self.send_trigger()
 
     def switch_off(self):
         # a trigger is required to execute the commands
-        self.visa.write("O0")
-        time.sleep(self.wait)
+        self.write("O0")
         self.send_trigger()
 
     def send_trigger(self):
-        self.visa.write("E")
+        self.write("E", pace=False)
 
     def reset_unit(self):
-        self.visa.write("RC")
+        self.write("RC", pace=False)
+
+    def program(self, levels, interval=1, slope=0, mode="single"):
+        # Store levels as the steps of a program in the unit memory (between PRS and PRE), executed one step every
+        # "interval" s (0.1 to 3600 s) with a ramp of "slope" s to each step (0: steps). Mode is "single" (the program
+        # runs once) or "repeat". The program is started by run_program. Note: the memory holds 50 steps, in the
+        # current function and range. Returns the number of steps.
+        if len(levels) > 50:
+            exit(f"Cannot program {len(levels)} steps: the program memory of the unit holds 50 steps... Execution terminated.")
+        self.write("PRS")
+        for level in levels:
+            self.set_output_level(level)
+        self.write("PRE")
+        self.write("PI{}".format(interval))
+        self.write("SW{}".format(slope))
+        self.set_mode(self.scpi_w["mode"][mode])
+        return len(levels)
+
+    def run_program(self):
+        # run the stored program from the first step, hardware-timed by the unit
+        self.write("RU2")
+
+    def hold_program(self):
+        # hold the program at the current step
+        self.write("RU0")
 
     def configure(self, function="v", source_range=10e-3, voltage_compliance=1, current_compliance=1, polarity="+", mode="single"):
         # DC source configuration
@@ -122,7 +142,7 @@ class dc7651():
         for level in np.linspace(start, stop, n_step, endpoint=True):
             self.set_output_level(level)
             self.send_trigger()
-            if self.wait() < abs(start - stop) / n_step / rate:
+            if self.wait < abs(start - stop) / n_step / rate:
                 # wait an additional time to make the total time wait corresponding to the chosen wait
                 time.sleep(abs(start - stop) / n_step / rate - self.wait)
             else:
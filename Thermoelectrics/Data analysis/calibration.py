@@ -9,7 +9,6 @@ from Objects.measurement import *
 from scipy.optimize import curve_fit
 import numpy as np
 from numpy import savetxt
-import pickle
 # endregion
 
 main = r"C:/Data"
@@ -28,17 +27,15 @@ for idx, experiment in enumerate(calibration):
     try:
         filename_th1 = rf"{main}\{chip}\{device}\calibration\{experiment[0]}.data"
         print(f"Loading experiment {filename_th1}... ", end="")
-        with open(filename_th1, "rb") as f:
-            file_th1 = pickle.load(f)
-            print("Done.")
+        file_th1 = Experiment.load(filename_th1)
+        print("Done.")
         if not (isinstance(file_th1, Experiment) and isinstance(file_th1.data, Thermoelectrics.Calibration)):
             exit("The passed object is not Calibration type.")
 
         filename_th2 = rf"{main}\{chip}\{device}\calibration\{experiment[1]}.data"
         print(f"Loading experiment {filename_th2}... ", end="")
-        with open(filename_th2, "rb") as f:
-            file_th2 = pickle.load(f)
-            print("Done.")
+        file_th2 = Experiment.load(filename_th2)
+        print("Done.")
         if not (isinstance(file_th2, Experiment) and isinstance(file_th2.data, Thermoelectrics.Calibration)):
             exit("The passed object is not Calibration type.")
 
@@ -48,17 +45,15 @@ for idx, experiment in enumerate(calibration):
     try:
         filename_h1_th1 = rf"{main}\{chip}\{device}\calibration\{experiment[2][0]}.data"
         print(f"Loading experiment {filename_h1_th1}... ", end="")
-        with open(filename_h1_th1, "rb") as f:
-            file_h1_th1 = pickle.load(f)
-            print("Done.")
+        file_h1_th1 = Experiment.load(filename_h1_th1)
+        print("Done.")
         if not(isinstance(file_h1_th1, Experiment) and isinstance(file_h1_th1.data, Thermoelectrics.Calibration)):
             exit("The passed object is not Calibration type.")
 
         filename_h1_th2 = rf"{main}\{chip}\{device}\calibration\{experiment[2][1]}.data"
         print(f"Loading experiment {filename_h1_th2}... ", end="")
-        with open(filename_h1_th2, "rb") as f:
-            file_h1_th2 = pickle.load(f)
-            print("Done.")
+        file_h1_th2 = Experiment.load(filename_h1_th2)
+        print("Done.")
         if not(isinstance(file_h1_th2, Experiment) and isinstance(file_h1_th2.data, Thermoelectrics.Calibration)):
             exit("The passed object is not Calibration type.")
 
@@ -68,15 +63,13 @@ for idx, experiment in enumerate(calibration):
     try:
         filename_h2_th1 = rf"{main}\{chip}\{device}\calibration\{experiment[3][0]}.data"
         print(f"Loading experiment {filename_h2_th1}... ", end="")
-        with open(filename_h2_th1, "rb") as f:
-            file_h2_th1 = pickle.load(f)
+        file_h2_th1 = Experiment.load(filename_h2_th1)
         if not(isinstance(file_h2_th1, Experiment) and isinstance(file_h2_th1.data, Thermoelectrics.Calibration)):
             exit("The passed object is not Calibration type.")
 
         filename_h2_th2 = rf"{main}\{chip}\{device}\calibration\{experiment[3][1]}.data"
         print(f"Loading experiment {filename_h2_th2}... ", end="")
-        with open(filename_h2_th2, "rb") as f:
-            file_h2_th2 = pickle.load(f)
+        file_h2_th2 = Experiment.load(filename_h2_th2)
         if not(isinstance(file_h2_th2, Experiment) and isinstance(file_h2_th2.data, Thermoelectrics.Calibration)):
             exit("The passed object is not Calibration type.")
         flag_h2 = True
@@ -3,8 +3,8 @@ import matplotlib.gridspec as gridspec
 import matplotlib
 import numpy as np
 from scipy.optimize import curve_fit
+from Objects.measurement import Experiment
 # from Thermoelectrics.Data_analysis.functions import sinfunc, cosfunc
-import pickle
 
 main = r"C:/Data"
 chip = "tep_ch5_00"
@@ -84,8 +84,7 @@ for idx, experiment in enumerate(sweeps):
     path2 = rf"{main}\{chip}\{device}\calibration vs frequency\{experiment[1]}.data"
 
     print(f"Loading experiment {path1}... ", end="")
-    with open(path1, "rb") as f:
-        data1 = pickle.load(f)
+    data1 = Experiment.load(path1)
     if data1.data.t[0]["dr"]["h1"] is not None:
         data1 = data1.data.t[0]["dr"]["h1"]
     elif data1.data.t[0]["dr"]["h2"] is not None:
@@ -93,8 +92,7 @@ for idx, experiment in enumerate(sweeps):
     print("Done.")
 
     print(f"Loading experiment {path2}... ", end="")
-    with open(path2, "rb") as f:
-        data2 = pickle.load(f)
+    data2 = Experiment.load(path2)
     if data2.data.t[0]["dr"]["h1"] is not None:
         data2 = data2.data.t[0]["dr"]["h1"]
     elif data2.data.t[0]["dr"]["h2"] is not None:
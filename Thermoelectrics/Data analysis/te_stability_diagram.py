@@ -2,8 +2,7 @@ import matplotlib.pyplot as plt
 import matplotlib
 import numpy as np
 import pandas as pd
-from Objects.measurement import Figure
-import pickle
+from Objects.measurement import Figure, Experiment
 
 main = r"C:/Data"
 chip = "tep_ch5_10"
@@ -21,8 +20,7 @@ i_h = 1e-3
 # Load stability diagram
 path = rf"{main}\{chip}\{device}\te stability diagram\{sd_raw}"
 print(f"Loading stability diagram... ", end="")
-with open(path, "rb") as f:
-    data = pickle.load(f).data
+data = Experiment.load(path).data
 print("Done.")
 # Load calibration data
 print(f"Loading calibration data... ", end="")
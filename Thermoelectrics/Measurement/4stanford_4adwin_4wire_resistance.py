@@ -6,7 +6,7 @@ import lakeshore_tc336
 import oxford_mercury_itc
 import pyvisa
 import os
-from numpy import mean, std, ctypeslib
+from numpy import mean, std
 from scipy.stats import linregress
 import pickle
 from Objects.measurement import *
@@ -129,6 +129,7 @@ if settings.adc.model == 0:
     adc.adw.Load_Process(routines_dir + "/sweep_ao1.TB5")  # Load sweep AO1-2
     adc.adw.Load_Process(routines_dir + "/sweep_ao2.TB6")  # Load sweep AO1-2
     adc.adw.Load_Process(routines_dir + "/sweep_ao1-2.TB7")  # Load sweep AO1-2
+    adc.adw.Load_Process(routines_dir + "/sweep_ao1-2_stats_ai.TB9")  # Load sweep AO1-2 and statistics of AI
     adc.adw.Set_Processdelay(1, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(2, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(3, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
@@ -136,6 +137,7 @@ if settings.adc.model == 0:
     adc.adw.Set_Processdelay(5, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(6, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(7, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
+    adc.adw.Set_Processdelay(9, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     # n. of points to average in hardware = nplc / line freq * scanrate
     adc.adw.Set_Par(33, int(ceil(settings.adc.nplc / settings.adc.line_freq * settings.adc.scanrate)))
     # in hardware settling time: no. of loops to wait after setting output)
@@ -171,29 +173,22 @@ plt.pause(0.25)
 print("Done.")  # endregion
 
 # region ----- Make iv -----
+# mean, standard deviation, min and max of AI1 and AI2 are computed on the ADwin at each point (process 9)
 print("Making iv(s)... ", end="")
-adc.adw.SetData_Long(list(adc.voltage2bin(fet.vds / settings.avv2.gain, bits=settings.adc.output_resolution)), 21, 1, len(fet.vds))
-adc.adw.Set_Par(41, len(fet.vds))  # set length of AO-AI arrays
-adc.adw.Start_Process(3)
-idx_ = 0
-while True:
-    if adc.adw.Process_Status(3):
-        idx = adc.adw.Get_Par(35) - 1  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-    else:
-        idx = adc.adw.Get_Par(35)  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-    if idx > idx_:
-        ai1 = ctypeslib.as_array(adc.adw.GetData_Float(1, idx_ + 1, idx - idx_))
-        fet.data[0, idx_: idx, 3] = adc.bin2voltage(ai1, bits=settings.adc.input_resolution) / settings.avi2.gain
-        ai2 = ctypeslib.as_array(adc.adw.GetData_Float(2, idx_ + 1, idx - idx_))
-        fet.data[0, idx_: idx, 7] = adc.bin2voltage(ai2, bits=settings.adc.input_resolution) / settings.avv4.gain
-        fet.data[0, idx_: idx, 2] = fet.vds[idx_: idx] / settings.avv2.gain
-        plot1.ax.lines[0].set_data(fet.data[0, 0: idx, 3], fet.data[0, 0: idx, 2])
-        idx_ = idx
+
+
+def update_iv(idx_, idx, stats, trace):
+    fet.data[0, idx_: idx, 3] = stats["avg"][idx_: idx, 0] / settings.avi2.gain
+    fet.data[0, idx_: idx, 7] = stats["avg"][idx_: idx, 1] / settings.avv4.gain
+    fet.data[0, idx_: idx, 2] = fet.vds[idx_: idx] / settings.avv2.gain
+    plot1.ax.lines[0].set_data(fet.data[0, 0: idx, 3], fet.data[0, 0: idx, 2])
     plot1.ax.relim()
     plot1.ax.autoscale_view()
     plt.pause(0.1)
-    if idx == len(fet.vds):
-        break
+
+
+adc.stats(fet.vds / settings.avv2.gain, None, int(ceil(settings.adc.nplc / settings.adc.line_freq * settings.adc.scanrate)),
+          settling_time=int(ceil(settings.adc.iv_settling_time * settings.adc.scanrate)), callback=update_iv, bits=settings.adc.input_resolution)
 print("Done.")  # endregion
 
 # region ----- Save data to disc -----
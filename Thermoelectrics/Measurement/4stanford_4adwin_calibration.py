@@ -6,11 +6,12 @@ import lakeshore_tc336
 import oxford_mercury_itc
 import pyvisa
 import os
-from numpy import mean, std, ctypeslib
+from numpy import mean, std
 from scipy.stats import linregress
-import pickle
 from Objects.measurement import *
 from Utilities.signal_processing import *
+from Utilities.poller import Poller, store
+from Utilities.settling import SettlingDetector
 import time
 import datetime
 # endregion
@@ -70,6 +71,10 @@ settings.tc.sampling_freq = 1               # [int] temperature sampling frequen
 settings.tc.settling_time = 0.01*15 * 60         # [float] cryostat thermalization time (in s).
 settings.tc.settling_time_init = 0.01 * 15 * 60    # [float] cryostat initial thermalization time (in s).
 settings.tc.settling_time_after_heater_sweep = settings.tc.settling_time  # [float] cryostat thermalization time (in s) after heater sweep.
+settings.tc.settling_adaptive = True        # [bool] stop waiting as soon as stage and shield are settled (settling_time is then the max. waiting time)
+settings.tc.settling_tolerance = 0.05       # [float] max. distance (in K) of the stage temperature from the setpoint
+settings.tc.settling_drift = 1e-3           # [float] max. drift (in K/min) of stage and shield temperatures
+settings.tc.settling_window = 60            # [float] time (in s) over which drift and distance from the setpoint are estimated
 # ----- adc settings -----
 settings.__setattr__("adc", EmptyClass())
 settings.adc.model = 0                      # [int] select adc model (0: adwin gold ii)
@@ -203,6 +208,7 @@ if settings.adc.model == 0:
     adc.adw.Load_Process(routines_dir + "/sweep_ao1.TB5")  # Load sweep AO1-2
     adc.adw.Load_Process(routines_dir + "/sweep_ao2.TB6")  # Load sweep AO1-2
     adc.adw.Load_Process(routines_dir + "/sweep_ao1-2.TB7")  # Load sweep AO1-2
+    adc.adw.Load_Process(routines_dir + "/sweep_ao1-2_stats_ai.TB9")  # Load sweep AO1-2 and statistics of AI
     adc.adw.Set_Processdelay(1, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(2, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(3, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
@@ -210,6 +216,7 @@ if settings.adc.model == 0:
     adc.adw.Set_Processdelay(5, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(6, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(7, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
+    adc.adw.Set_Processdelay(9, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     # n. of points to average in hardware = nplc / line freq * scanrate
     adc.adw.Set_Par(33, int(ceil(settings.adc.nplc / settings.adc.line_freq * settings.adc.scanrate)))
     # in hardware settling time: no. of loops to wait after setting output)
@@ -279,6 +286,8 @@ print(f"Current working directory set to: {os.getcwd()}")
 # region ----- Allocate RAM -----
 print("Allocating RAM... ", end="")
 data = Thermoelectrics.Calibration(heater, thermometer, t, i_h, t_h, i_th, i_th_ex, settings)
+experiment.data = data
+experiment.save()  # write the header: measured blocks are then appended to the file
 print("Done.")
 # endregion
 
@@ -317,30 +326,38 @@ for idx_t, val_t in enumerate(t):
         else:
             settling_time = settings.tc.settling_time
 
-        # record data
-        k = 0
-        t0 = time.time()
+        # record data: the temperature controller is sampled on a fixed schedule in a background thread, and the plot is updated from the main thread
+        tt = data.t[idx_t]["tt"]
+        poller = Poller(1 / settings.tc.sampling_freq, samples=len(tt.time))
+        poller.add_channel("tc", tc.read_temperature, "all", fields=["stage", "shield", None, None])
+        poller.add_sink(store(tt, ["stage", "shield"]))
+        samples = poller.subscribe()
+        detector = SettlingDetector({"stage": val_t, "shield": None}, settings.tc.settling_tolerance, settings.tc.settling_drift, settings.tc.settling_window)
         if idx_t > 0:
             setpoint_line.remove()
         plot2.ax.set_xlim([0, settling_time])  # duration must be updated because the initial settling time is different from the regular time
         setpoint_line = plot2.ax.add_line(Line2D(xdata=array([0, settling_time]), ydata=array([val_t, val_t]), color="grey", linewidth=1, linestyle="--"))  # add setpoint
-        while time.time() - t0 <= settling_time:
-            data.t[idx_t]["tt"].time[k] = time.time() - t0
-            data.t[idx_t]["tt"].stage[k] = tc.read_temperature("a")
-            data.t[idx_t]["tt"].shield[k] = tc.read_temperature("b")
-            plot2.ax.lines[0].set_data(data.t[idx_t]["tt"].time[0:k+1], data.t[idx_t]["tt"].stage[0:k+1])
-            plot2.ax.lines[1].set_data(data.t[idx_t]["tt"].time[0:k+1], data.t[idx_t]["tt"].shield[0:k+1])
-            plot2.ax.relim()
-            plot2.ax.autoscale_view("y")
+        k = 0
+        poller.start()
+        while poller.is_alive() or not samples.empty():
+            new_samples = Poller.drain(samples)
+            if new_samples:
+                k = new_samples[-1]["index"] + 1
+                plot2.live.set_data(plot2.ax.lines[0], tt.time[0:k], tt.stage[0:k])
+                plot2.live.set_data(plot2.ax.lines[1], tt.time[0:k], tt.shield[0:k])
+                plot2.live.update()
+                if detector.update(new_samples) and settings.tc.settling_adaptive:
+                    poller.stop()  # settled: the remaining thermalization time is skipped
             plt.pause(1 / settings.tc.sampling_freq)
-            k = k + 1
+        if poller.error is not None:
+            raise poller.error
 
         # remove trailing zeros from saved data
         data.t[idx_t]["tt"].time = data.t[idx_t]["tt"].time[0:k]
         data.t[idx_t]["tt"].stage = data.t[idx_t]["tt"].stage[0:k]
         data.t[idx_t]["tt"].shield = data.t[idx_t]["tt"].shield[0:k]
 
-        print("Done.")  # endregion
+        print(f"Done (settled in {detector.settled_at:.0f} s)." if detector.ready else "Done.")  # endregion
 
         # save figure to disc
         print("Saving thermalization figure to disc... ", end="")
@@ -354,44 +371,23 @@ for idx_t, val_t in enumerate(t):
     # endregion
 
     # region ----- Make iv -----
+    # the thermometer voltages are averaged on the ADwin (process 9): only their statistics are transferred
     print("Making iv(s)... ", end="")
-    adc.adw.SetData_Long(list(adc.voltage2bin(i_th / settings.src1.gain, bits=settings.adc.output_resolution)), 21, 1, len(i_th))
-    adc.adw.SetData_Long(list(adc.voltage2bin(i_th / settings.src1.gain, bits=settings.adc.output_resolution)), 22, 1, len(i_th))
-    adc.adw.Set_Par(41, len(i_th))  # set length of AO-AI arrays
-
-    if thermometer == 0:
-        process_n = 3
-    elif thermometer == 1:
-        process_n = 1
-    elif thermometer == 2:
-        process_n = 2
-    adc.adw.Start_Process(process_n)
+    v_th = i_th / settings.src1.gain
+    iv_samples = int(ceil(settings.adc.nplc / settings.adc.line_freq * settings.adc.scanrate))  # loops read at each point
+    iv_settling = int(ceil(settings.adc.iv_settling_time * settings.adc.scanrate))  # loops to wait at each point
 
     # real time data acquisition and plotting
-    idx_ = 0
-    while True:  # scan index must be > 1 to have at least 1 completed measurement in adc memory to query
-        if adc.adw.Process_Status(process_n):
-            idx = adc.adw.Get_Par(35) - 1  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-        else:
-            idx = adc.adw.Get_Par(35)  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-        if idx > idx_:
-            if thermometer == 0 or thermometer == 1:
-                ai1 = ctypeslib.as_array(adc.adw.GetData_Float(1, idx_ + 1, idx - idx_))
-                data.t[idx_t]["iv1"].v[idx_: idx] = adc.bin2voltage(ai1, bits=settings.adc.input_resolution) / settings.avv1.gain
-                plot1.iv1.lines[idx_t].set_data(data.t[idx_t]["iv1"].i[0: idx], data.t[idx_t]["iv1"].v[0: idx])
-                plot1.iv1.relim()
-                plot1.iv1.autoscale_view("y")
-
-            if thermometer == 0 or thermometer == 2:
-                ai2 = ctypeslib.as_array(adc.adw.GetData_Float(2, idx_ + 1, idx - idx_))
-                data.t[idx_t]["iv2"].v[idx_: idx] = adc.bin2voltage(ai2, bits=settings.adc.input_resolution) / settings.avv2.gain
-                plot1.iv2.lines[idx_t].set_data(data.t[idx_t]["iv2"].i[0: idx], data.t[idx_t]["iv2"].v[0: idx])
-                plot1.iv2.relim()
-                plot1.iv2.autoscale_view("y")
-            idx_ = idx
+    for idx_, idx, stats, _ in adc.stream_stats(v_th if thermometer in (0, 1) else None, v_th if thermometer in (0, 2) else None, iv_samples, settling_time=iv_settling, bits=settings.adc.input_resolution):
+        if thermometer == 0 or thermometer == 1:
+            data.t[idx_t]["iv1"].v[idx_: idx] = stats["avg"][idx_: idx, 0] / settings.avv1.gain
+            plot1.live.set_data(plot1.iv1.lines[idx_t], data.t[idx_t]["iv1"].i[0: idx], data.t[idx_t]["iv1"].v[0: idx])
+
+        if thermometer == 0 or thermometer == 2:
+            data.t[idx_t]["iv2"].v[idx_: idx] = stats["avg"][idx_: idx, 1] / settings.avv2.gain
+            plot1.live.set_data(plot1.iv2.lines[idx_t], data.t[idx_t]["iv2"].i[0: idx], data.t[idx_t]["iv2"].v[0: idx])
+        plot1.live.update()
         plt.pause(0.25)
-        if idx == len(i_th):
-            break
     print("Done.")  # endregion
 
     # region ----- Calculate resistance and update plots -----
@@ -400,24 +396,17 @@ for idx_t, val_t in enumerate(t):
         fit1 = linregress(data.t[idx_t]["iv1"].i, data.t[idx_t]["iv1"].v)
         data.t[idx_t]["iv1"].r = fit1[0]
         data.t[idx_t]["iv1"].r_stderr = fit1[4]
-        plot1.rt1.lines[idx_t].set_data(data.t[idx_t]["t"], data.t[idx_t]["iv1"].r)
-        plot1.rterr1.lines[idx_t].set_data(data.t[idx_t]["t"], data.t[idx_t]["iv1"].r_stderr)
-        plot1.rt1.relim()
-        plot1.rt1.autoscale_view("y")
-        plot1.rterr1.relim()
-        plot1.rterr1.autoscale_view("y")
+        plot1.live.set_data(plot1.rt1.lines[idx_t], data.t[idx_t]["t"], data.t[idx_t]["iv1"].r)
+        plot1.live.set_data(plot1.rterr1.lines[idx_t], data.t[idx_t]["t"], data.t[idx_t]["iv1"].r_stderr)
 
     if thermometer == 0 or thermometer == 2:
         fit2 = linregress(data.t[idx_t]["iv2"].i, data.t[idx_t]["iv2"].v)
         data.t[idx_t]["iv2"].r = fit2[0]
         data.t[idx_t]["iv2"].r_stderr = fit2[4]
-        plot1.rt2.lines[idx_t].set_data(data.t[idx_t]["t"], data.t[idx_t]["iv2"].r)
-        plot1.rterr2.lines[idx_t].set_data(data.t[idx_t]["t"], data.t[idx_t]["iv2"].r_stderr)
-        plot1.rt2.relim()
-        plot1.rt2.autoscale_view("y")
-        plot1.rterr2.relim()
-        plot1.rterr2.autoscale_view("y")
+        plot1.live.set_data(plot1.rt2.lines[idx_t], data.t[idx_t]["t"], data.t[idx_t]["iv2"].r)
+        plot1.live.set_data(plot1.rterr2.lines[idx_t], data.t[idx_t]["t"], data.t[idx_t]["iv2"].r_stderr)
 
+    plot1.live.update()
     plt.pause(0.25)
     print("Done.")  # endregion
 
@@ -489,65 +478,49 @@ for idx_t, val_t in enumerate(t):
             idx_ = 0
             vt_samples = int((settings.adc.vt_settling_time + settings.adc.vt_measurement_time) / (settings.adc.nplc / settings.adc.line_freq))
 
-            while True:  # scan index must be > 1 to have at least 1 completed measurement in adc memory to query
-                if adc.adw.Process_Status(4):
-                    idx = adc.adw.Get_Par(35) - 1  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-                else:
-                    idx = adc.adw.Get_Par(35)  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-                if idx > idx_:
-
-                    adc_time = idx2time(linspace(idx_, idx, idx - idx_, endpoint=False), settings.adc.nplc, settings.adc.line_freq)
-
-                    if thermometer == 0 or thermometer == 1:
-                        # read from adc
-                        ai1 = ctypeslib.as_array(adc.adw.GetData_Float(1, idx_ + 1, idx - idx_))
-                        ai3 = ctypeslib.as_array(adc.adw.GetData_Float(3, idx_ + 1, idx - idx_))
-                        ai5 = ctypeslib.as_array(adc.adw.GetData_Float(5, idx_ + 1, idx - idx_))
-
-                        # convert inputs to resistances. When using external adc, Lockin Output = (signal/sensitivity - offset) x Expand x 10 V
-                        v1 = adc.bin2voltage(ai1, bits=settings.adc.input_resolution) / settings.avv1.gain / i_th_ex
-                        v3 = adc.bin2voltage(ai3, bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avv1.gain / i_th_ex
-                        v5 = - adc.bin2voltage(ai5, bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avv1.gain / i_th_ex
-
-                        # store data in data object
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].time[idx_:idx] = adc_time
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].raw[idx_:idx] = v1
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].x[idx_:idx] = v3
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].y[idx_:idx] = v5
-
-                        # update plot
-                        plot3.ax.lines[0].set_data(data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].x[0:idx+1])
-                        plot3.ax.lines[1].set_data(data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].y[0:idx+1])
-
-                    if thermometer == 0 or thermometer == 2:
-
-                        # read from adc
-                        ai2 = ctypeslib.as_array(adc.adw.GetData_Float(2, idx_ + 1, idx - idx_))
-                        ai4 = ctypeslib.as_array(adc.adw.GetData_Float(4, idx_ + 1, idx - idx_))
-                        ai6 = ctypeslib.as_array(adc.adw.GetData_Float(6, idx_ + 1, idx - idx_))
-
-                        # convert inputs to resistances. When using external adc, Lockin Output = (signal/sensitivity - offset) x Expand x 10 V
-                        v2 = adc.bin2voltage(ai2, bits=settings.adc.input_resolution) / settings.avv2.gain / i_th_ex
-                        v4 = adc.bin2voltage(ai4, bits=settings.adc.input_resolution) * settings.lockin2.sensitivity / 10 / settings.avv2.gain / i_th_ex
-                        v6 = - adc.bin2voltage(ai6, bits=settings.adc.input_resolution) * settings.lockin2.sensitivity / 10 / settings.avv2.gain / i_th_ex
-
-                        # store data in data object
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].time[idx_:idx] = adc_time
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].raw[idx_:idx] = v2
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].x[idx_:idx] = v4
-                        data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].y[idx_:idx] = v6
-
-                        # update plot
-                        plot3.ax.lines[2].set_data(data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].x[0:idx+1])
-                        plot3.ax.lines[3].set_data(data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].y[0:idx+1])
-                    idx_ = idx
-                plot3.ax.relim()
-                plot3.ax.autoscale_view(scalex=False, scaley=True)
-                plt.pause(0.5)
-
-                if idx == vt_samples:
-                    print("Done.")
-                    break
+            channels = {0: [1, 2, 3, 4, 5, 6], 1: [1, 3, 5], 2: [2, 4, 6]}[thermometer]
+
+            # stream yields only when new samples are available: all channels are read for the same scan index range
+            for idx_, idx, chunk in adc.stream(4, channels, vt_samples):
+                ai = dict(zip(channels, chunk))
+
+                adc_time = idx2time(linspace(idx_, idx, idx - idx_, endpoint=False), settings.adc.nplc, settings.adc.line_freq)
+
+                if thermometer == 0 or thermometer == 1:
+                    # convert inputs to resistances. When using external adc, Lockin Output = (signal/sensitivity - offset) x Expand x 10 V
+                    v1 = adc.bin2voltage(ai[1], bits=settings.adc.input_resolution) / settings.avv1.gain / i_th_ex
+                    v3 = adc.bin2voltage(ai[3], bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avv1.gain / i_th_ex
+                    v5 = - adc.bin2voltage(ai[5], bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avv1.gain / i_th_ex
+
+                    # store data in data object
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].time[idx_:idx] = adc_time
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].raw[idx_:idx] = v1
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].x[idx_:idx] = v3
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].y[idx_:idx] = v5
+
+                    # update plot
+                    plot3.live.set_data(plot3.ax.lines[0], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].x[0:idx+1])
+                    plot3.live.set_data(plot3.ax.lines[1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt1"].y[0:idx+1])
+
+                if thermometer == 0 or thermometer == 2:
+                    # convert inputs to resistances. When using external adc, Lockin Output = (signal/sensitivity - offset) x Expand x 10 V
+                    v2 = adc.bin2voltage(ai[2], bits=settings.adc.input_resolution) / settings.avv2.gain / i_th_ex
+                    v4 = adc.bin2voltage(ai[4], bits=settings.adc.input_resolution) * settings.lockin2.sensitivity / 10 / settings.avv2.gain / i_th_ex
+                    v6 = - adc.bin2voltage(ai[6], bits=settings.adc.input_resolution) * settings.lockin2.sensitivity / 10 / settings.avv2.gain / i_th_ex
+
+                    # store data in data object
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].time[idx_:idx] = adc_time
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].raw[idx_:idx] = v2
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].x[idx_:idx] = v4
+                    data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].y[idx_:idx] = v6
+
+                    # update plot
+                    plot3.live.set_data(plot3.ax.lines[2], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].x[0:idx+1])
+                    plot3.live.set_data(plot3.ax.lines[3], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].time[0:idx+1], data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["drt2"].y[0:idx+1])
+
+                plot3.live.update()
+                plt.pause(0.05)
+            print("Done.")
             # endregion
 
             print("Saving oscillations figure to disc... ", end="")
@@ -601,29 +574,13 @@ for idx_t, val_t in enumerate(t):
 
             # region ----- Make iv -----
             print("Measuring DC components (making iv(s))... ", end="")
-            adc.adw.SetData_Long(list(adc.voltage2bin(i_th / settings.src1.gain, bits=settings.adc.output_resolution)), 21, 1, len(i_th))
-            adc.adw.SetData_Long(list(adc.voltage2bin(i_th / settings.src1.gain, bits=settings.adc.output_resolution)), 22, 1, len(i_th))
-            adc.adw.Set_Par(41, len(i_th))  # set length of AO-AI arrays
-
-            if thermometer == 0:
-                process_n = 3
-            elif thermometer == 1:
-                process_n = 1
-            elif thermometer == 2:
-                process_n = 2
-            adc.start_process(process_n)
-
-            adc.start_process(thermometer)  # launch process
-            while adc.process_status(process_n):
-                plt.pause(0.5)
+            stats, _ = adc.stats(v_th if thermometer in (0, 1) else None, v_th if thermometer in (0, 2) else None, iv_samples, settling_time=iv_settling, bits=settings.adc.input_resolution)
 
             if thermometer == 0 or thermometer == 1:
-                ai1 = ctypeslib.as_array(adc.adw.GetData_Float(1, 1, len(i_th)))
-                data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["iv1"].v = adc.bin2voltage(ai1, bits=settings.adc.input_resolution) / settings.avv1.gain
+                data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["iv1"].v = stats["avg"][:, 0] / settings.avv1.gain
 
             if thermometer == 0 or thermometer == 2:
-                ai2 = ctypeslib.as_array(adc.adw.GetData_Float(2, 1, len(i_th)))
-                data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["iv2"].v = adc.bin2voltage(ai2, bits=settings.adc.input_resolution) / settings.avv2.gain
+                data.t[idx_t]["dr"][f"h{heater}"][idx_i_h]["iv2"].v = stats["avg"][:, 1] / settings.avv2.gain
 
             print("Done.")  # endregion
 
@@ -646,52 +603,30 @@ for idx_t, val_t in enumerate(t):
 
             # region ----- Update plots -----
             print("Updating plots.... ", end="")
+            idx_dr = data.dr_index[idx_t]  # index of the heater sweep in data.dr and data.dr_iv
             if thermometer == 0 or thermometer == 1:
 
-                plot1.drx1.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt1"].x_avg for k in range(idx_i_h+1)])
-                plot1.drx1.relim()
-                plot1.drx1.autoscale_view("y")
-                plot1.drxerr1.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt1"].x_stddev for k in range(idx_i_h+1)])
-                plot1.drxerr1.relim()
-                plot1.drxerr1.autoscale_view("y")
-
-                plot1.dry1.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt1"].y_avg for k in range(idx_i_h+1)])
-                plot1.dry1.relim()
-                plot1.dry1.autoscale_view("y")
-                plot1.dryerr1.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt1"].y_stddev for k in range(idx_i_h+1)])
-                plot1.dryerr1.relim()
-                plot1.dryerr1.autoscale_view("y")
-
-                plot1.drdc1.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["iv1"].r - data.t[idx_t]["iv1"].r for k in range(idx_i_h+1)])
-                plot1.drdc1.relim()
-                plot1.drdc1.autoscale_view("y")
-                plot1.drdcerr1.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [sqrt(data.t[idx_t]["dr"][f"h{heater}"][k]["iv1"].r_stderr ** 2 + data.t[idx_t]["iv1"].r_stderr ** 2) for k in range(idx_i_h+1)])
-                plot1.drdcerr1.relim()
-                plot1.drdcerr1.autoscale_view("y")
+                plot1.live.set_data(plot1.drx1.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["x_avg"][idx_dr, 0: idx_i_h+1, 0])
+                plot1.live.set_data(plot1.drxerr1.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["x_stddev"][idx_dr, 0: idx_i_h+1, 0])
+
+                plot1.live.set_data(plot1.dry1.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["y_avg"][idx_dr, 0: idx_i_h+1, 0])
+                plot1.live.set_data(plot1.dryerr1.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["y_stddev"][idx_dr, 0: idx_i_h+1, 0])
+
+                plot1.live.set_data(plot1.drdc1.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr_iv["r"][idx_dr, 0: idx_i_h+1, 0] - data.iv["r"][idx_t, 0])
+                plot1.live.set_data(plot1.drdcerr1.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], sqrt(data.dr_iv["r_stderr"][idx_dr, 0: idx_i_h+1, 0] ** 2 + data.iv["r_stderr"][idx_t, 0] ** 2))
 
             if thermometer == 0 or thermometer == 2:
 
-                plot1.drx2.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt2"].x_avg for k in range(idx_i_h+1)])
-                plot1.drx2.relim()
-                plot1.drx2.autoscale_view("y")
-                plot1.drxerr2.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt2"].x_stddev for k in range(idx_i_h+1)])
-                plot1.drxerr2.relim()
-                plot1.drxerr2.autoscale_view("y")
-
-                plot1.dry2.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt2"].y_avg for k in range(idx_i_h+1)])
-                plot1.dry2.relim()
-                plot1.dry2.autoscale_view("y")
-                plot1.dryerr2.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["drt2"].y_stddev for k in range(idx_i_h+1)])
-                plot1.dryerr2.relim()
-                plot1.dryerr2.autoscale_view("y")
-
-                plot1.drdc2.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [data.t[idx_t]["dr"][f"h{heater}"][k]["iv2"].r - data.t[idx_t]["iv2"].r for k in range(idx_i_h+1)])
-                plot1.drdc2.relim()
-                plot1.drdc2.autoscale_view("y")
-                plot1.drdcerr2.lines[idx_t_h].set_data(1e3*i_h[0: idx_i_h+1], [sqrt(data.t[idx_t]["dr"][f"h{heater}"][k]["iv2"].r_stderr ** 2 + data.t[idx_t]["iv2"].r_stderr ** 2) for k in range(idx_i_h+1)])
-                plot1.drdcerr2.relim()
-                plot1.drdcerr2.autoscale_view("y")
+                plot1.live.set_data(plot1.drx2.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["x_avg"][idx_dr, 0: idx_i_h+1, 1])
+                plot1.live.set_data(plot1.drxerr2.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["x_stddev"][idx_dr, 0: idx_i_h+1, 1])
+
+                plot1.live.set_data(plot1.dry2.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["y_avg"][idx_dr, 0: idx_i_h+1, 1])
+                plot1.live.set_data(plot1.dryerr2.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr["y_stddev"][idx_dr, 0: idx_i_h+1, 1])
+
+                plot1.live.set_data(plot1.drdc2.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], data.dr_iv["r"][idx_dr, 0: idx_i_h+1, 1] - data.iv["r"][idx_t, 1])
+                plot1.live.set_data(plot1.drdcerr2.lines[idx_t_h], 1e3*i_h[0: idx_i_h+1], sqrt(data.dr_iv["r_stderr"][idx_dr, 0: idx_i_h+1, 1] ** 2 + data.iv["r_stderr"][idx_t, 1] ** 2))
 
+            plot1.live.update()
             plt.pause(0.25)
             print("Done.")
             # endregion
@@ -711,20 +646,18 @@ for idx_t, val_t in enumerate(t):
 
         idx_t_h = idx_t_h + 1
 
-        # Wait a bit to thermalize after heater sweep
+        # Wait a bit to thermalize after heater sweep (with adaptive settling, the thermalization is detected at the next temperature)
         t0temp = time.time()
-        while time.time() - t0temp <= settings.tc.settling_time_after_heater_sweep:
+        while not settings.tc.settling_adaptive and time.time() - t0temp <= settings.tc.settling_time_after_heater_sweep:
             plt.pause(0.25)
 
     # region ----- Save data to disc -----
     print("Saving data to disc... ", end="")
-    experiment.data = data
-    if os.path.exists(experiment.filename):
-        if os.path.exists(experiment.backupname):
-            os.remove(experiment.backupname)
-        os.rename(experiment.filename, experiment.backupname)
-    with open(experiment.filename, "wb") as file:
-        pickle.dump(experiment, file)
+    experiment.append("t", idx_t, "tt")
+    experiment.append("iv", index=idx_t)
+    if data.dr_index[idx_t] is not None:
+        experiment.append("dr", index=data.dr_index[idx_t])
+        experiment.append("dr_iv", index=data.dr_index[idx_t])
     print("Done.")
 
     print("Saving figure to disc... ", end="")
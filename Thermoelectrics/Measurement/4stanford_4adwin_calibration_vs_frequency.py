@@ -7,7 +7,6 @@ import oxford_mercury_itc
 import pyvisa
 import os
 from numpy import mean, std, arctan, rad2deg, ctypeslib, logspace
-import pickle
 from Objects.measurement import *
 from Utilities.signal_processing import *
 import time
@@ -268,6 +267,8 @@ print(f"Current working directory set to: {os.getcwd()}")
 # region ----- Allocate RAM -----
 print("Allocating RAM... ", end="")
 data = Thermoelectrics.TemperatureVsFrequency(heater, thermometer, t, i_h, f, settings)
+experiment.data = data
+experiment.save()  # write the header: measured blocks are then appended to the file
 print("Done.")
 # endregion
 
@@ -310,8 +311,7 @@ for idx_t, val_t in enumerate(t):
         setpoint_line = plot0.ax.add_line(Line2D(xdata=array([0, settling_time]), ydata=array([val_t, val_t]), color="grey", linewidth=1, linestyle="--"))  # add setpoint
         while time.time() - t0 <= settling_time:
             data.t[idx_t]["tt"].time[k] = time.time() - t0
-            data.t[idx_t]["tt"].stage[k] = tc.read_temperature("a")
-            data.t[idx_t]["tt"].shield[k] = tc.read_temperature("b")
+            data.t[idx_t]["tt"].stage[k], data.t[idx_t]["tt"].shield[k] = tc.read_temperature("all")[:2]
             plot0.ax.lines[0].set_data(data.t[idx_t]["tt"].time[0:k + 1], data.t[idx_t]["tt"].stage[0:k + 1])
             plot0.ax.lines[1].set_data(data.t[idx_t]["tt"].time[0:k + 1], data.t[idx_t]["tt"].shield[0:k + 1])
             plot0.ax.relim()
@@ -630,13 +630,7 @@ for idx_t, val_t in enumerate(t):
 
     # region ----- Save data to disc -----
     print("Saving data to disc... ", end="")
-    experiment.data = data
-    if os.path.exists(experiment.filename):
-        if os.path.exists(experiment.backupname):
-            os.remove(experiment.backupname)
-        os.rename(experiment.filename, experiment.backupname)
-    with open(experiment.filename, "wb") as file:
-        pickle.dump(experiment, file)
+    experiment.append("t", idx_t)
     print("Done.")
     print("Saving figure to disc... ", end="")
     plot1.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - {val_t:04.1f} K - {1e3*val_i_h:04.1f} mA - {f[0]:.1f} Hz - {f[-1]:04.1f} Hz.png", format="png", dpi=300)
@@ -6,8 +6,7 @@ import lakeshore_tc336
 import oxford_mercury_itc
 import pyvisa
 import os
-from numpy import mean, std, log10, min, nanmin, nanmax, ctypeslib, ma, ones
-import pickle
+from numpy import mean, std, log10, min, nanmin, nanmax, ma, ones
 from Objects.measurement import *
 from Utilities.signal_processing import *
 import time
@@ -224,6 +223,7 @@ if settings.adc.model == 0:
     adc.adw.Load_Process(routines_dir + "/sweep_ao1.TB5")  # Load sweep AO1-2
     adc.adw.Load_Process(routines_dir + "/sweep_ao2.TB6")  # Load sweep AO1-2
     adc.adw.Load_Process(routines_dir + "/sweep_ao1-2.TB7")  # Load sweep AO1-2
+    adc.adw.Load_Process(routines_dir + "/raster_ao1-2_read_ai.TB8")  # Load raster AO1-2 and read AI
     adc.adw.Set_Processdelay(1, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(2, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(3, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
@@ -231,6 +231,7 @@ if settings.adc.model == 0:
     adc.adw.Set_Processdelay(5, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(6, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     adc.adw.Set_Processdelay(7, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
+    adc.adw.Set_Processdelay(8, int(ceil(settings.adc.clock_freq / settings.adc.scanrate)))
     # n. of points to average in hardware = nplc / line freq * scanrate
     adc.adw.Set_Par(33, int(ceil(settings.adc.nplc / settings.adc.line_freq * settings.adc.scanrate)))
     # in hardware settling time: no. of loops to wait after setting output)
@@ -295,6 +296,8 @@ print(f"Current working directory set to: {os.getcwd()}")
 # region ----- Allocate RAM -----
 print("Allocating RAM... ", end="")
 data = Thermoelectrics.StabilityDiagram(mode, heater, t, i_h, vgs, vds, v_ex, settings)
+experiment.data = data
+experiment.save()  # write the header: measured blocks are then appended to the file
 print("Done.")
 # endregion
 
@@ -352,8 +355,7 @@ for idx_t, val_t in enumerate(t):
         setpoint_line = plot0.ax.add_line(Line2D(xdata=array([0, settling_time]), ydata=array([val_t, val_t]), color="grey", linewidth=1, linestyle="--"))  # add setpoint
         while time.time() - t0 <= settling_time:
             data.t[idx_t]["tt"].time[k] = time.time() - t0
-            data.t[idx_t]["tt"].stage[k] = tc.read_temperature("a")
-            data.t[idx_t]["tt"].shield[k] = tc.read_temperature("b")
+            data.t[idx_t]["tt"].stage[k], data.t[idx_t]["tt"].shield[k] = tc.read_temperature("all")[:2]
             plot0.ax.lines[0].set_data(data.t[idx_t]["tt"].time[0:k + 1], data.t[idx_t]["tt"].stage[0:k + 1])
             plot0.ax.lines[1].set_data(data.t[idx_t]["tt"].time[0:k + 1], data.t[idx_t]["tt"].shield[0:k + 1])
             plot0.ax.relim()
@@ -365,6 +367,7 @@ for idx_t, val_t in enumerate(t):
         data.t[idx_t]["tt"].time = data.t[idx_t]["tt"].time[0:k]
         data.t[idx_t]["tt"].stage = data.t[idx_t]["tt"].stage[0:k]
         data.t[idx_t]["tt"].shield = data.t[idx_t]["tt"].shield[0:k]
+        experiment.append("t", idx_t, "tt")
 
         print("Done.")  # endregion
 
@@ -429,156 +432,66 @@ for idx_t, val_t in enumerate(t):
             plt.pause(1e-3)
         print("Done.")  # endregion
 
-        for idx_vgs, val_vgs in enumerate(vgs):
-
-            for idx_vds, val_vds in enumerate(vds):
-
-                # Note: there is no steady state as the measurement includes a transient time
-                # where data is not averaged, plus a measurement time where data is averaged.
-
-                # region ----- Set vgs and Vds -----
-                val_vgs_ = adc.bin2voltage(adc.adw.Get_Par(51), bits=settings.adc.output_resolution) * settings.avv1.gain  # Read AO1 value
-                val_vds_ = adc.bin2voltage(adc.adw.Get_Par(52), bits=settings.adc.output_resolution) * settings.avv2.gain  # Read AO2 value
-                print(f"Setting:\n"
-                      f"\tVgs from {val_vgs_:.6f} V to {val_vgs:.6f} V\n"
-                      f"\tVds from {val_vds_:.6f} V to {val_vds:.6f} V... ", end="")
-                steps_vgs = int(ceil(abs((val_vgs - val_vgs_) / settings.adc.sweep_step)))
-                steps_vds = int(ceil(abs((val_vds - val_vgs_) / settings.adc.sweep_step)))
-                n_steps = max(steps_vds, steps_vgs)
-                temp_vgs = linspace(val_vgs_, val_vgs, n_steps) / settings.avv1.gain
-                temp_vds = linspace(val_vds_, val_vds, n_steps) / settings.avv2.gain
-                adc.adw.SetData_Long(list(adc.voltage2bin(temp_vgs)), 21, 1, len(temp_vgs))  # set AO1 data
-                adc.adw.SetData_Long(list(adc.voltage2bin(temp_vds)), 22, 1, len(temp_vds))  # set AO2 data
-                adc.adw.Set_Par(41, len(temp_vds))  # set length of arrays
-                adc.adw.Start_Process(7)
-                while adc.adw.Process_Status(7) == 1:
-                    plt.pause(1e-3)
-                print("Done.")  # endregion
-
-                # region ----- Measure (and plot in real time) -----
-                print("Measuring... ", end="")
-                vt_samples = int(ceil((settings.adc.vt_settling_time + settings.adc.vt_measurement_time) / (settings.adc.nplc / settings.adc.line_freq)))
-                adc_time = idx2time(linspace(0, vt_samples, vt_samples, endpoint=False), settings.adc.nplc, settings.adc.line_freq)
-                adc.adw.Set_Par(41, vt_samples)  # set length of arrays
-                adc.adw.Start_Process(4)
-                idx_ = 0
-                while True:
-                    if adc.adw.Process_Status(4):
-                        idx = adc.adw.Get_Par(35) - 1  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-                    else:
-                        idx = adc.adw.Get_Par(35)  # param 35 is the scan index (the number of acquisitions completed is idx_scan - 1)
-                    if idx > idx_:
-                        ai1 = ctypeslib.as_array(adc.adw.GetData_Long(1, 1, idx))
-                        i1 = adc.bin2voltage(ai1, bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avi2.gain
-                        ai2 = ctypeslib.as_array(adc.adw.GetData_Long(2, 1, idx))
-                        i2 = adc.bin2voltage(ai2, bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avi2.gain
-                        ai3 = ctypeslib.as_array(adc.adw.GetData_Long(3, 1, idx))
-                        i3 = adc.bin2voltage(ai3, bits=settings.adc.input_resolution) / settings.lockin2.sensitivity * 10 / settings.avi2.gain
-                        ai4 = ctypeslib.as_array(adc.adw.GetData_Long(4, 1, idx))
-                        i4 = adc.bin2voltage(ai4, bits=settings.adc.input_resolution) / settings.lockin2.sensitivity * 10 / settings.avi2.gain
-                        ai5 = ctypeslib.as_array(adc.adw.GetData_Long(5, 1, idx))
-                        i5 = adc.bin2voltage(ai5, bits=settings.adc.input_resolution) / settings.avi2.gain
-                        ai6 = ctypeslib.as_array(adc.adw.GetData_Long(6, 1, idx))
-                        v6 = adc.bin2voltage(ai6, bits=settings.adc.input_resolution) / settings.avv4.gain
-                        ai7 = ctypeslib.as_array(adc.adw.GetData_Long(7, 1, idx))
-                        v7 = adc.bin2voltage(ai7, bits=settings.adc.input_resolution) * settings.lockin3.sensitivity / 10 / settings.avv4.gain
-                        ai8 = ctypeslib.as_array(adc.adw.GetData_Long(8, 1, idx))
-                        v8 = adc.bin2voltage(ai8, bits=settings.adc.input_resolution) * settings.lockin3.sensitivity / 10 / settings.avv4.gain
-                        ai9 = ctypeslib.as_array(adc.adw.GetData_Long(9, 1, idx))
-                        i9 = adc.bin2voltage(ai9, bits=settings.adc.input_resolution) / settings.avi1.gain
-
-                        if mode == 0:
-                            plot4.ax.lines[0].set_data(adc_time[0:idx], abs(i1[0:idx]))
-                            plot4.ax.lines[1].set_data(adc_time[0:idx], abs(i2[0:idx]))
-                            plot4.ax.lines[2].set_data(adc_time[0:idx], abs(i3[0:idx]))
-                            plot4.ax.lines[3].set_data(adc_time[0:idx], abs(i4[0:idx]))
-                            plot4.ax.lines[4].set_data(adc_time[0:idx], abs(i5[0:idx]))
-                            plot4.ax.lines[5].set_data(adc_time[0:idx], abs(i9[0:idx]))
-                        elif mode == 1:
-                            plot4.ax.lines[0].set_data(adc_time[0:idx], abs(i1[0:idx]))
-                            plot4.ax.lines[1].set_data(adc_time[0:idx], abs(i2[0:idx]))
-                            plot4.ax.lines[2].set_data(adc_time[0:idx], abs(i5[0:idx]))
-                            plot4.ax.lines[3].set_data(adc_time[0:idx], abs(v6[0:idx]))
-                            plot4.ax.lines[4].set_data(adc_time[0:idx], abs(v7[0:idx]))
-                            plot4.ax.lines[5].set_data(adc_time[0:idx], abs(v8[0:idx]))
-                            plot4.ax.lines[6].set_data(adc_time[0:idx], abs(i9[0:idx]))
-
-                        plot4.ax.relim()
-                        plot4.ax.autoscale_view(scalex=False, scaley=True)
-                        plt.pause(0.5)
-                        idx_ = idx
-
-                    if idx == vt_samples:
-                        break
-
-                print("Done.")
-                # save figure to disc
-                print("Saving thermalization figure to disc... ", end="")
+        # region ----- Measure stability diagram -----
+        # The whole Vgs x Vds raster runs on the ADwin (process 8): the outputs are ramped by one bin per loop from
+        # point to point, then no_samples samples of AI1-10 are recorded. Samples are streamed back in chunks.
+        # Note: there is no steady state as the measurement includes a transient time
+        # where data is not averaged, plus a measurement time where data is averaged.
+        print("Measuring stability diagram... ")
+        sd = data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]
+        adc_time = idx2time(linspace(0, no_samples, no_samples, endpoint=False), settings.adc.nplc, settings.adc.line_freq)
+        raster = adc.stream_raster(vgs / settings.avv1.gain, vds / settings.avv2.gain, no_samples, pairs=5,
+                                   points2average=int(ceil(settings.adc.nplc / settings.adc.line_freq * settings.adc.scanrate)))
+        for idx_, idx, block in raster:
+
+            for idx_point in range(idx_, idx):
+
+                idx_vgs, idx_vds = divmod(idx_point, len(vds))
+                val_vgs, val_vds = vgs[idx_vgs], vds[idx_vds]
+                print(f"\tVgs = {val_vgs:.6f} V, Vds = {val_vds:.6f} V... ", end="")
+
+                # region ----- Store data locally -----
+                ai = adc.bin2voltage(block[idx_vgs, idx_vds], bits=settings.adc.input_resolution)  # (no_samples, AI1-10)
+                i1 = ai[:, 0] * settings.lockin1.sensitivity / 10 / settings.avi2.gain
+                i2 = ai[:, 1] * settings.lockin1.sensitivity / 10 / settings.avi2.gain
+                i3 = ai[:, 2] / settings.lockin2.sensitivity * 10 / settings.avi2.gain
+                i4 = ai[:, 3] / settings.lockin2.sensitivity * 10 / settings.avi2.gain
+                i5 = ai[:, 4] / settings.avi2.gain
+                v6 = ai[:, 5] / settings.avv2.gain
+                v7 = ai[:, 6] * settings.lockin3.sensitivity / 10 / settings.avv2.gain
+                v8 = ai[:, 7] * settings.lockin3.sensitivity / 10 / settings.avv2.gain
+                i9 = ai[:, 8] / settings.avi1.gain
+                sd["i_2w1"]["x"][idx_vgs, idx_vds] = mean(i1[-no_samples2avg:]), std(i1[-no_samples2avg:])
+                sd["i_2w1"]["y"][idx_vgs, idx_vds] = mean(i2[-no_samples2avg:]), std(i2[-no_samples2avg:])
+                sd["i_w2"]["x"][idx_vgs, idx_vds] = mean(i3[-no_samples2avg:]), std(i3[-no_samples2avg:])
+                sd["i_w2"]["y"][idx_vgs, idx_vds] = mean(i4[-no_samples2avg:]), std(i4[-no_samples2avg:])
+                sd["i_dc"][idx_vgs, idx_vds] = mean(i5[-no_samples2avg:]), std(i5[-no_samples2avg:])
+                sd["v_dc"][idx_vgs, idx_vds] = mean(v6[-no_samples2avg:]), std(v6[-no_samples2avg:])
+                sd["v_w2"]["x"][idx_vgs, idx_vds] = mean(v7[-no_samples2avg:]), std(v7[-no_samples2avg:])
+                sd["v_w2"]["y"][idx_vgs, idx_vds] = mean(v8[-no_samples2avg:]), std(v8[-no_samples2avg:])
+                sd["i_gs"][idx_vgs, idx_vds] = mean(i9[-no_samples2avg:]), std(i9[-no_samples2avg:])
+                # endregion
+
+                # region ----- Plot and save signals -----
+                if mode == 0:
+                    signals = [i1, i2, i3, i4, i5, i9]
+                elif mode == 1:
+                    signals = [i1, i2, i5, v6, v7, v8, i9]
+                for line, signal in zip(plot4.ax.lines, signals):
+                    line.set_data(adc_time, abs(signal))
+                plot4.ax.relim()
+                plot4.ax.autoscale_view(scalex=False, scaley=True)
                 plot4.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - signals - {val_t:.1f} K - {1e3 * val_i_h:.3f} mA - Vgs {val_vgs:.6f} V - Vds {val_vds:.6f} V.png", format="png", dpi=300)
-                print("Done.")  # endregion
-
-                # region ----- Read and store data locally -----
-                print("Reading data from adc... ", end="")
-                ai1 = ctypeslib.as_array(adc.adw.GetData_Long(1, no_samples - no_samples2avg, no_samples2avg))
-                i1 = adc.bin2voltage(ai1, bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avi2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_2w1"]["x"][idx_vgs, idx_vds, 0] = mean(i1)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_2w1"]["x"][idx_vgs, idx_vds, 1] = std(i1)
-
-                ai2 = ctypeslib.as_array(adc.adw.GetData_Long(2, no_samples - no_samples2avg, no_samples2avg))
-                i2 = adc.bin2voltage(ai2, bits=settings.adc.input_resolution) * settings.lockin1.sensitivity / 10 / settings.avi2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_2w1"]["y"][idx_vgs, idx_vds, 0] = mean(i2)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_2w1"]["y"][idx_vgs, idx_vds, 1] = std(i2)
-
-                ai3 = ctypeslib.as_array(adc.adw.GetData_Long(3, no_samples - no_samples2avg, no_samples2avg))
-                i3 = adc.bin2voltage(ai3, bits=settings.adc.input_resolution) / settings.lockin2.sensitivity * 10 / settings.avi2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_w2"]["x"][idx_vgs, idx_vds, 0] = mean(i3)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_w2"]["x"][idx_vgs, idx_vds, 1] = std(i3)
-
-                ai4 = ctypeslib.as_array(adc.adw.GetData_Long(4, no_samples - no_samples2avg, no_samples2avg))
-                i4 = adc.bin2voltage(ai4, bits=settings.adc.input_resolution) / settings.lockin2.sensitivity * 10 / settings.avi2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_w2"]["y"][idx_vgs, idx_vds, 0] = mean(i4)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_w2"]["y"][idx_vgs, idx_vds, 1] = std(i4)
-
-                ai5 = ctypeslib.as_array(adc.adw.GetData_Long(5, no_samples - no_samples2avg, no_samples2avg))
-                i5 = adc.bin2voltage(ai5, bits=settings.adc.input_resolution) / settings.avi2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_dc"][idx_vgs, idx_vds, 0] = mean(i5)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_dc"][idx_vgs, idx_vds, 1] = std(i5)
-
-                ai6 = ctypeslib.as_array(adc.adw.GetData_Long(6, no_samples - no_samples2avg, no_samples2avg))
-                v6 = adc.bin2voltage(ai6, bits=settings.adc.input_resolution) / settings.avv2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_dc"][idx_vgs, idx_vds, 0] = mean(v6)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_dc"][idx_vgs, idx_vds, 1] = std(v6)
-
-                ai7 = ctypeslib.as_array(adc.adw.GetData_Long(7, no_samples - no_samples2avg, no_samples2avg))
-                v7 = adc.bin2voltage(ai7, bits=settings.adc.input_resolution) * settings.lockin3.sensitivity / 10 / settings.avv2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_w2"]["x"][idx_vgs, idx_vds, 0] = mean(v7)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_w2"]["x"][idx_vgs, idx_vds, 1] = std(v7)
-
-                ai8 = ctypeslib.as_array(adc.adw.GetData_Long(8, no_samples - no_samples2avg, no_samples2avg))
-                v8 = adc.bin2voltage(ai8, bits=settings.adc.input_resolution) * settings.lockin3.sensitivity / 10 / settings.avv2.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_w2"]["y"][idx_vgs, idx_vds, 0] = mean(v8)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_w2"]["y"][idx_vgs, idx_vds, 1] = std(v8)
-
-                ai9 = ctypeslib.as_array(adc.adw.GetData_Long(9, no_samples - no_samples2avg, no_samples2avg))
-                i9 = adc.bin2voltage(ai9, bits=settings.adc.input_resolution) / settings.avi1.gain
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_gs"][idx_vgs, idx_vds, 0] = mean(i9)
-                data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_gs"][idx_vgs, idx_vds, 1] = std(i9)
-
-                print("Done.")  # endregion
+                # endregion
 
                 # region ----- Update figures -----
-                print("Updating plots... ", end="")
-
-                # update mask
-                for i in range(idx_vgs+1):
-                    for j in range(idx_vds+1):
-                        mask[i, j] = False
+                mask[idx_vgs, idx_vds] = False
 
                 # update "stability diagram"
                 if mode == 0:
-                    temp = data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_w2"]["x"][:, :, 0]
+                    temp = sd["i_w2"]["x"][:, :, 0]
                 elif mode == 1:
-                    temp = data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["v_w2"]["x"][:, :, 0]
+                    temp = sd["v_w2"]["x"][:, :, 0]
                 plot1.ax00.lines[idx_vgs].set_data(vds[0:idx_vds+1], temp[idx_vgs, 0:idx_vds+1])
                 plot1.ax00.relim()
                 plot1.ax00.autoscale_view(scalex=False, scaley=True)
@@ -597,7 +510,7 @@ for idx_t, val_t in enumerate(t):
                 plot1.im12.set_data(log10(abs(temp)))
                 plot1.im12.set_clim(vmin=nanmin(log10(abs(temp.flatten()))), vmax=nanmax(log10(abs(temp.flatten()))))
 
-                temp = data.t[idx_t]["sd"][f"h{heater}"][idx_i_h]["i_2w1"]["y"][:, :, 0]
+                temp = sd["i_2w1"]["y"][:, :, 0]
                 plot2.ax00.lines[idx_vgs].set_data(vds[0:idx_vds+1], temp[idx_vgs, 0:idx_vds+1])
                 plot2.ax00.relim()
                 plot2.ax00.autoscale_view(scalex=False, scaley=True)
@@ -615,30 +528,27 @@ for idx_t, val_t in enumerate(t):
                 plot2.im02.set_clim(vmin=nanmin(temp.flatten()), vmax=nanmax(temp.flatten()))
                 plot2.im12.set_data(log10(abs(temp)))
                 plot2.im12.set_clim(vmin=nanmin(log10(abs(temp.flatten()))), vmax=nanmax(log10(abs(temp.flatten()))))
-
-                plt.pause(0.1)
                 print("Done.")  # endregion
 
-            # region ----- Save data to disc -----
-            print("Saving data to disc... ", end="")
-            experiment.data = data
-            if os.path.exists(experiment.filename):
-                if os.path.exists(experiment.backupname):
-                    os.remove(experiment.backupname)
-                os.rename(experiment.filename, experiment.backupname)
-            with open(experiment.filename, "wb") as file:
-                pickle.dump(experiment, file)
-            print("Done.")
+                if idx_vds == len(vds) - 1:
 
-            print("Saving figures to disc... ", end="")
-            if mode == 0:
-                plot1.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - IwG - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
-                plot2.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - I2wA - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
-            elif mode == 1:
-                plot1.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - VwG - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
-                plot2.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - I2wA - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
-            print("Done.")
-            # endregion
+                    # region ----- Save data to disc -----
+                    print("Saving data to disc... ", end="")
+                    experiment.append("t", idx_t, "sd", f"h{heater}", idx_i_h, index=idx_vgs)  # Vgs row just measured
+                    print("Done.")
+
+                    print("Saving figures to disc... ", end="")
+                    if mode == 0:
+                        plot1.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - IwG - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
+                        plot2.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - I2wA - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
+                    elif mode == 1:
+                        plot1.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - VwG - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
+                        plot2.fig.savefig(fname=f"{experiment.date.strftime('%Y-%m-%d %H.%M.%S')} - {experiment.chip} - {experiment.device} - {experiment.experiment} - I2wA - {val_t:.1f} K - {1e3 * val_i_h:.1f} mA.png", format="png", dpi=300)
+                    print("Done.")
+                    # endregion
+
+            plt.pause(0.1)
+        print("Done.")  # endregion
 
         # region ----- Set Vgs and Vds to 0 V -----
         val_vgs_ = adc.bin2voltage(adc.adw.Get_Par(51), bits=settings.adc.output_resolution) * settings.avv1.gain  # Read AO1 value
@@ -3,10 +3,9 @@ import lakeshore_tc336
 import oxford_mercury_itc
 import pyvisa
 import os
-import pickle
 from Objects.measurement import *
 from Utilities.signal_processing import *
-import time
+from Utilities.poller import Poller, store
 import datetime
 # endregion
 
@@ -64,6 +63,8 @@ print(f"Current working directory set to: {os.getcwd()}")
 # region ----- Allocate RAM -----
 print("Allocating RAM... ", end="")
 data = Thermoelectrics.TemperatureMonitor(t, settings)
+experiment.data = data
+experiment.save()  # write the header: measured blocks are then appended to the file
 print("Done.")
 # endregion
 
@@ -94,23 +95,29 @@ for idx_t, val_t in enumerate(t):
         print(f"Waiting for thermalization at {val_t:04.1f} K...", end="")
         settling_time = settings.tc.settling_time
 
-        # record data
-        k = 0
-        t0 = time.time()
+        # record data: the temperature controller is sampled on a fixed schedule in a background thread, and the plot is updated from the main thread
+        tt = data.t[idx_t]["tt"]
+        poller = Poller(1 / settings.tc.sampling_freq, samples=len(tt.time))
+        poller.add_channel("tc", tc.read_temperature, "all", fields=["stage", "shield", None, None])
+        poller.add_sink(store(tt, ["stage", "shield"]))
+        samples = poller.subscribe()
         if idx_t > 0:
             setpoint_line.remove()
         plot2.ax.set_xlim([0, settling_time])  # duration must be updated because the initial settling time is different from the regular time
         setpoint_line = plot2.ax.add_line(Line2D(xdata=array([0, settling_time]), ydata=array([val_t, val_t]), color="grey", linewidth=1, linestyle="--"))  # add setpoint
-        while time.time() - t0 <= settling_time:
-            data.t[idx_t]["tt"].time[k] = time.time() - t0
-            data.t[idx_t]["tt"].stage[k] = tc.read_temperature("a")
-            data.t[idx_t]["tt"].shield[k] = tc.read_temperature("b")
-            plot2.ax.lines[0].set_data(data.t[idx_t]["tt"].time[0:k+1], data.t[idx_t]["tt"].stage[0:k+1])
-            plot2.ax.lines[1].set_data(data.t[idx_t]["tt"].time[0:k+1], data.t[idx_t]["tt"].shield[0:k+1])
-            plot2.ax.relim()
-            plot2.ax.autoscale_view("y")
+        k = 0
+        poller.start()
+        while poller.is_alive() or not samples.empty():
+            new_samples = Poller.drain(samples)
+            if new_samples:
+                k = new_samples[-1]["index"] + 1
+                plot2.ax.lines[0].set_data(tt.time[0:k], tt.stage[0:k])
+                plot2.ax.lines[1].set_data(tt.time[0:k], tt.shield[0:k])
+                plot2.ax.relim()
+                plot2.ax.autoscale_view("y")
             plt.pause(1 / settings.tc.sampling_freq)
-            k = k + 1
+        if poller.error is not None:
+            raise poller.error
 
         # remove trailing zeros from saved data
         data.t[idx_t]["tt"].time = data.t[idx_t]["tt"].time[0:k]
@@ -132,13 +139,7 @@ for idx_t, val_t in enumerate(t):
 
 # region ----- Save data to disc -----
     print("Saving data to disc... ", end="")
-    experiment.data = data
-    if os.path.exists(experiment.filename):
-        if os.path.exists(experiment.backupname):
-            os.remove(experiment.backupname)
-        os.rename(experiment.filename, experiment.backupname)
-    with open(experiment.filename, "wb") as file:
-        pickle.dump(experiment, file)
+    experiment.append("t", idx_t)
     print("Done.")
     # endregion
 
@@ -1,7 +1,6 @@
 # region ----- Import packages -----
 import oxford_mercury_itc
 import lakeshore_tc336
-import mercuryitc
 import pyvisa
 import scipy.stats
 import matplotlib.gridspec
@@ -0,0 +1,92 @@
+from numpy import pi, sqrt, exp, arange, zeros, asarray, angle, degrees, mean, std
+from scipy.signal import lfilter
+
+
+class DigitalLockin:
+
+    """ Software lock-in amplifier, demodulating all the channels of a raw trace (e.g. AI1-16 of the ADwin, sampled
+    at a rate above twice the highest harmonic) at several harmonics of the reference frequency at once.
+    Each channel is multiplied by sqrt(2) exp(-i (2 pi h f t + phase)) and low-pass filtered by a cascade of identical
+    RC filters (6 dB/oct each), as in the SR830: the output z = X + iY is the rms phasor of the h-th harmonic, with
+    R = |z| and theta = arg(z) (in deg). The trace is processed chunk by chunk (demodulate), keeping the reference phase
+    and the filter state between chunks, so that the lock-in runs alongside the acquisition.
+    write and average fill Thermoelectrics.Lockin-like objects (time, x, y, rho, phi and their _avg and _stddev). """
+
+    settling = {6: 5, 12: 7, 18: 9, 24: 10}  # time constants to settle to 99% of the final value, per slope (SR830)
+
+    def __init__(self, fs, freq, harmonics=(1,), time_constant=0.1, slope=24, phase=0, decimate=1):
+        """
+        :param fs: [float] sampling frequency (in Hz)
+        :param freq: [float] reference frequency (in Hz)
+        :param harmonics: [list of int] demodulated harmonics
+        :param time_constant: [float] time constant of each RC filter (in s)
+        :param slope: [int] filter slope (6, 12, 18 or 24 dB/oct)
+        :param phase: [float] reference phase (in deg)
+        :param decimate: [int] return one output every "decimate" samples
+        """
+        if slope not in self.settling:
+            exit(f"Filter slope must be one of {list(self.settling)} dB/oct.")
+        self.fs = fs
+        self.freq = freq
+        self.harmonics = asarray(harmonics)
+        self.time_constant = time_constant
+        self.slope = slope
+        self.phase = phase
+        self.decimate = decimate
+        alpha = 1 - exp(-1 / (fs * time_constant))
+        self.b = [alpha]
+        self.a = [1, alpha - 1]
+        self.reset()
+
+    def reset(self):
+        """ Restart from t = 0 with discharged filters. """
+        self.count = 0  # number of samples demodulated
+        self.state = None  # filter state of each stage, (harmonics, channels, 1) arrays
+
+    def settling_time(self):
+        """ Time (in s) for the output to settle to 99% of its final value. """
+        return self.settling[self.slope] * self.time_constant
+
+    def demodulate(self, chunk):
+        """ Demodulate the (channels, n) chunk following the previous ones.
+        Return the (harmonics, channels, m) complex outputs and their (m,) times (in s), with m = n / decimate. """
+        chunk = asarray(chunk, dtype=float)
+        n = chunk.shape[-1]
+        k = self.count + arange(n)
+        cycles = (self.harmonics[:, None] * (self.freq / self.fs) * k) % 1  # reference phase (in cycles), kept small
+        reference = sqrt(2) * exp(-1j * (2 * pi * cycles + pi / 180 * self.phase))  # (harmonics, n)
+        z = chunk[None, :, :] * reference[:, None, :]
+        if self.state is None:
+            self.state = [zeros(z.shape[:2] + (1,), dtype=complex) for _ in range(self.slope // 6)]
+        for stage in range(len(self.state)):
+            z, self.state[stage] = lfilter(self.b, self.a, z, axis=-1, zi=self.state[stage])
+        offset = (-self.count) % self.decimate  # keep the decimation grid aligned across chunks
+        self.count = self.count + n
+        return z[:, :, offset::self.decimate], k[offset::self.decimate] / self.fs
+
+    @staticmethod
+    def xyrt(z):
+        """ Return X, Y, R and theta (in deg) of the complex outputs z. """
+        return z.real, z.imag, abs(z), degrees(angle(z))
+
+    @staticmethod
+    def write(lockin, z, t, start):
+        """ Write the outputs z (1D, one channel and harmonic) and their times t in the arrays time, x, y, rho and phi
+        of lockin (e.g. a Thermoelectrics.Lockin with preallocated arrays) from index start. """
+        stop = min(start + len(z), len(lockin.x))
+        x, y, r, theta = DigitalLockin.xyrt(z[:stop - start])
+        lockin.time[start:stop] = t[:stop - start]
+        lockin.x[start:stop] = x
+        lockin.y[start:stop] = y
+        lockin.rho[start:stop] = r
+        lockin.phi[start:stop] = theta
+        return stop
+
+    @staticmethod
+    def average(lockin, samples, stop=None):
+        """ Set the _avg and _stddev attributes of lockin from the last 'samples' outputs before index stop. """
+        stop = len(lockin.x) if stop is None else stop
+        for name in ["x", "y", "rho", "phi"]:
+            values = getattr(lockin, name)[max(stop - samples, 0):stop]
+            setattr(lockin, f"{name}_avg", mean(values))
+            setattr(lockin, f"{name}_stddev", std(values))
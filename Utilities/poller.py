@@ -0,0 +1,122 @@
+import threading
+import queue
+import time
+
+
+class Poller(threading.Thread):
+
+    """ Sample a set of channels on a fixed schedule in a background thread.
+    A channel is a driver method (or any function) called with fixed arguments, e.g. tc.read_temperature("all").
+    Every "period" seconds all channels are read and the readings are collected in a sample:
+        {"index": n, "time": {name: t}, "value": {name: value}}
+    where t is the time (in s) from the start of the poller at the middle of the bus transaction.
+    The schedule is kept on fixed deadlines (t0 + n * period): the time spent on the bus or by the subscribers
+    does not accumulate. If a reading takes longer than the period, the missed deadlines are skipped and counted in
+    "overruns". Samples are fanned out to sinks (functions called in the poller thread, e.g. to store data)
+    and to subscribers (queues drained by the main thread, e.g. to update plots). """
+
+    def __init__(self, period, samples=None):
+        """
+        :param period: [float] sampling period (in s)
+        :param samples: [int] number of samples after which the poller stops. If None, the poller runs until stop() is called
+        """
+        super().__init__(daemon=True)
+        self.period = period
+        self.samples = samples
+        self.channels = []
+        self.sinks = []
+        self.subscribers = []
+        self.count = 0  # number of samples taken
+        self.overruns = 0  # number of missed deadlines
+        self.error = None  # exception raised by a channel or a sink, which stops the poller
+        self.t0 = None
+        self.stop_event = threading.Event()
+
+    def add_channel(self, name, function, *args, fields=None):
+        """
+        :param name: [str] name of the channel
+        :param function: [function] function returning the reading, e.g. tc.read_temperature
+        :param args: arguments passed to function, e.g. "all"
+        :param fields: [list of str] if the function returns a sequence, the names of its elements. Elements with name None are discarded
+        """
+        self.channels.append((name, function, args, fields))
+
+    def add_sink(self, function):
+        """ Call function(sample) in the poller thread after each sample. """
+        self.sinks.append(function)
+
+    def subscribe(self):
+        """ Return a queue receiving every sample. Drain it from the main thread with Poller.drain. """
+        subscriber = queue.Queue()
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    @staticmethod
+    def drain(subscriber):
+        """ Return the list of samples waiting in the subscriber queue, without blocking. """
+        samples = []
+        while True:
+            try:
+                samples.append(subscriber.get_nowait())
+            except queue.Empty:
+                return samples
+
+    def stop(self):
+        """ Stop the poller after the sample being taken. """
+        self.stop_event.set()
+
+    def elapsed(self):
+        """ Time (in s) since the poller started. """
+        return 0 if self.t0 is None else time.perf_counter() - self.t0
+
+    def run(self):
+        self.t0 = time.perf_counter()
+        deadline = self.t0
+        try:
+            while not self.stop_event.is_set() and (self.samples is None or self.count < self.samples):
+                sample = {"index": self.count, "time": {}, "value": {}}
+                for name, function, args, fields in self.channels:
+                    start = time.perf_counter()
+                    value = function(*args)
+                    t = (start + time.perf_counter()) / 2 - self.t0
+                    if fields is None:
+                        sample["time"][name] = t
+                        sample["value"][name] = value
+                    else:
+                        for field, val in zip(fields, value):
+                            if field is not None:
+                                sample["time"][field] = t
+                                sample["value"][field] = val
+                for sink in self.sinks:
+                    sink(sample)
+                for subscriber in self.subscribers:
+                    subscriber.put(sample)
+                self.count = self.count + 1
+
+                # wait for the next deadline. If it has already passed, skip it and keep the schedule
+                deadline = deadline + self.period
+                late = time.perf_counter() - deadline
+                if late > 0:
+                    missed = int(late // self.period) + 1
+                    self.overruns = self.overruns + missed
+                    deadline = deadline + missed * self.period
+                self.stop_event.wait(deadline - time.perf_counter())
+        except Exception as error:
+            self.error = error
+
+
+def store(target, fields, time_field="time"):
+    """ Return a sink that writes each sample into the preallocated arrays of target:
+    target.<time_field>[index] is the time of the first field, and target.<field>[index] the value of each field.
+    Samples beyond the length of the arrays are discarded.
+    :param target: [object] object with one array attribute per field (e.g. data.t[idx_t]["tt"])
+    :param fields: [list of str] fields to store (e.g. ["stage", "shield"])
+    :param time_field: [str] name of the array where to store the timestamps
+    """
+    def sink(sample):
+        k = sample["index"]
+        if k < len(getattr(target, time_field)):
+            getattr(target, time_field)[k] = sample["time"][fields[0]]
+            for field in fields:
+                getattr(target, field)[k] = sample["value"][field]
+    return sink
@@ -0,0 +1,114 @@
+from numpy import gradient, floor, loadtxt, argwhere, r_, count_nonzero
+from scipy.stats import linregress
+from scipy.signal import savgol_filter
+from scipy.constants import epsilon_0
+import Utilities.signal_processing
+
+
+def load_sweep(file, sweep_dir=1, skiprows=77):
+    """
+    :param file: [str] path of a probestation data file (IV_Data or GateSweep_Data)
+    :param sweep_dir: [int] 0 to keep the forward sweep, 1 to keep the backward sweep, None to keep the whole sweep
+    :param skiprows: [int] header lines of the file
+    :return: the (points, 2) array of the selected sweep
+    """
+    with open(file, "r") as f:
+        data = loadtxt(f, skiprows=skiprows)
+    if sweep_dir == 0:
+        data = Utilities.signal_processing.filter_fwd_sweep(data)
+    if sweep_dir == 1:
+        data = Utilities.signal_processing.filter_bkw_sweep(data)
+    return data
+
+
+def smooth(data_vgs, window=0.2, order=3):
+    """
+    :param data_vgs: [array] (points, 2) gate sweep
+    :param window: [float] window of the Savitzky-Golay filter (in fraction of the array length)
+    :param order: [int] order of the polynomial of the filter
+    :return: the smoothed I_DS
+    """
+    return savgol_filter(data_vgs[:, 1], int(2 * floor(window * len(data_vgs[:, 0]) / 2) + 1), order)
+
+
+def iv_accepted(fit, rvalue=0.99, rmin=1e2, rmax=1e6, stderr=100):
+    """
+    :param fit: linear fit (scipy.stats.linregress) of V_DS vs I_DS
+    :param rvalue: [float] min. r-value of the fit
+    :param rmin: [float] min. resistance (in Ohm)
+    :param rmax: [float] max. resistance (in Ohm)
+    :param stderr: [float] max. standard error of the fit
+    :return: True if the IV curve is accepted
+    """
+    return bool(fit[2] > rvalue and rmax > fit[0] > rmin and fit[4] < stderr)
+
+
+def gate_sweep_accepted(data_vgs, y_smooth, ids_min=1e-9, max_gradient=0.01):
+    """
+    :param data_vgs: [array] (points, 2) gate sweep
+    :param y_smooth: [array] smoothed I_DS
+    :param ids_min: [float] min. I_DS (in A)
+    :param max_gradient: [float] max. step of I_DS between points (in fraction of I_DS)
+    :return: True if the gate sweep is accepted: I_DS above ids_min, no jumps, not monotonically increasing and at most
+    one minimum of the smoothed I_DS
+    """
+    return not (any(data_vgs[:, 1] < ids_min)
+                or any(abs(gradient(data_vgs[:, 1])) > max_gradient * abs(data_vgs[:, 1]))
+                or all(i < j for i, j in zip(y_smooth[:], y_smooth[1:]))
+                or count_nonzero(r_[True, y_smooth[1:] < y_smooth[:-1]][1:-1] & r_[y_smooth[:-1] < y_smooth[1:], True][1:-1]) > 1)
+
+
+def mobility(data_vgs, y_smooth, l, w, c, bias):
+    """
+    :param data_vgs: [array] (points, 2) gate sweep
+    :param y_smooth: [array] smoothed I_DS
+    :param l: [float] channel length (in m)
+    :param w: [float] channel width (in m)
+    :param c: [float] gate capacitance (in F/m2)
+    :param bias: [float] V_DS (in V)
+    :return: the linear mobility from the raw and from the smoothed I_DS (in m2/Vs), the Dirac point (in V, where the raw
+    transconductance is minimum) and the max. hole and electron mobility from the smoothed I_DS (None if not available)
+    """
+    dy_dx = abs(gradient(data_vgs[:, 1], data_vgs[:, 0]))  # calculate d(ids)/d(vgs) raw
+    v_dirac = data_vgs[argwhere(dy_dx == min(dy_dx)), 0][0]
+    dy_smooth_dx = abs(gradient(y_smooth, data_vgs[:, 0]))  # calculate d(ids)/d(vgs)
+    mu_lin = l / (w * c * bias) * dy_dx
+    mu_lin_smooth = l / (w * c * bias) * dy_smooth_dx
+    try:
+        mu_h = max(mu_lin_smooth[argwhere(data_vgs[:, 0] <= v_dirac[0])])[0]
+    except ValueError:
+        mu_h = None
+    try:
+        mu_e = max(mu_lin_smooth[argwhere(data_vgs[:, 0] >= v_dirac[0])])[0]
+    except ValueError:
+        mu_e = None
+    return mu_lin, mu_lin_smooth, v_dirac, mu_h, mu_e
+
+
+def process_device(file_iv, file_vgs, l, w=5e-6, bias=50e-3, epsilon_r=3.9, oxide_thickness=285e-9, sweep_dir=1, smooth_window=0.2,
+                   smooth_order=3, filter_rvalue=0.99, filter_stderr=100, filter_rmin=1e2, filter_rmax=1e6, filter_ids_min=1e-9,
+                   filter_gradient=0.01):
+    """
+    Per-device processing of the probestation data (step1_filter_data_and_generate_df.py): load the IV and check the
+    linear fit, then load the gate sweep, smooth it, check it and calculate the mobility.
+    :param file_iv: [str] path of the IV file
+    :param file_vgs: [str] path of the gate sweep file
+    :param l: [float] channel length (in m)
+    :return: a dictionary with the results of the steps completed: "iv" (data), "fit" (IV linear fit) and "iv ok". If the
+    IV is accepted, "vgs" (data), "y_smooth", "d2y" (gradient of y_smooth) and "vgs ok". If the gate sweep is accepted,
+    "mu_lin", "mu_lin_smooth", "v_dirac", "mu_h" and "mu_e" (see mobility)
+    """
+    result = {"iv": load_sweep(file_iv, sweep_dir)}
+    result["fit"] = linregress(result["iv"][:, 1], result["iv"][:, 0])
+    result["iv ok"] = iv_accepted(result["fit"], filter_rvalue, filter_rmin, filter_rmax, filter_stderr)
+    if not result["iv ok"]:
+        return result
+    result["vgs"] = load_sweep(file_vgs, sweep_dir)
+    result["y_smooth"] = smooth(result["vgs"], smooth_window, smooth_order)
+    result["d2y"] = gradient(result["y_smooth"][:])
+    result["vgs ok"] = gate_sweep_accepted(result["vgs"], result["y_smooth"], filter_ids_min, filter_gradient)
+    if not result["vgs ok"]:
+        return result
+    c = epsilon_0 * epsilon_r / oxide_thickness
+    result["mu_lin"], result["mu_lin_smooth"], result["v_dirac"], result["mu_h"], result["mu_e"] = mobility(result["vgs"], result["y_smooth"], l, w, c, bias)
+    return result
@@ -0,0 +1,130 @@
+from numpy import asarray, geomspace, exp, log, sqrt, argmin, where, inf
+
+
+class SettlingDetector:
+
+    """ Thermalization detector, replacing the fixed waits after a temperature step. The temperatures streamed by the
+    poller (e.g. stage and shield) are added with update, and the temperature is settled as soon as, over the last
+    "window" s of every channel:
+    - the drift (slope of a linear fit) is below "drift", by "confidence" standard errors
+    - the mean is within "tolerance" of the setpoint, by "confidence" standard errors (channels with a setpoint only)
+    An exponential approach T = final + amplitude * exp(-(t - t0) / tau) is also fitted to each channel, to predict the
+    final temperature and the time left before the drift criterion is met (eta). In a script:
+        detector = SettlingDetector({"stage": val_t, "shield": None}, tolerance=0.05, drift=1e-3)
+        ...
+        if detector.update(Poller.drain(samples)):
+            poller.stop() """
+
+    def __init__(self, targets, tolerance=0.05, drift=1e-3, window=60, confidence=2, min_time=0):
+        """
+        :param targets: [dict] {channel: setpoint (in K) or None}, e.g. {"stage": 100, "shield": None}
+        :param tolerance: [float] max. distance (in K) of the mean temperature from the setpoint
+        :param drift: [float] max. drift (in K/min)
+        :param window: [float] time (in s) over which mean and drift are estimated
+        :param confidence: [float] number of standard errors by which the criteria must be met
+        :param min_time: [float] min. time (in s) before the temperature can be settled
+        """
+        self.targets = dict(targets)
+        self.tolerance = tolerance
+        self.drift = drift
+        self.window = window
+        self.confidence = confidence
+        self.min_time = min_time
+        self.time = {x: [] for x in self.targets}
+        self.value = {x: [] for x in self.targets}
+        self.ready = False
+        self.settled_at = None  # time (in s, poller clock) at which the criteria were first met
+
+    def add(self, t, values):
+        """ Add the temperatures values ({channel: T}) read at time t (in s). Channels not in targets are ignored. """
+        for x, val in values.items():
+            if x in self.targets:
+                self.time[x].append(t)
+                self.value[x].append(val)
+
+    def update(self, samples):
+        """ Add the poller samples ({"time": {channel: t}, "value": {channel: T}}) and evaluate the criteria.
+        Return True if the temperature is settled. """
+        for sample in samples:
+            for x in self.targets:
+                if x in sample["value"]:
+                    self.time[x].append(sample["time"][x])
+                    self.value[x].append(sample["value"][x])
+        self.ready = all(self.settled(x) for x in self.targets)
+        if self.ready and self.settled_at is None:
+            self.settled_at = max(self.time[x][-1] for x in self.targets)
+        return self.ready
+
+    def statistics(self, channel):
+        """ Number of points, mean, drift (in K/min) and their standard errors over the last window of channel
+        (None if the window is not filled yet). """
+        t = asarray(self.time[channel], dtype=float)
+        T = asarray(self.value[channel], dtype=float)
+        if len(t) < 3 or t[-1] - t[0] < self.window:
+            return None
+        selected = t >= t[-1] - self.window
+        t, T = t[selected], T[selected]
+        n = len(t)
+        if n < 3:
+            return None
+        dt = t - t.mean()
+        sxx = (dt ** 2).sum()
+        slope = (dt * (T - T.mean())).sum() / sxx
+        residuals = T - T.mean() - slope * dt
+        sigma = sqrt((residuals ** 2).sum() / (n - 2))
+        return {"n": n, "mean": T.mean(), "mean_err": sigma / sqrt(n), "drift": 60 * slope, "drift_err": 60 * sigma / sqrt(sxx)}
+
+    def settled(self, channel):
+        """ True if channel meets the drift and (if it has a setpoint) tolerance criteria. """
+        if len(self.time[channel]) == 0 or self.time[channel][-1] - self.time[channel][0] < self.min_time:
+            return False
+        stats = self.statistics(channel)
+        if stats is None:
+            return False
+        if abs(stats["drift"]) + self.confidence * stats["drift_err"] >= self.drift:
+            return False
+        target = self.targets[channel]
+        return target is None or abs(stats["mean"] - target) + self.confidence * stats["mean_err"] < self.tolerance
+
+    @staticmethod
+    def fit_exponential(t, T, taus=48):
+        """ Least squares fit of T = final + amplitude * exp(-(t - t[0]) / tau). The model is linear in final and amplitude
+        for a given tau: it is solved in closed form for a logarithmic grid of "taus" time constants, between the sampling
+        period and 10 times the duration of the data, and the best one is kept. Return final, amplitude and tau. """
+        t = asarray(t, dtype=float)
+        T = asarray(T, dtype=float)
+        span = t[-1] - t[0]
+        grid = geomspace(span / len(t), 10 * span, taus)
+        x = exp(-(t - t[0])[None, :] / grid[:, None])  # (taus, points)
+        x_mean = x.mean(axis=1)
+        dx = x - x_mean[:, None]
+        sxx = (dx ** 2).sum(axis=1)
+        sxy = (dx * (T - T.mean())[None, :]).sum(axis=1)
+        amplitude = where(sxx > 0, sxy / where(sxx > 0, sxx, 1), 0)
+        k = argmin(-amplitude * sxy)  # minimum of the sum of squared residuals
+        return T.mean() - amplitude[k] * x_mean[k], amplitude[k], grid[k]
+
+    def predict(self, channel):
+        """ Final temperature, time constant (in s) and time left (in s) before the drift criterion (and, for channels
+        with a setpoint, the tolerance criterion) is met, from the exponential fit of the second half of the data. eta is
+        inf if the final temperature is predicted out of tolerance. None if there are less than 8 points. """
+        t = asarray(self.time[channel], dtype=float)
+        T = asarray(self.value[channel], dtype=float)
+        if len(t) < 8 or t[-1] <= t[0]:
+            return None
+        selected = t >= (t[0] + t[-1]) / 2  # the tail of the approach, past the transient of the step
+        t, T = t[selected], T[selected]
+        final, amplitude, tau = self.fit_exponential(t, T)
+        end = t[0] + tau * log(max(60 * abs(amplitude) / tau / self.drift, 1))
+        target = self.targets[channel]
+        if target is not None:
+            margin = self.tolerance - abs(final - target)
+            end = max(end, t[0] + tau * log(max(abs(amplitude) / margin, 1))) if margin > 0 else inf
+        return {"final": final, "tau": tau, "eta": max(end - t[-1], 0)}
+
+    def eta(self):
+        """ Time left (in s) before all the channels are predicted to be settled. """
+        if self.ready:
+            return 0
+        predictions = [self.predict(x) for x in self.targets]
+        return inf if None in predictions else max(x["eta"] for x in predictions)
@@ -1,4 +1,6 @@
-from numpy import sqrt, ndarray, zeros, array, concatenate, linspace, flip, append, vstack, zeros_like
+import operator
+from Utilities.sweep_plan import SweepPlan
+from numpy import sqrt, ndarray, zeros, array, concatenate, linspace, flip, append, vstack, zeros_like, asarray, diff, sign, nonzero
 
 
 def rms2amplitude(val):
@@ -18,15 +20,29 @@ def amplitude2rms(val):
 
 
 def idx2time(idx, nplc, line_freq):
+    """
+    :param idx: [int, list or array] sample index(es)
+    :param nplc: [float] integration time (in power line cycles)
+    :param line_freq: [float] power line frequency (in Hz)
+    :return: the time (in s) of the sample(s), as a float array for a list or array input
+    """
     if isinstance(idx, ndarray) or isinstance(idx, list):
-        out = zeros(len(idx))
-        for n in range(len(idx)):
-            out[n] = idx2time(idx[n], nplc, line_freq)
-        return out
+        return (asarray(idx) * nplc / line_freq).astype(float)
     else:
         return idx * nplc / line_freq
 
 
+def _monotonic(L, compare, output):
+    # elements of L (output = 0) or mask of the elements of L (output = 1) that compare True with the next element.
+    # The last element is compared with itself
+    L = append(L, L[-1])
+    mask = compare(L[:-1], L[1:])
+    if output == 0:
+        return L[:-1][mask]
+    elif output == 1:
+        return mask
+
+
 def strictly_increasing_array(L, output=0):
     """
     :param L: input vector
@@ -34,11 +50,7 @@ def strictly_increasing_array(L, output=0):
     :return: an array of strictly increasing elements (if output = 0)
     or an array of strictly increasing elements index (if output = 1)
     """
-    L = append(L, L[-1])
-    if output == 0:
-        return array(L[[x < y for x, y in zip(L, L[1:])]])
-    elif output == 1:
-        return array([x < y for x, y in zip(L, L[1:])])
+    return _monotonic(L, operator.lt, output)
 
 
 def strictly_decreasing_array(L, output=0):
@@ -48,11 +60,7 @@ def strictly_decreasing_array(L, output=0):
     :return: an array of strictly decreasing elements (if output = 0)
     or an array of strictly decreasing elements index (if output = 1)
     """
-    L = append(L, L[-1])
-    if output == 0:
-        return array(L[[x > y for x, y in zip(L, L[1:])]])
-    elif output == 1:
-        return array([x > y for x, y in zip(L, L[1:])])
+    return _monotonic(L, operator.gt, output)
 
 
 def non_increasing_array(L, output=0):
@@ -62,11 +70,7 @@ def non_increasing_array(L, output=0):
     :return: an array of non-increasing elements (if output = 0)
     or an array of non-increasing elements index (if output = 1)
     """
-    L = append(L, L[-1])
-    if output == 0:
-        return array(L[[x >= y for x, y in zip(L, L[1:])]])
-    elif output == 1:
-        return array([x >= y for x, y in zip(L, L[1:])])
+    return _monotonic(L, operator.ge, output)
 
 
 def non_decreasing_array(L, output=0):
@@ -76,74 +80,61 @@ def non_decreasing_array(L, output=0):
     :return: an array of non-decreasing elements (if output = 0)
     or an array of non-decreasing elements index (if output = 1)
     """
-    L = append(L, L[-1])
-    if output == 0:
-        return array(L[[x <= y for x, y in zip(L, L[1:])]])
-    elif output == 1:
-        return array([x <= y for x, y in zip(L, L[1:])])
+    return _monotonic(L, operator.le, output)
 
 
 def make_array_4_sweep(x):
 
     """
     :param x: [list] In the order: start, stop, steps, lin-log, mode (0: FWD, 1: FWD-BWD, 2: LOOP), cycles
-    :return: x
-    """
-
-    if isinstance(x, list) and len(x) == 6:
-        if x[3] == 0 or x[3] == "lin":
-            if x[4] == 0:
-                y = linspace(x[0], x[1], x[2])
-            elif x[4] == 1:
-                y = linspace(x[0], x[1], x[2])
-                y = concatenate((y[:-1], flip(y)))
-            elif x[4] == 2:
-                y = linspace(x[0], x[1], x[2])
-                y = concatenate((y[:-1], flip(y), -y[1:-1], flip(-y)))
-            if (x[4] == 1 or x[4] == 2) and (x[5] > 1):
-                y0 = y[1:]
-                for idx in range(x[5]-1):
-                    y = concatenate((y, y0))
-        elif x[3] == 1 or x[3] == "log":
-            exit("Log mode not yet implemented.")
-    else:
-        exit("Cannot generate array from given input... Terminate.")
-    return y
+    :return: the setpoints of the sweep (see Utilities.sweep_plan.SweepPlan)
+    """
+
+    return SweepPlan.from_list(x).values
+
+
+def _sweep_rows(data, steps):
+    # rows of data reached by a step in steps (True), plus the row preceding the first of them
+    idx = nonzero(steps)[0] + 1
+    if len(idx) > 0:
+        idx = concatenate(([idx[0] - 1], idx))
+    return data[idx, :]
 
 
 def filter_fwd_sweep(data):
-    newdata = zeros_like(data)
-    k = 0
-    for i in range(data.shape[0]):
-        if i == 0:
-            continue
-        else:
-            if data[i, 0] - data[i-1, 0] > 0:
-                if k == 0:
-                    newdata[k, :] = data[i-1, :]
-                    newdata[k+1, :] = data[i, :]
-                    k = k + 2
-                else:
-                    newdata[k, :] = data[i, :]
-                    k = k + 1
-    return newdata[0:k, :]
+    """
+    :param data: [array] (points, columns) data, swept in the first column
+    :return: the rows reached by increasing the first column, plus the row from which the first increase starts
+    """
+    return _sweep_rows(data, data[1:, 0] - data[:-1, 0] > 0)
 
 
 def filter_bkw_sweep(data):
-    newdata = zeros_like(data)
-    k = 0
-    for i in range(data.shape[0]):
-        if i == 0:
-            continue
-        else:
-            if data[i, 0] - data[i-1, 0] < 0:
-                if k == 0:
-                    newdata[k, :] = data[i-1, :]
-                    newdata[k+1, :] = data[i, :]
-                    k = k + 2
-                else:
-                    newdata[k, :] = data[i, :]
-                    k = k + 1
-    return newdata[0:k, :]
+    """
+    :param data: [array] (points, columns) data, swept in the first column
+    :return: the rows reached by decreasing the first column, plus the row from which the first decrease starts
+    """
+    return _sweep_rows(data, data[1:, 0] - data[:-1, 0] < 0)
 
 
+def sweep_segments(x):
+    """
+    Split a sweep (e.g. a multi-cycle FWD-BWD or LOOP sweep) into monotonic segments, at the points where the sign
+    of the step changes. Consecutive segments share the turning point. Points with a zero step (e.g. repeated
+    setpoints) belong to the segment in progress.
+    Example: [data[a:b] for a, b, d in zip(*sweep_segments(data[:, 0])) if d == 1] are the forward segments of data.
+    :param x: [array] swept values
+    :return: start indexes, stop indexes (excluded) and direction (1: FWD, -1: BWD, 0: constant) of the segments
+    """
+    x = asarray(x)
+    if len(x) == 0:
+        return zeros(0, dtype=int), zeros(0, dtype=int), zeros(0, dtype=int)
+    steps = sign(diff(x)).astype(int)
+    idx = nonzero(steps)[0]  # non-zero steps
+    if len(idx) == 0:
+        return array([0]), array([len(x)]), array([0])
+    direction = steps[idx]
+    turn = nonzero(direction[1:] != direction[:-1])[0] + 1  # non-zero steps which start a new segment
+    start = concatenate(([0], idx[turn]))
+    stop = concatenate((idx[turn] + 1, [len(x)]))
+    return start, stop, direction[concatenate(([0], turn))]
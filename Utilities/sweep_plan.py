@@ -0,0 +1,139 @@
+from numpy import linspace, geomspace, concatenate, flip, tile, repeat, arange, zeros, full, asarray, sign, diff, nonzero, maximum, where
+
+
+class SweepPlan:
+
+    """ Setpoints of a sweep, compiled from linear or logarithmic pieces swept forward (FWD), forward and backward (FWD-BWD)
+    or in a loop (0 -> stop -> 0 -> -stop -> 0, LOOP) for a number of cycles, and from arbitrary sequences of values.
+    The pieces are appended one after the other (e.g. SweepPlan(0, 1, 11).append(1, 10, 5, "log")) into:
+    values: the setpoints
+    direction: 1 if the point is reached by increasing the setpoint (FWD), -1 by decreasing it (BWD), 0 if the plan is
+    constant. The first point takes the direction of the first step, points with a zero step the direction in progress
+    cycle: cycle of the piece the point belongs to (0 for the first cycle, which includes the starting point)
+    segment: index of the piece the point belongs to
+    The plan can be written directly to the ADwin AO arrays (DATA_21 and DATA_22), to the buffer of a Keithley 236 as
+    staircases or to the program memory of a Yokogawa 7651, so that it runs hardware-timed on any of them. """
+
+    modes = {0: "fwd", 1: "fwd-bwd", 2: "loop", "fwd": "fwd", "fwd-bwd": "fwd-bwd", "loop": "loop"}
+    spacings = {0: "lin", 1: "log", "lin": "lin", "log": "log"}
+
+    def __init__(self, start=None, stop=None, points=None, spacing="lin", mode="fwd", cycles=1):
+        """
+        :param start: [float] first setpoint. If None, the plan is empty
+        :param stop: [float] last setpoint of the forward sweep
+        :param points: [int] points of the forward sweep
+        :param spacing: [str] "lin" or "log" (start and stop must be different from 0 and have the same sign)
+        :param mode: [str] "fwd", "fwd-bwd" or "loop" (or 0, 1, 2)
+        :param cycles: [int] cycles of "fwd-bwd" and "loop" sweeps
+        """
+        self.values = zeros(0)
+        self.direction = zeros(0, dtype=int)
+        self.cycle = zeros(0, dtype=int)
+        self.segment = zeros(0, dtype=int)
+        if start is not None:
+            self.append(start, stop, points, spacing, mode, cycles)
+
+    @classmethod
+    def from_list(cls, x):
+        """ Plan of a [start, stop, steps, lin-log, mode (0: FWD, 1: FWD-BWD, 2: LOOP), cycles] list, as used by the scripts. """
+        if not (isinstance(x, list) and len(x) == 6):
+            exit("Cannot generate array from given input... Terminate.")
+        return cls(*x)
+
+    def __len__(self):
+        return len(self.values)
+
+    @staticmethod
+    def piece(start, stop, points, spacing="lin", mode="fwd", cycles=1):
+        # values and cycle of the points of a piece
+        if spacing not in SweepPlan.spacings or mode not in SweepPlan.modes:
+            exit(f"Unknown spacing ({spacing}) or mode ({mode}) of the sweep... Execution terminated.")
+        if SweepPlan.spacings[spacing] == "log":
+            if start == 0 or stop == 0 or start * stop < 0:
+                exit("A logarithmic sweep cannot start, stop or sweep through 0... Execution terminated.")
+            y = geomspace(start, stop, points)
+        else:
+            y = linspace(start, stop, points)
+        mode = SweepPlan.modes[mode]
+        if mode == "fwd-bwd":
+            y = concatenate((y[:-1], flip(y)))
+        elif mode == "loop":
+            y = concatenate((y[:-1], flip(y), -y[1:-1], flip(-y)))
+        if mode != "fwd" and cycles > 1:
+            return concatenate((y, tile(y[1:], cycles - 1))), concatenate((zeros(len(y), dtype=int), repeat(arange(1, cycles), len(y) - 1)))
+        return y, zeros(len(y), dtype=int)
+
+    def append(self, start, stop, points, spacing="lin", mode="fwd", cycles=1):
+        """ Append a sweep (see __init__). If it starts from the last setpoint of the plan, the repeated point is dropped.
+        Return the plan, so that appends can be chained. """
+        values, cycle = self.piece(start, stop, points, spacing, mode, cycles)
+        return self.extend(values, cycle)
+
+    def append_values(self, values):
+        """ Append an arbitrary sequence of setpoints, as a single cycle. Return the plan. """
+        values = asarray(values, dtype=float).ravel()
+        return self.extend(values, zeros(len(values), dtype=int))
+
+    def extend(self, values, cycle):
+        # append the points of a piece and update the labels
+        if len(self.values) > 0 and len(values) > 0 and values[0] == self.values[-1]:
+            values, cycle = values[1:], cycle[1:]
+        segment = self.segment[-1] + 1 if len(self.segment) > 0 else 0
+        self.values = concatenate((self.values, values))
+        self.cycle = concatenate((self.cycle, cycle))
+        self.segment = concatenate((self.segment, full(len(values), segment)))
+        self.direction = self.directions(self.values)
+        return self
+
+    @staticmethod
+    def directions(values):
+        # direction of the step reaching each point, with zero steps taking the direction in progress
+        steps = sign(diff(values)).astype(int)
+        moving = nonzero(steps)[0]
+        if len(moving) == 0:
+            return zeros(len(values), dtype=int)
+        last = maximum.accumulate(where(steps != 0, arange(len(steps)), moving[0]))  # last non-zero step up to each step
+        steps = steps[last]
+        return concatenate((steps[:1], steps))
+
+    def mask(self, direction=None, cycle=None, segment=None):
+        """ Points of the plan with the given direction (1 or -1, or "fwd" or "bwd"), cycle and segment (None: all). """
+        direction = {"fwd": 1, "bwd": -1, "bkw": -1}.get(direction, direction)
+        selected = full(len(self.values), True)
+        for labels, value in [(self.direction, direction), (self.cycle, cycle), (self.segment, segment)]:
+            if value is not None:
+                selected &= labels == value
+        return selected
+
+    ''' ----- Export functions -----'''
+
+    def to_adwin(self, adw, channel=1, gain=1, bits=16, par=41):
+        """
+        Write the plan to the array DATA_<20 + channel> (AO1: DATA_21, AO2: DATA_22) of the ADwin, as bins, and its
+        length to PAR_<par> (length of the AO arrays, see the sweep_ao processes). The sweep processes output AO1 and
+        AO2 only. The arrays swept together must have the same length.
+        :param adw: [adwin] adwin object (Instrumentation library/adwin.py)
+        :param channel: [int] analog output (1 or 2)
+        :param gain: [float] gain of the amplifier after the output: the output is set to values / gain
+        :param bits: [int] output resolution
+        :param par: [int] parameter holding the length of the arrays
+        :return: the bins
+        """
+        if channel not in (1, 2):
+            exit(f"Analog output {channel} is not swept by the ADwin processes (1 or 2)... Execution terminated.")
+        if len(self.values) > 50000:
+            exit(f"Cannot write {len(self.values)} points: the AO arrays of the ADwin hold 50000 points... Execution terminated.")
+        bins = adw.voltage2bin(self.values / gain, bits=bits)
+        adw.adw.Set_Par(par, len(bins))
+        adw.adw.SetData_Long(list(bins), 20 + channel, 1, len(bins))
+        return bins
+
+    def to_smu236(self, smu, source="v", **kwargs):
+        """ Program the plan as a sweep of the Keithley 236 smu (keithley_smu236.smu236.program_sweep, whose keyword
+        arguments are passed through), run by smu.run_sweep. Return the number of points. """
+        return smu.program_sweep(source, self.values, **kwargs)
+
+    def to_dc7651(self, source, interval=1, slope=0, mode="single"):
+        """ Store the plan in the program memory of the Yokogawa 7651 source (yokogawa_dc7651.dc7651.program), one step
+        every "interval" s, run by source.run_program. Return the number of steps. """
+        return source.program(self.values, interval, slope, mode)